@@ -0,0 +1,141 @@
+'''
+Time loading and dumping synthetic RS0001-RS0006 representations in every format (JSON, CBOR,
+YAML and XLSX), validating them and generating their templates, and record throughput and peak
+memory so that runs (e.g., in CI) can be compared with a baseline.
+
+Content is generated from each representation's schema (see synthetic.py), with about POINTS grid
+points in each performance map, so it is valid and shaped like real representations.
+
+Each case is run --repeat times and its fastest time is recorded, then run once more under
+tracemalloc for its peak (Python-allocated) memory. Throughput is in MiB of compact JSON content
+per second, so that formats can be compared with each other.
+
+Usage: python benchmark/bench_suite.py [--points 1000 10000] [--schemas RS0001 RS0004]
+                                       [--formats json xlsx] [--repeat 3]
+                                       [--output results.json] [--baseline baseline.json]
+
+With --baseline, cases that are slower (or use more memory) than the baseline by more than
+--tolerance (a fraction) are listed and the exit status is 1.
+'''
+import gc
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import tk205
+import tk205.validation
+from synthetic import SCHEMAS, make_content
+
+FORMATS = ["json", "cbor", "yaml", "xlsx"]
+
+# Differences smaller than these are treated as noise when comparing with a baseline
+MIN_DIFFERENCES = {"seconds": 0.01, "peak_mib": 1.0}
+
+def run_case(function, repeat):
+    '''
+    Return the fastest time of `function()` over `repeat` runs, and its peak traced memory.
+    '''
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+def record(results, name, function, repeat, content_size=None, file_path=None):
+    try:
+        seconds, peak = run_case(function, repeat)
+    except Exception as e:
+        results[name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"  {name:<28} error: {results[name]['error']}")
+        return
+    result = {"seconds": seconds, "peak_mib": peak/2**20}
+    if content_size is not None:
+        result["mib_per_s"] = content_size/2**20/seconds
+    if file_path is not None:
+        result["file_mib"] = os.path.getsize(file_path)/2**20
+    results[name] = result
+    throughput = f"{result['mib_per_s']:8.2f} MiB/s" if "mib_per_s" in result else " "*13
+    print(f"  {name:<28} {seconds:8.3f} s {throughput}  peak {result['peak_mib']:8.1f} MiB")
+
+def run_benchmarks(directory, arguments, template_config):
+    results = {}
+    for schema in arguments.schemas:
+        keywords = template_config[schema][0]["keywords"] if schema in template_config else {}
+        for points in arguments.points:
+            content = make_content(schema, points, **keywords)
+            content_size = len(tk205.json_backends.dumps(content))
+            print(f"{schema}, {points} points ({content_size/2**20:.1f} MiB of JSON)")
+            prefix = f"{schema}/{points}"
+            for extension in arguments.formats:
+                file_path = os.path.join(directory, f"{schema}-{points}.{extension}")
+                record(results, f"{prefix}/dump.{extension}", lambda: tk205.dump(content, file_path), arguments.repeat, content_size, file_path)
+                if os.path.exists(file_path):
+                    record(results, f"{prefix}/load.{extension}", lambda: tk205.load(file_path), arguments.repeat, content_size)
+            record(results, f"{prefix}/validate", lambda: check_valid(content), arguments.repeat, content_size)
+        template_path = os.path.join(directory, f"{schema}-template.a205.xlsx")
+        record(results, f"{schema}/template", lambda: tk205.template(schema, template_path, **keywords), arguments.repeat)
+    return results
+
+def check_valid(content):
+    errors = tk205.validation.get_errors(content)
+    if errors:
+        raise Exception(f"Synthetic content is invalid: {errors[0]}")
+
+def compare(results, baseline, tolerance):
+    '''
+    Return descriptions of the cases that are slower, or use more memory, than the baseline.
+    '''
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None or "error" in previous:
+            continue
+        if "error" in result:
+            regressions.append(f"{name}: {result['error']}")
+            continue
+        for key, label in [("seconds", "time"), ("peak_mib", "peak memory")]:
+            if result[key] > previous[key]*(1 + tolerance) and result[key] - previous[key] > MIN_DIFFERENCES[key]:
+                regressions.append(f"{name}: {label} {result[key]:.3f} (baseline {previous[key]:.3f}, +{result[key]/previous[key] - 1:.0%})")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark translations of synthetic representations.")
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 10000], help="Grid points per performance map (one run per size)")
+    parser.add_argument("--schemas", nargs="+", default=SCHEMAS, choices=SCHEMAS)
+    parser.add_argument("--formats", nargs="+", default=FORMATS, choices=FORMATS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare the results with those of an earlier --output")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown (or memory growth) relative to the baseline")
+    arguments = parser.parse_args()
+
+    template_config = tk205.load(os.path.join(os.path.dirname(__file__), "..", "config", "templates.json"))
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_benchmarks(directory, arguments, template_config)
+    if arguments.output:
+        report = {
+            "environment": {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor()},
+            "arguments": vars(arguments),
+            "results": results}
+        with open(arguments.output, 'w') as output_file:
+            json.dump(report, output_file, indent=4)
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file)["results"], arguments.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {arguments.tolerance:.0%} of the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {arguments.tolerance:.0%} of the baseline.")
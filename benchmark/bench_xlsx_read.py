@@ -0,0 +1,77 @@
+'''
+Compare cell-by-cell and bulk column reading of a performance map worksheet, including
+bulk reading of a read-only (streamed) workbook.
+
+Usage: python benchmark/bench_xlsx_read.py [ROWS] [COLUMNS]
+'''
+import gc
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+import openpyxl
+from tk205.xlsx import A205XLSXTree
+
+def make_workbook(file_path, rows, columns):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "performance_map"
+    for column in range(1, columns + 1):
+        ws.cell(row=2, column=column).value = "lookup_variables"
+        ws.cell(row=3, column=column).value = f"variable_{column}"
+    for row in range(5, rows + 5):
+        for column in range(1, columns + 1):
+            ws.cell(row=row, column=column).value = row*0.5 + column
+    wb.save(file_path)
+
+def read_cell_by_cell(workbook, sheet, columns):
+    ws = workbook[sheet]
+    result = []
+    for column in range(1, columns + 1):
+        row = 5
+        value = []
+        while True:
+            item = ws.cell(row=row, column=column).value
+            if item is None:
+                break
+            value.append(item)
+            row += 1
+        result.append(value)
+    return result
+
+def read_bulk(workbook, sheet, columns):
+    tree = A205XLSXTree.__new__(A205XLSXTree)  # Reading does not need a schema
+    tree.workbook = workbook
+    tree.sheet_values = {}
+    return [tree.get_column_values(sheet, column, 5) for column in range(1, columns + 1)]
+
+def time_reader(reader, file_path, columns, read_only=False):
+    '''
+    Time loading the workbook and reading its columns, and measure the peak memory of both.
+    '''
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    workbook = openpyxl.load_workbook(file_path, read_only=read_only, data_only=read_only)
+    result = reader(workbook, "performance_map", columns)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    workbook.close()
+    return elapsed, peak, result
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "performance_map.xlsx")
+        make_workbook(file_path, rows, columns)
+        cell_time, cell_peak, cell_result = time_reader(read_cell_by_cell, file_path, columns)
+        bulk_time, bulk_peak, bulk_result = time_reader(read_bulk, file_path, columns)
+        read_only_time, read_only_peak, read_only_result = time_reader(read_bulk, file_path, columns, read_only=True)
+    assert cell_result == bulk_result == read_only_result
+    print(f"{rows} rows x {columns} columns (load + read)")
+    print(f"  cell-by-cell:     {cell_time:7.3f} s, peak {cell_peak/2**20:6.1f} MiB")
+    print(f"  bulk:             {bulk_time:7.3f} s, peak {bulk_peak/2**20:6.1f} MiB")
+    print(f"  bulk (read-only): {read_only_time:7.3f} s, peak {read_only_peak/2**20:6.1f} MiB")
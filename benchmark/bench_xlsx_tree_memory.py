@@ -0,0 +1,90 @@
+'''
+Measure the memory held by an A205XLSXTree built from content with deeply nested (embedded)
+data groups.
+
+With --baseline, the same measurement is also made with tk205 as of a git revision (e.g., the
+commit before a change to A205XLSXNode), so the two can be compared.
+
+Usage: python benchmark/bench_xlsx_tree_memory.py [DEPTH] [FIELDS] [--baseline REVISION]
+'''
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+def make_content(depth, fields):
+    '''
+    Content with `fields` scalar and array data elements per data group and two nested
+    representations per level (e.g., an RS0002 unit embedding RS0003/RS0004 representations).
+    '''
+    def make_group(level):
+        group = {f"field_{index}": index*0.5 for index in range(fields)}
+        group["array"] = [float(index) for index in range(fields)]
+        if level < depth:
+            group["fan_representation"] = make_group(level + 1)
+            group["motor_representation"] = make_group(level + 1)
+        return group
+    content = {"metadata": {"schema": "RS0002"}}
+    content.update(make_group(1))
+    return content
+
+def measure_tree(content):
+    from tk205.xlsx import A205XLSXTree
+    tree = A205XLSXTree()
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree.load(content)
+    lineages = list(iter_lineages(tree.root_node))  # Materialize every lineage (as writing does)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, current, len(lineages)
+
+def iter_lineages(node):
+    yield node.lineage
+    for child in node.children:
+        yield from iter_lineages(child)
+
+def measure_revision(revision, depth, fields):
+    '''
+    Run the measurement in a separate process, with tk205 extracted from a git revision.
+    '''
+    repository = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    with tempfile.TemporaryDirectory() as directory:
+        archive = subprocess.run(["git", "archive", revision, "tk205"], cwd=repository, capture_output=True, check=True).stdout
+        subprocess.run(["tar", "-x", "-C", directory], input=archive, check=True)
+        environment = dict(os.environ, PYTHONPATH=os.pathsep.join([directory] + sys.path))
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), str(depth), str(fields), "--json"],
+                                cwd=directory, env=environment, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+def print_result(label, result):
+    print(f"  {label:<9} {result['bytes']/2**20:6.1f} MiB ({result['bytes']/result['nodes']:5.0f} bytes/node), built in {result['seconds']:.3f} s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the memory held by an A205XLSXTree.")
+    parser.add_argument("depth", type=int, nargs="?", default=8)
+    parser.add_argument("fields", type=int, nargs="?", default=20)
+    parser.add_argument("--baseline", help="Also measure tk205 as of this git revision")
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)  # Used for baseline runs
+    arguments = parser.parse_args()
+    elapsed, current, nodes = measure_tree(make_content(arguments.depth, arguments.fields))
+    result = {"seconds": elapsed, "bytes": current, "nodes": nodes}
+    if arguments.json:
+        print(json.dumps(result))
+        sys.exit()
+    print(f"depth {arguments.depth}, {arguments.fields} fields per data group: {nodes} nodes")
+    if arguments.baseline:
+        baseline = measure_revision(arguments.baseline, arguments.depth, arguments.fields)
+        print_result("baseline:", baseline)
+        print_result("current:", result)
+        print(f"  change:   {result['bytes']/baseline['bytes'] - 1:+.0%} memory, {result['seconds']/baseline['seconds'] - 1:+.0%} time")
+    else:
+        print_result("tree:", result)
@@ -0,0 +1,37 @@
+'''
+Measure YAML translation throughput for large performance maps, compared with JSON.
+
+Content is synthetic RS0001 (chiller) and RS0004 (DX coil) representations (see synthetic.py) with
+about POINTS grid points in each performance map.
+
+Usage: python benchmark/bench_yaml.py [POINTS]
+'''
+import os
+import sys
+import time
+import tempfile
+import tk205
+from synthetic import make_content
+
+def time_translation(input_path, output_path):
+    start = time.perf_counter()
+    tk205.translate(input_path, output_path)
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    import yaml
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"PyYAML {yaml.__version__} (libyaml: {'yes' if yaml.__with_libyaml__ else 'no'})")
+    with tempfile.TemporaryDirectory() as directory:
+        for schema in ["RS0001", "RS0004"]:
+            content = make_content(schema, points)
+            paths = {extension: os.path.join(directory, f"{schema}.{extension}") for extension in ["json", "yaml"]}
+            tk205.dump(content, paths["json"])
+            size = os.path.getsize(paths["json"])/2**20
+            json_time = time_translation(paths["json"], os.path.join(directory, "copy.json"))
+            dump_time = time_translation(paths["json"], paths["yaml"])
+            load_time = time_translation(paths["yaml"], os.path.join(directory, "from_yaml.json"))
+            print(f"{schema}: {size:.1f} MiB of JSON")
+            print(f"  JSON -> JSON: {json_time:7.3f} s ({size/json_time:6.1f} MiB/s)")
+            print(f"  JSON -> YAML: {dump_time:7.3f} s ({size/dump_time:6.1f} MiB/s)")
+            print(f"  YAML -> JSON: {load_time:7.3f} s ({size/load_time:6.1f} MiB/s)")
@@ -0,0 +1,18 @@
+'''
+Synthetic representations shared by the benchmarks.
+
+Content is generated from the schemas by tk205.synthesis, so it is valid (validation benchmarks
+time normal validation, not error reporting) and shaped like real representations: each
+performance map has its representation's grid and lookup variables (e.g., six grid variables for
+RS0004 DX coils), and RS0002, RS0003 and RS0005 embed the representations of their components.
+'''
+import tk205
+
+SCHEMAS = ["RS0001", "RS0002", "RS0003", "RS0004", "RS0005", "RS0006"]
+
+def make_content(schema, points, seed=0, **keywords):
+    '''
+    Return a `schema` representation with about `points` grid points in each performance map (and
+    the alternatives selected by `keywords`, as for templates).
+    '''
+    return tk205.synthesis.Synthesizer(schema, points=points, seed=seed, **keywords).get_content()
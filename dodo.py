@@ -10,6 +10,7 @@ EXAMPLES_SOURCE_PATH = os.path.join("schema-205","examples")
 EXAMPLES_OUTPUT_PATH = os.path.join(BUILD_PATH,"examples")
 TEMPLATE_OUTPUT_PATH = os.path.join(BUILD_PATH,"templates")
 TEMPLATE_CONFIG = os.path.join('config','templates.json')
+TEMPLATE_CACHE_PATH = os.path.join(BUILD_PATH,"template-cache")
 LIB_BUILD_PATH = BUILD_PATH
 TK205_SOURCE_PATH = 'tk205'
 SCHEMA205_SOURCE_PATH = os.path.join("schema-205","schema205")
@@ -81,7 +82,7 @@ def task_translate_to_cbor():
     'targets': cbor_examples,
     'actions': [
       (create_folder, [CBOR_OUTPUT_PATH]),
-      (tk205.translate_directory, [EXAMPLES_SOURCE_PATH, CBOR_OUTPUT_PATH])
+      (tk205.translate_directory, [EXAMPLES_SOURCE_PATH, CBOR_OUTPUT_PATH], {'incremental': True})
       ],
     'clean': True
   }
@@ -98,7 +99,7 @@ def task_translate_to_yaml():
     'targets': yaml_examples,
     'actions': [
       (create_folder, [YAML_OUTPUT_PATH]),
-      (tk205.translate_directory, [EXAMPLES_SOURCE_PATH, YAML_OUTPUT_PATH])
+      (tk205.translate_directory, [EXAMPLES_SOURCE_PATH, YAML_OUTPUT_PATH], {'incremental': True})
       ],
     'clean': True
   }
@@ -115,7 +116,7 @@ def task_translate_to_xlsx():
     'targets': xlsx_examples,
     'actions': [
       (create_folder, [XLSX_OUTPUT_PATH]),
-      (tk205.translate_directory, [EXAMPLES_SOURCE_PATH, XLSX_OUTPUT_PATH])
+      (tk205.translate_directory, [EXAMPLES_SOURCE_PATH, XLSX_OUTPUT_PATH], {'incremental': True})
       ],
     'clean': True
   }
@@ -133,7 +134,7 @@ def task_translate_to_json():
     'task_dep': ['xlsx'],
     'actions': [
       (create_folder, [JSON_OUTPUT_PATH]),
-      (tk205.translate_directory, [XLSX_OUTPUT_PATH, JSON_OUTPUT_PATH])
+      (tk205.translate_directory, [XLSX_OUTPUT_PATH, JSON_OUTPUT_PATH], {'incremental': True})
       ],
     'clean': True
   }
@@ -149,7 +150,7 @@ def task_templates():
     'targets': template_files,
     'actions': [
       (create_folder, [TEMPLATE_OUTPUT_PATH]),
-      (tk205.generate_templates, [TEMPLATE_OUTPUT_PATH, template_config])
+      (tk205.generate_templates, [TEMPLATE_OUTPUT_PATH, template_config], {'jobs': None, 'cache': TEMPLATE_CACHE_PATH})
       ],
     'clean': True
   }
@@ -164,6 +165,17 @@ def task_test():
       ]
   }
 
+def task_benchmark():
+  '''Times translations of synthetic representations (not run by default)'''
+  return {
+    'task_dep': ['build_schema'],
+    'actions': [
+      (create_folder, [BUILD_PATH]),
+      f'python benchmark/bench_suite.py --output {os.path.join(BUILD_PATH, "benchmark.json")}'
+      ],
+    'verbosity': 2
+  }
+
 def task_web():
   '''Generates the web contents for data.ashrae.org'''
   return {
@@ -21,7 +21,7 @@ EXAMPLES_SOURCE_PATH = os.path.join("schema-205","examples")
 Process tests
 '''
 
-IGNORED_FILE_PATTERNS = [".DS_Store"]
+IGNORED_FILE_PATTERNS = [".DS_Store", tk205.manifest.MANIFEST_FILE_NAME]
 
 def collect_examples(example_dir):
     paths = []
@@ -62,4 +62,5 @@ product_paths, product_names = collect_examples(JSON_OUTPUT_PATH)
 paths = [(origin_paths[i], product_paths[i]) for i in range(len(origin_paths))]
 @pytest.mark.parametrize("origin, product",paths, ids=origin_names)
 def test_json_round_trip(origin, product):
-    assert(tk205.util.objects_near_equal(tk205.load(origin), tk205.load(product)))
\ No newline at end of file
+    comparison = tk205.util.compare_objects(tk205.load(origin), tk205.load(product), stop_at_first_difference=True)
+    assert comparison, str(comparison)
\ No newline at end of file
@@ -15,3 +15,535 @@ def test_objects_near_equal():
     # Dictionary
     assert(tk205.util.objects_near_equal({"this":[3.0]},{"this":[3.0001]},abs_tol=0.01))
     assert(not tk205.util.objects_near_equal({"this":[3.0]},{"not_this":[3.0001]},abs_tol=0.01))
+
+def test_compare_objects():
+    import pytest
+    np = pytest.importorskip("numpy")
+    values = [float(i) for i in range(100)]
+    content = {"performance_map": {"grid_variables": {"x": values}, "lookup_variables": {"y": [values, values]}}}
+    changed = {"performance_map": {"grid_variables": {"x": values[:5] + [5.01] + values[6:]}, "lookup_variables": {"y": [values, values[:-1] + [100.0]]}}}
+    assert(tk205.util.compare_objects(content, content))
+    comparison = tk205.util.compare_objects(content, changed)
+    assert(not comparison)
+    assert(comparison.path == ("performance_map", "grid_variables", "x", 5))
+    assert(tk205.util.format_path(comparison.path) == "performance_map.grid_variables.x[5]")
+    assert(np.isclose(comparison.max_abs_error, 1.0) and np.isclose(comparison.max_rel_error, 0.01))
+    assert(tk205.util.compare_objects(content, changed, rel_tol=0.02))
+
+    # Arrays compare with the (flattened) lists they were read from, and mixed lists still compare element-wise
+    assert(tk205.util.objects_near_equal(np.array(values).reshape(10, 10), values))
+    assert(tk205.util.compare_objects(values + ["a"], values + ["b"]).path == (100,))
+    assert(not tk205.util.objects_near_equal(values, values[:-1]))
+
+def test_diff(tmp_path):
+    import json, cbor2
+    values = [float(i) for i in range(100)]
+    old = {"metadata": {"schema": "RS0001", "version": 1, "description": "old"}, "performance_map": {"lookup_variables": {"y": values, "names": ["a", "b"]}}}
+    new = {"metadata": {"schema": "RS0001", "version": 2, "notes": "new"}, "performance_map": {"lookup_variables": {"y": values[:10] + [10.5, 11.1] + values[12:], "names": ["a", "b", "c"]}}}
+    (tmp_path / "old.json").write_text(json.dumps(old))
+    (tmp_path / "new.cbor").write_bytes(cbor2.dumps(new))
+    differences = tk205.diff(str(tmp_path / "old.json"), str(tmp_path / "new.cbor"))
+    assert([(difference.kind, tk205.util.format_path(difference.path)) for difference in differences] == [
+        ("changed", "metadata.version"),
+        ("removed", "metadata.description"),
+        ("added", "metadata.notes"),
+        ("array changed", "performance_map.lookup_variables.y"),
+        ("added", "performance_map.lookup_variables.names[2]")])
+    summary = differences[3].summary
+    assert(summary["points"] == 100 and summary["changed"] == 2 and summary["first"] == ("performance_map", "lookup_variables", "y", 10))
+    assert(abs(summary["max_abs_delta"] - 0.5) < 1e-12)
+    assert(len(tk205.differences.diff_objects(old["performance_map"], new["performance_map"], abs_tol=1.0)) == 1)
+    assert(tk205.differences.diff_objects(old, old) == [])
+
+def test_schema_registry():
+    schema = tk205.schemas.get_schema("RS0001")
+    assert(tk205.schemas.get_schema("RS0001") is schema)
+    assert(tk205.schemas.checkout_schema("RS0001") is not schema)
+    assert("RS0001" in tk205.preload_schemas())
+
+def test_streaming_translation():
+    import io, json, cbor2
+    content = {"metadata": {"schema": "RS0001"}, "performance_map": {"grid_variables": {"x": [1.0, 2.5, -3e-05]}, "lookup_variables": {"y": [1, 2, 3], "z": ["a", None, True]}}, "empty": [], "nested": [[0.5, {"a": -1}], {}]}
+    text = json.dumps(content, indent=4)
+    # Small chunks exercise values split across reads
+    events = list(tk205.streaming.iter_json_events(io.StringIO(text), chunk_size=3))
+    assert(tk205.streaming.build_content(events) == content)
+    json_output = io.StringIO()
+    tk205.streaming.write_json_events(iter(events), json_output)
+    assert(json_output.getvalue() == text)
+    cbor_output = io.BytesIO()
+    tk205.streaming.write_cbor_events(iter(events), cbor_output)
+    assert(cbor2.loads(cbor_output.getvalue()) == content)
+    assert(tk205.streaming.build_content(tk205.streaming.iter_cbor_events(io.BytesIO(cbor2.dumps(content)))) == content)
+
+def test_performance_map_arrays():
+    import pytest
+    np = pytest.importorskip("numpy")
+    content = {"performance_map": {"grid_variables": {"x": [1.0, 2.0], "y": [0.0, 1.0, 2.0]}, "lookup_variables": {"z": [0, 1, 2, 3, 4, 5], "w": ["a", "b", "c", "d", "e", "f"]}}}
+    tk205.performance.performance_maps_to_arrays(content)
+    performance_map = content["performance_map"]
+    assert(performance_map["grid_variables"]["x"].dtype == np.float64)
+    assert(performance_map["lookup_variables"]["z"].shape == (2, 3) and performance_map["lookup_variables"]["z"].dtype.kind == 'i')
+    assert(performance_map["lookup_variables"]["z"][1, 0] == 3.0)
+    assert(performance_map["lookup_variables"]["w"] == ["a", "b", "c", "d", "e", "f"])
+    assert(tk205.util.objects_near_equal(performance_map["lookup_variables"]["z"], [0, 1, 2, 3, 4, 5.0000001], rel_tol=1e-6))
+    assert(tk205.performance.arrays_to_lists(content)["performance_map"]["lookup_variables"]["z"] == [0, 1, 2, 3, 4, 5])
+    interpolator = tk205.performance.PerformanceMap(performance_map["grid_variables"], {"z": performance_map["lookup_variables"]["z"]})
+    assert(np.isclose(interpolator([1.5, 1.0])[0], 2.5))
+
+def test_performance_map_interpolation():
+    import pytest
+    np = pytest.importorskip("numpy")
+    x = [0.0, 1.0, 2.0, 3.0]
+    y = [0.0, 2.0, 5.0]
+    performance_map = {"grid_variables": {"x": x, "y": y}, "lookup_variables": {"linear": [2*i + 3*j for i in x for j in y], "quadratic": [i*i for i in x for j in y]}}
+    interpolator = tk205.performance.PerformanceMap.from_content(performance_map)
+    points = np.array([[0.5, 1.0], [2.5, 4.0], [3.0, 5.0]])
+    assert(np.allclose(interpolator(points)[:, 0], 2*points[:, 0] + 3*points[:, 1]))
+    interpolator.set_method("cubic")
+    # Cubic Hermite with central-difference slopes is exact for quadratics in interior intervals of a uniform axis
+    assert(np.isclose(interpolator([1.5, 1.0])[1], 2.25))
+    assert(np.allclose(interpolator([4.0, 1.0]), interpolator([3.0, 1.0])))
+    interpolator.set_extrapolation("linear")
+    assert(np.isclose(interpolator([4.0, 1.0])[0], 11.0))
+    interpolator.set_extrapolation("nan")
+    assert(np.isnan(interpolator([[4.0, 1.0], [1.0, 1.0]])[0]).all())
+    interpolator.set_extrapolation("error")
+    with pytest.raises(Exception):
+        interpolator([4.0, 1.0])
+
+def test_binary_format(tmp_path):
+    import pytest
+    np = pytest.importorskip("numpy")
+    content = {"metadata": {"schema": "RS0001"}, "performance_map": {"grid_variables": {"x": [1.0, 2.0], "y": [0.0, 1.0, 2.0]}, "lookup_variables": {"z": [0, 1, 2, 3, 4, 5]}}, "notes": ["a", 1]}
+    file_path = str(tmp_path / "example.a205bin")
+    tk205.file_io.dump(content, file_path)
+    with open(file_path, 'rb') as input_file:
+        header = tk205.binary.read_header(input_file)
+    assert(all(descriptor["offset"] % tk205.binary.ALIGNMENT == 0 for descriptor in header["arrays"]))
+    mapped = tk205.load(file_path, arrays=True)
+    lookup = mapped["performance_map"]["lookup_variables"]["z"]
+    assert(isinstance(lookup, np.memmap) and lookup.shape == (2, 3) and not lookup.flags.writeable)
+    assert(tk205.load(file_path) == content)
+    # Each array keeps its type (integers are not widened to floats)
+    assert(sorted(descriptor["dtype"] for descriptor in header["arrays"]) == ["<f8", "<f8", "<i8"])
+    loaded_lookup = tk205.load(file_path)["performance_map"]["lookup_variables"]["z"]
+    assert(lookup.dtype == np.int64 and all(type(value) is int for value in loaded_lookup))
+    arrays = {"x": np.array([1, 2], dtype=np.int32), "y": np.array([0.5, 1.5], dtype='>f4')}
+    tk205.file_io.dump({"values": arrays}, file_path)
+    loaded = tk205.load(file_path, arrays=True)["values"]
+    assert(loaded["x"].dtype == np.int32 and loaded["y"].dtype == np.dtype('<f4'))
+    assert(loaded["x"].tolist() == [1, 2] and loaded["y"].tolist() == [0.5, 1.5])
+
+def test_bytes_and_format_detection(tmp_path):
+    import pytest
+    content = {"metadata": {"schema": "RS0001"}, "performance_map": {"grid_variables": {"x": [1.0, 2.0]}, "lookup_variables": {"y": [0.5, -1.5]}}}
+    for file_format in ["json", "cbor", "yaml", "a205bin"]:
+        data = tk205.dump_bytes(content, file_format)
+        assert(tk205.file_io.detect_format(data) == f".{file_format}")
+        assert(tk205.load_bytes(data) == content)
+        # Files with no (or the wrong) extension are loaded by their content
+        (tmp_path / f"upload_{file_format}").write_bytes(data)
+        assert(tk205.load(str(tmp_path / f"upload_{file_format}")) == content)
+    assert(tk205.file_io.detect_format(b"PK\x03\x04") == ".xlsx")
+    assert(tk205.load_bytes(b"\xef\xbb\xbf{\"a\": 1}") == {"a": 1})
+    (tmp_path / "upload.txt").write_bytes(tk205.dump_bytes(content, "cbor"))
+    assert(tk205.load(str(tmp_path / "upload.txt"), file_format="cbor") == content)
+    with pytest.raises(Exception, match="Unrecognized"):
+        tk205.load_bytes(b"\0\0")
+
+def test_xlsx_bulk_reading(tmp_path):
+    import openpyxl
+    file_path = str(tmp_path / "sheet.xlsx")
+    workbook = openpyxl.Workbook()
+    worksheet = workbook.active
+    worksheet.title = "values"
+    rows = [["a", None, 1.5], [None], [2, 3, None, "d"], [4.0, None, 5]]
+    for row, values in enumerate(rows, start=1):
+        for column, value in enumerate(values, start=1):
+            worksheet.cell(row=row, column=column).value = value
+    worksheet.cell(row=7, column=6).value = None  # Styled but empty trailing cell
+    worksheet.cell(row=7, column=6).font = openpyxl.styles.Font(bold=True)
+    workbook.save(file_path)
+    for read_only in [False, True]:
+        # Bulk reading gives the same values as reading cell by cell
+        workbook = openpyxl.load_workbook(file_path, read_only=read_only, data_only=read_only)
+        tree = tk205.xlsx.A205XLSXTree()
+        tree.workbook = workbook
+        reference = openpyxl.load_workbook(file_path)["values"]
+        for row in range(1, 10):
+            for column in range(1, 9):
+                assert(tree.get_cell_value("values", row, column) == reference.cell(row=row, column=column).value)
+        for column in range(1, 9):
+            expected = []
+            row = 1
+            while reference.cell(row=row, column=column).value is not None:
+                expected.append(reference.cell(row=row, column=column).value)
+                row += 1
+            assert(tree.get_column_values("values", column, 1) == expected)
+        workbook.close()
+
+def test_xlsx_sheet_references(tmp_path):
+    import openpyxl
+    tk205.synthesize("RS0001", str(tmp_path / "references.json"), points=20, seed=1)
+    content = tk205.load(str(tmp_path / "references.json"))
+    tk205.dump(content, str(tmp_path / "references.xlsx"))
+    # Performance maps and arrays are written to their own sheets, each referenced once as "$sheet"
+    workbook = openpyxl.load_workbook(str(tmp_path / "references.xlsx"))
+    references = [cell.value for sheet in workbook for row in sheet.iter_rows() for cell in row
+                  if isinstance(cell.value, str) and cell.value.startswith("$")]
+    assert(workbook.sheetnames[0] == "RS0001")
+    assert(sorted(references) == sorted(f"${sheet}" for sheet in workbook.sheetnames[1:]))
+    assert("$performance_map_cooling" in references and "$performance_map_standby" in references)
+    assert(tk205.load(str(tmp_path / "references.xlsx")) == content)
+
+def test_xlsx_low_memory_loading(tmp_path):
+    import os
+    def is_open(file_path):
+        '''
+        True if this process holds the file open: by its descriptors where /proc lists them, and
+        otherwise by whether the file can be renamed (which Windows refuses for open files).
+        '''
+        if os.path.isdir("/proc/self/fd"):
+            paths = set()
+            for descriptor in os.listdir("/proc/self/fd"):
+                try:
+                    paths.add(os.readlink(os.path.join("/proc/self/fd", descriptor)))
+                except OSError:
+                    pass
+            return os.path.realpath(file_path) in paths
+        try:
+            os.replace(file_path, file_path + ".moved")
+        except OSError:
+            return True
+        os.replace(file_path + ".moved", file_path)
+        return False
+    tk205.synthesize("RS0001", str(tmp_path / "example.json"), points=50, seed=1)
+    example = tk205.load(str(tmp_path / "example.json"))
+    output = str(tmp_path / "example.xlsx")
+    tk205.dump(example, output)
+    content = tk205.load(output, low_memory=True)
+    assert(content == tk205.load(output))
+    assert(tk205.util.objects_near_equal(content, example))
+    # Read-only workbooks hold their file open until closed
+    tree = tk205.xlsx.A205XLSXTree().load_workbook(output, low_memory=True)
+    assert(tree.workbook.read_only and not is_open(output))
+
+def test_xlsx_writers(tmp_path):
+    import glob, os, openpyxl
+    def get_cells(file_path):
+        workbook = openpyxl.load_workbook(file_path)
+        return {sheet.title: {cell.coordinate: (cell.value, (cell.hyperlink.target, cell.hyperlink.location) if cell.hyperlink else None, cell.comment.text if cell.comment else None, cell.style)
+                              for row in sheet.iter_rows() for cell in row if cell.value is not None or cell.hyperlink or cell.comment}
+                for sheet in workbook}
+    examples = sorted(glob.glob(os.path.join("schema-205", "examples", "**", "*.json"), recursive=True))[:3]
+    for example in examples:
+        # The write-only (streaming) writer produces the same workbook as the random-access writer
+        tree = tk205.xlsx.A205XLSXTree()
+        tree.load(tk205.load(example))
+        tree.save(str(tmp_path / "random_access.xlsx"))
+        tree.save(str(tmp_path / "streamed.xlsx"), low_memory=True)
+        cells = get_cells(str(tmp_path / "random_access.xlsx"))
+        assert(cells == get_cells(str(tmp_path / "streamed.xlsx")))
+        assert(any(hyperlink for sheet in cells.values() for _, hyperlink, _, _ in sheet.values()))
+        assert(any(comment for sheet in cells.values() for _, _, comment, _ in sheet.values()))
+
+def test_json_styles(tmp_path):
+    import io, json, importlib.util
+    content = {"metadata": {"schema": "RS0001"}, "grid_variables": {"x": [1.0, 2.5, -3e-05]}, "names": ["a", "b"], "empty": [], "nested": [[1, 2], [3, {"y": 1}]]}
+    assert(tk205.json_backends.dumps(content, "indent") == json.dumps(content, indent=4).encode())
+    assert(tk205.json_backends.dumps(content, "compact", backend="json") == json.dumps(content, separators=(",", ":")).encode())
+    inline = tk205.json_backends.dumps(content, "arrays-inline", backend="json").decode()
+    assert('\n        "x": [1.0,2.5,-3e-05]\n' in inline and '\n        [1,2],\n' in inline)
+    for style in tk205.json_backends.JSON_STYLES:
+        for backend in ["json"] + (["orjson"] if importlib.util.find_spec("orjson") else []):
+            assert(tk205.json_backends.loads(tk205.json_backends.dumps(content, style, backend=backend), backend=backend) == content)
+        # Streamed translations are written identically (by the standard library's formatting)
+        output = io.StringIO()
+        tk205.streaming.write_json_events(tk205.streaming.iter_json_events(io.StringIO(json.dumps(content))), output, style=style)
+        assert(output.getvalue().encode() == tk205.json_backends.dumps(content, style, backend="json"))
+    # Non-finite numbers are read back as written by every backend (orjson alone would write null)
+    for backend in ["json"] + (["orjson"] if importlib.util.find_spec("orjson") else []):
+        loaded = tk205.json_backends.loads(tk205.json_backends.dumps({"x": [1.0, float("inf")], "y": None}, backend=backend), backend=backend)
+        assert(loaded == {"x": [1.0, float("inf")], "y": None})
+    (tmp_path / "input.json").write_text(json.dumps(content, indent=4))
+    tk205.translate(str(tmp_path / "input.json"), str(tmp_path / "output.json"), json_style="compact")
+    assert("\n" not in (tmp_path / "output.json").read_text())
+    assert(tk205.load(str(tmp_path / "output.json")) == content)
+
+def test_yaml_format():
+    content = {"grid_variables": {"x": [1.0, 2.5, -3e-05]}, "names": ["a", "b"], "empty": []}
+    text = tk205.dump_bytes(content, "yaml").decode()
+    assert("x: [1.0, 2.5, -3.0e-05]" in text)
+    assert("- a" in text)
+    assert(tk205.load_bytes(text.encode(), "yaml") == content)
+
+def test_parallel_translation(tmp_path):
+    import json, pytest
+    source_dir = tmp_path / "source"
+    output_dir = tmp_path / "output" / "cbor"
+    (source_dir / "sub").mkdir(parents=True)
+    output_dir.mkdir(parents=True)
+    for name in ["a.json", "b.json", "sub/c.json"]:
+        (source_dir / name).write_text(json.dumps({"value": name}))
+    (source_dir / "sub" / "invalid.json").write_text("{")
+    with pytest.raises(Exception, match="Failed to translate 1 of 4 files(.|\n)*invalid.json"):
+        tk205.translate_directory(str(source_dir), str(output_dir), jobs=2)
+    # The other files are still translated
+    for name in ["a", "b", "sub/c"]:
+        assert(tk205.load(str(output_dir / f"{name}.cbor")) == {"value": f"{name}.json"})
+    assert(not (output_dir / "sub" / "invalid.cbor").exists())
+
+def test_incremental_translation(tmp_path):
+    import json, os
+    source_dir = tmp_path / "source"
+    output_dir = tmp_path / "output" / "json"
+    (source_dir / "sub").mkdir(parents=True)
+    output_dir.mkdir(parents=True)
+    for name in ["a.json", os.path.join("sub", "b.json")]:
+        (source_dir / name).write_text(json.dumps({"value": name}))
+    tk205.translate_directory(str(source_dir), str(output_dir), incremental=True)
+    manifest = tk205.manifest.TranslationManifest(str(output_dir))
+    assert(sorted(manifest.outputs) == ["a.json", "sub/b.json"])
+    assert(manifest.is_current(str(source_dir / "a.json"), str(output_dir / "a.json")))
+
+    # Touching a file without changing it keeps its output current
+    os.utime(source_dir / "a.json", ns=(0, 0))
+    assert(manifest.is_current(str(source_dir / "a.json"), str(output_dir / "a.json")))
+    (source_dir / "a.json").write_text(json.dumps({"value": "changed"}))
+    assert(not manifest.is_current(str(source_dir / "a.json"), str(output_dir / "a.json")))
+
+    # Stale outputs are rebuilt and orphaned outputs removed
+    (source_dir / "sub" / "b.json").unlink()
+    tk205.translate_directory(str(source_dir), str(output_dir), incremental=True)
+    assert(json.loads((output_dir / "a.json").read_text()) == {"value": "changed"})
+    assert(not (output_dir / "sub" / "b.json").exists())
+    assert(sorted(tk205.manifest.TranslationManifest(str(output_dir)).outputs) == ["a.json"])
+
+def test_translator_reuse(tmp_path):
+    import glob, os
+    tree = tk205.xlsx.A205XLSXTree()
+    assert(tree._schema is None) # No schema is loaded until one is needed
+    tree.set_schema_type("RS0001")
+    assert(tree.schema is tk205.schemas.get_schema("RS0001"))
+
+    translator = tk205.Translator()
+    examples = sorted(glob.glob(os.path.join("schema-205", "examples", "**", "*.json"), recursive=True))[:3]
+    for example in examples:
+        output = str(tmp_path / (os.path.basename(example) + ".xlsx"))
+        translator.translate(example, output)
+        assert(translator.tree.schema is tk205.schemas.get_schema(translator.tree.schema_type))
+        assert(tk205.util.objects_near_equal(translator.load(output), tk205.load(example)))
+
+def test_schema_node_cache():
+    tree = tk205.xlsx.A205XLSXTree()
+    tree.set_schema_type("RS0001")
+    schema_node = tree.get_schema_node(["metadata"], [None])
+    assert(tree.get_schema_node(["metadata"], [None]) is schema_node)
+    assert((("metadata",), (None,)) in tree.schema_nodes)
+    tree.set_schema_type("RS0002")
+    assert(len(tree.schema_nodes) == 0)
+
+def test_template_cache(tmp_path):
+    import os
+    cache = tk205.template_cache.TemplateCache(str(tmp_path / "cache"))
+    config = {"RS0001": [{"keywords": {}, "file-name-suffix": None}]}
+    output_dir = tmp_path / "templates"
+    output_dir.mkdir()
+    tk205.generate_templates(str(output_dir), config, cache=cache)
+    key = cache.get_key("RS0001", {})
+    assert(cache.get(key) == (output_dir / "RS0001-template.a205.xlsx").read_bytes())
+    # Cached templates are returned without being regenerated
+    os.utime(cache.get_path(key), ns=(0, 0))
+    assert(tk205.get_template("RS0001", cache=cache) == cache.get(key))
+    assert(os.stat(cache.get_path(key)).st_mtime_ns == 0)
+    assert(cache.get_key("RS0001", {"operation_speed_control_type": "DISCRETE"}) != key)
+
+def test_keyword_arguments():
+    import pytest
+    # Shared by the CLI and the client, so template keywords are parsed the same by both
+    assert(tk205.util.get_keyword_arguments(["--notes=a=b", "--operation_speed_control_type", "DISCRETE", "-k", "-1"]) ==
+           {"notes": "a=b", "operation_speed_control_type": "DISCRETE", "k": "-1"})
+    with pytest.raises(Exception, match="No value given"):
+        tk205.util.get_keyword_arguments(["--notes"])
+
+def test_server(tmp_path):
+    import json, threading, pytest
+    import tk205.server, tk205.client
+    server = tk205.server.create_server(port=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        address = f"127.0.0.1:{server.server_address[1]}"
+        assert(tk205.client.request("ping", address)["pid"] > 0)
+        source = tmp_path / "source.json"
+        source.write_text(json.dumps({"value": [1.0, 2.0]}))
+        tk205.client.translate(str(source), str(tmp_path / "output.yaml"), address=address)
+        assert(tk205.load(str(tmp_path / "output.yaml")) == {"value": [1.0, 2.0]})
+        with pytest.raises(Exception, match="FileNotFoundError"):
+            tk205.client.translate(str(tmp_path / "missing.json"), str(tmp_path / "output.cbor"), address=address)
+        # Client and server check parameters against the same definitions
+        with pytest.raises(Exception, match="Unknown parameters of \"validate\": low_memory"):
+            tk205.client.request("validate", address, input=str(source), low_memory=True)
+        connection = tk205.client.connect(address)
+        connection.request("POST", "/translate", body=json.dumps({"input": str(source)}), headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        assert(response.status == 400 and "Missing parameters of \"translate\": output" in json.loads(response.read())["error"])
+        connection.close()
+        # Requests that web pages can send (other content types, an Origin, or a rebound Host) are refused
+        for headers, status in [({"Content-Type": "text/plain"}, 415), ({"Content-Type": "application/json", "Origin": "https://example.com"}, 403),
+                                ({"Content-Type": "application/json", "Host": "attacker.example.com"}, 403)]:
+            connection = tk205.client.connect(address)
+            connection.request("POST", "/shutdown", body="{}", headers=headers)
+            assert(connection.getresponse().status == status)
+            connection.close()
+        assert(tk205.client.request("ping", address)["pid"] > 0)
+        tk205.client.request("shutdown", address)
+    finally:
+        if thread.is_alive():
+            server.shutdown()
+        thread.join(timeout=10)
+        server.server_close()
+
+def test_validation_messages():
+    import types, pytest
+    jsonschema = pytest.importorskip("jsonschema")
+    schema = {"type": "object", "properties": {
+        "values": {"type": "array", "items": {"type": "number"}},
+        "map": {"oneOf": [{"type": "object", "properties": {"a": {"type": "number"}}, "required": ["a"]}, {"type": "string"}]},
+        "other": {"oneOf": [{"type": "number"}, {"type": "string"}]}}}
+    validator = types.SimpleNamespace(validator=jsonschema.Draft7Validator(schema))
+    contents = {"values": [0, 0, "x", 0, 0, 0, 0, 0, 0, 0, "y"], "map": {"a": "text"}, "other": []}
+    messages = tk205.validation.get_schema_errors(validator, contents)
+    # A failed oneOf is explained by the error within the intended alternative, where there is one,
+    # and errors are in content order (indices numerically)
+    assert(messages == ["'text' is not of type 'number' (map.a)", "[] is not valid under any of the given schemas (other)",
+                        "'x' is not of type 'number' (values.2)", "'y' is not of type 'number' (values.10)"])
+
+def test_batch_validation(tmp_path):
+    import glob, json
+    import xml.etree.ElementTree as ElementTree
+    import tk205.validation
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "malformed.json").write_text("{")
+    (tmp_path / "no_metadata.json").write_text(json.dumps({"value": 1.0}))
+    examples = sorted(glob.glob("schema-205/examples/**/*.json", recursive=True))[:1]
+    file_paths = tk205.validation.collect_files([str(tmp_path)] + examples)
+    assert(len(file_paths) == 2 + len(examples))
+    results = tk205.validation.validate_files(file_paths, jobs=2)
+    assert([result["file"] for result in results] == file_paths)
+    invalid = {result["file"] for result in results if not result["valid"]}
+    assert(invalid == {str(tmp_path / "no_metadata.json"), str(tmp_path / "sub" / "malformed.json")})
+    assert(all(len(result["errors"]) > 0 for result in results if not result["valid"]))
+    # tk205.validate reports the same errors, by raising
+    for result in results:
+        try:
+            tk205.validate(result["file"])
+            assert(result["valid"])
+        except Exception as e:
+            assert(not result["valid"] and all(error in str(e) for error in result["errors"] if "Error:" not in error))
+
+    tk205.validation.write_json_report(results, str(tmp_path / "report.json"))
+    assert(json.loads((tmp_path / "report.json").read_text())["failures"] == 2)
+    tk205.validation.write_junit_report(results, str(tmp_path / "report.xml"))
+    suite = ElementTree.parse(str(tmp_path / "report.xml")).getroot()
+    assert(suite.get("tests") == str(len(results)) and len(suite.findall("testcase/failure")) == 2)
+
+def test_profiling(tmp_path):
+    import json
+    (tmp_path / "input.json").write_text(json.dumps({"value": [1.0, 2.0]}))
+    tk205.translate(str(tmp_path / "input.json"), str(tmp_path / "unprofiled.cbor"))
+    assert(tk205.profiling.get_active_profile() is None)
+    with tk205.profiling.profile() as outer:
+        with tk205.profiling.profile() as collected:
+            tk205.translate(str(tmp_path / "input.json"), str(tmp_path / "output.cbor"))
+    assert(collected.timers["load.json"][1] == 1 and collected.timers["dump.cbor"][1] == 1)
+    assert(collected.counters["bytes_in"] == (tmp_path / "input.json").stat().st_size)
+    assert(collected.counters["bytes_out"] == (tmp_path / "output.cbor").stat().st_size)
+    assert(json.loads(json.dumps(collected.to_dict())) == collected.to_dict())
+    assert("load.json" in collected.format())
+    # Nested profiles are also counted in the enclosing one
+    assert(outer.counters == collected.counters)
+    assert(tk205.profiling.get_active_profile() is None)
+    # Each thread collects its own profile, and map_profiled merges those of its calls
+    import threading, concurrent.futures
+    def count_calls(amount):
+        for _ in range(amount):
+            tk205.profiling.count("calls")
+        return amount
+    profiles = {}
+    def run_thread(index):
+        with tk205.profiling.profile() as thread_profile:
+            count_calls(1000*(index + 1))
+        profiles[index] = thread_profile
+    threads = [threading.Thread(target=run_thread, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert([profiles[index].counters["calls"] for index in range(4)] == [1000, 2000, 3000, 4000])
+    with tk205.profiling.profile() as collected:
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            assert(tk205.profiling.map_profiled(executor, count_calls, [1000]*8) == [1000]*8)
+    assert(collected.counters["calls"] == 8000)
+
+def test_synthesis(tmp_path):
+    import math
+    options = {"points": 200, "grid_points": {"compressor_sequence_number": 2}, "seed": 1}
+    tk205.synthesize("RS0001", str(tmp_path / "synthetic.json"), **options)
+    content = tk205.load(str(tmp_path / "synthetic.json"))
+    assert(content == tk205.synthesis.Synthesizer("RS0001", **options).get_content())
+    assert(tk205.validation.get_errors(content) == [])
+    assert(content["metadata"]["schema"] == "RS0001")
+    performance_map = content["performance"]["performance_map_cooling"]
+    grid_variables = performance_map["grid_variables"]
+    assert(sorted(grid_variables) == sorted(["evaporator_liquid_volumetric_flow_rate", "evaporator_liquid_leaving_temperature",
+                                             "condenser_liquid_volumetric_flow_rate", "condenser_liquid_entering_temperature", "compressor_sequence_number"]))
+    # The other four grid variables share the remaining points: round((200/2)**(1/4)) = 3 each
+    assert(grid_variables["compressor_sequence_number"] == [1, 2])
+    assert(all(len(values) == 3 for name, values in grid_variables.items() if name != "compressor_sequence_number"))
+    temperatures = grid_variables["evaporator_liquid_leaving_temperature"]
+    assert(temperatures == sorted(temperatures) and 273.15 <= temperatures[0] < temperatures[-1] <= 323.15)
+    size = math.prod(len(values) for values in grid_variables.values())
+    assert(size == 2*3**4 and all(len(values) == size for values in performance_map["lookup_variables"].values()))
+    standby_map = content["performance"]["performance_map_standby"]
+    assert(len(standby_map["lookup_variables"]["input_power"]) == len(standby_map["grid_variables"]["environment_dry_bulb_temperature"]))
+    # Streamed and built content are written the same in every format
+    tk205.synthesize("RS0001", str(tmp_path / "synthetic.cbor"), **options)
+    assert(tk205.load(str(tmp_path / "synthetic.cbor")) == content)
+    # Required data elements alone (including those required under conditions) are still valid
+    required_only = tk205.synthesis.Synthesizer("RS0001", optional=False, seed=1).get_content()
+    assert(tk205.validation.get_errors(required_only) == [])
+    assert(set(required_only["metadata"]) < set(content["metadata"]))
+
+IMPORT_TIME_BUDGET = 1.0 # "import tk205" relative to the interpreter's startup imports ("site"), in the same run
+
+def test_import_time():
+    import os, sys, subprocess
+    def import_times(code):
+        '''
+        Return the cumulative import time of each module imported, in seconds (from "python -X importtime").
+        '''
+        environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=environment, check=True)
+        times = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, name = line[len("import time:"):].split("|")
+                if cumulative.strip().isdigit():
+                    times[name.strip()] = int(cumulative)*1e-6
+        return times
+    # Absolute times vary between machines, so tk205's import is timed against the interpreter's own
+    # startup (best of three runs, against noise)
+    ratios = []
+    for _ in range(3):
+        times = import_times("import tk205")
+        ratios.append(times["tk205"]/times["site"])
+    assert(min(ratios) < IMPORT_TIME_BUDGET)
+    heavy_modules = ["openpyxl", "cbor2", "yaml", "numpy", "schema205", "jsonschema"]
+    assert(not any(module in times for module in heavy_modules))
+    # The CLI and a JSON -> CBOR translation only load what they use
+    times = import_times("import tk205.cli")
+    assert(not any(module in times for module in heavy_modules))
+    times = import_times("import tk205, tempfile, os; d = tempfile.mkdtemp(); open(os.path.join(d, 'a.json'), 'w').write('{}'); tk205.translate(os.path.join(d, 'a.json'), os.path.join(d, 'a.cbor'))")
+    assert("cbor2" in times and not any(module in times for module in ["openpyxl", "yaml", "numpy", "schema205"]))
@@ -1,11 +1,59 @@
 # Imports
-from .file_io import translate, translate_directory_recursive, translate_directory, load
-from .xlsx import template, generate_templates
-from schema205 import A205Schema
-from .util import objects_near_equal
-import os
+#
+# The public API is imported from its module on first use, so that importing tk205 (e.g., for the
+# CLI) does not load openpyxl, cbor2, PyYAML, NumPy or schema205 until they are needed.
+import importlib
+
+_exports = {
+    'translate': 'file_io',
+    'translate_directory_recursive': 'file_io',
+    'translate_directory': 'file_io',
+    'load': 'file_io',
+    'dump': 'file_io',
+    'load_bytes': 'file_io',
+    'dump_bytes': 'file_io',
+    'Translator': 'file_io',
+    'template': 'xlsx',
+    'generate_templates': 'xlsx',
+    'get_template': 'xlsx',
+    'get_schema': 'schemas',
+    'preload_schemas': 'schemas',
+    'objects_near_equal': 'util',
+    'compare_objects': 'util',
+    'diff': 'differences',
+    'synthesize': 'synthesis',
+    'PerformanceMap': 'performance',
+    'interpolate': 'performance',
+}
+
+__all__ = list(_exports) + ['validate']
+
+def __getattr__(name):
+    if name in _exports:
+        value = getattr(importlib.import_module(f'.{_exports[name]}', __name__), name)
+    else:
+        # Submodules (e.g., tk205.util) are also imported on first use
+        try:
+            value = importlib.import_module(f'.{name}', __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f'{__name__}.{name}':
+                raise
+            raise AttributeError(f"module '{__name__}' has no attribute '{name}'") from None
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
 def validate(file_path):
-    contents = load(file_path)
-    a205schema = A205Schema(os.path.join(os.path.dirname(__file__),'..','schema-205','build','schema',f"{contents['metadata']['schema']}.schema.json"))
-    a205schema.validate(contents)
+    '''
+    Validate a file against the schema named in its metadata, raising an exception listing every
+    error if it is invalid (see validation.get_errors).
+    '''
+    from .file_io import load
+    from .validation import get_errors
+    errors = get_errors(load(file_path))
+    if errors:
+        messages = '\n  '.join(f"{index}. {error}" for index, error in enumerate(errors, start=1))
+        raise Exception(f"Validation failed for {file_path} with {len(errors)} errors:\n  {messages}")
+    print(f"Validation successful for {file_path}")
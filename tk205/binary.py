@@ -0,0 +1,175 @@
+'''
+Memory-mappable binary representation format (".a205bin").
+
+Layout (all integers little-endian):
+
+  magic             8 bytes, b"A205BIN\\0"
+  header length     uint64
+  header            UTF-8 JSON
+  array blocks      little-endian, C order, each starting on a 64-byte boundary
+
+The header holds the representation content with every array replaced by {"$a205_array": index}
+and a list of array descriptors ({"offset", "shape", "dtype"}, with offsets from the start of the
+file). Arrays keep their numeric type (e.g., integer grid variables such as compressor sequence
+numbers are stored as int64, not float64), which is recorded as a NumPy dtype string.
+
+Performance map grid and lookup variables are always stored as arrays (lookup variables in the grid
+shape, see performance_maps_to_arrays), so loading maps them directly from the file without
+parsing: processes loading the same file share the operating system's page cache rather than each
+holding a private copy.
+'''
+import os
+import json
+import struct
+from .util import open_file, is_array
+from .performance import np, require_numpy, is_performance_map, is_numeric, get_grid_shape
+
+MAGIC = b"A205BIN\0"
+VERSION = 1
+ALIGNMENT = 64
+ARRAY_KEY = "$a205_array"
+DTYPE = '<f8'  # For arrays that are not numeric
+HEADER_LENGTH = struct.Struct('<Q')
+
+
+def align(offset):
+    return -(-offset//ALIGNMENT)*ALIGNMENT
+
+
+def to_array(values):
+    '''
+    Return values as a contiguous little-endian array of their own numeric type.
+    '''
+    array = np.asarray(values)
+    dtype = array.dtype.newbyteorder('<') if array.dtype.kind in 'biuf' else DTYPE
+    return np.ascontiguousarray(array, dtype=dtype)
+
+
+def encode_content(content, arrays):
+    '''
+    Return the JSON-able header content, appending arrays (and their placeholders) to `arrays`.
+    '''
+    if is_array(content):
+        arrays.append(to_array(content))
+        return {ARRAY_KEY: len(arrays) - 1}
+    elif isinstance(content, dict):
+        encoded = {}
+        for name, value in content.items():
+            if is_performance_map(name, value):
+                value = encode_performance_map(value)
+            encoded[name] = encode_content(value, arrays)
+        return encoded
+    elif isinstance(content, list):
+        return [encode_content(item, arrays) for item in content]
+    return content
+
+
+def encode_performance_map(performance_map):
+    '''
+    Return a shallow copy of the performance map with numeric variables as arrays.
+    '''
+    performance_map = dict(performance_map)
+    grid_variables = {}
+    for name, values in performance_map['grid_variables'].items():
+        grid_variables[name] = values if is_array(values) or not is_numeric(values) else to_array(values)
+    performance_map['grid_variables'] = grid_variables
+    shape = get_grid_shape(performance_map)
+    size = int(np.prod(shape))
+    lookup_variables = {}
+    for name, values in performance_map['lookup_variables'].items():
+        if is_array(values):
+            values = values.reshape(shape) if values.size == size else values
+        elif len(values) == size and is_numeric(values):
+            values = to_array(values).reshape(shape)
+        lookup_variables[name] = values
+    performance_map['lookup_variables'] = lookup_variables
+    return performance_map
+
+
+def decode_content(content, arrays):
+    if isinstance(content, dict):
+        if len(content) == 1 and ARRAY_KEY in content:
+            return arrays[content[ARRAY_KEY]]
+        return {name: decode_content(value, arrays) for name, value in content.items()}
+    elif isinstance(content, list):
+        return [decode_content(item, arrays) for item in content]
+    return content
+
+
+def dump_binary(content, output_file_path):
+    '''
+    Write representation content (with lists or NumPy arrays) to an ".a205bin" file (or a binary
+    file object).
+    '''
+    require_numpy()
+    arrays = []
+    encoded = encode_content(content, arrays)
+    # Offsets depend on the header length, which depends on the offsets: reserve room for the
+    # widest offsets (20 digits) and pad the header out to the first array
+    descriptors = [{"offset": 0, "shape": list(array.shape), "dtype": array.dtype.str} for array in arrays]
+    header = {"version": VERSION, "arrays": descriptors, "content": encoded}
+    offset = align(len(MAGIC) + HEADER_LENGTH.size + len(json.dumps(header).encode()) + 20*len(arrays))
+    for descriptor, array in zip(descriptors, arrays):
+        descriptor["offset"] = offset
+        offset = align(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode()
+    with open_file(output_file_path, 'wb') as output_file:
+        start = output_file.tell()
+        output_file.write(MAGIC)
+        output_file.write(HEADER_LENGTH.pack(len(header_bytes)))
+        output_file.write(header_bytes)
+        for descriptor, array in zip(descriptors, arrays):
+            output_file.write(b'\0'*(start + descriptor["offset"] - output_file.tell()))
+            output_file.write(memoryview(array).cast('B'))
+
+
+def read_header(input_file):
+    name = getattr(input_file, 'name', '<bytes>')
+    if input_file.read(len(MAGIC)) != MAGIC:
+        raise Exception(f"\"{name}\" is not an a205bin file.")
+    header_length = HEADER_LENGTH.unpack(input_file.read(HEADER_LENGTH.size))[0]
+    header = json.loads(input_file.read(header_length))
+    if header["version"] > VERSION:
+        raise Exception(f"Unsupported a205bin version {header['version']} in \"{name}\".")
+    return header
+
+
+def load_binary(input_file_path, mmap=True):
+    '''
+    Load representation content from an ".a205bin" file (or a binary file object).
+
+    mmap:
+      map arrays read-only from the file (zero-copy) rather than reading them into memory. File
+      objects are always read.
+    '''
+    require_numpy()
+    if not isinstance(input_file_path, (str, os.PathLike)):
+        return load_binary_file(input_file_path)
+    with open(input_file_path, 'rb') as input_file:
+        header = read_header(input_file)
+        arrays = []
+        if mmap and header["arrays"]:
+            # One read-only mapping of the file; arrays are views into it
+            buffer = np.memmap(input_file_path, dtype=np.uint8, mode='r')
+        for descriptor in header["arrays"]:
+            shape = tuple(descriptor["shape"])
+            count = int(np.prod(shape))
+            if mmap:
+                offset = descriptor["offset"]
+                arrays.append(buffer[offset:offset + count*np.dtype(descriptor["dtype"]).itemsize].view(descriptor["dtype"]).reshape(shape))
+            else:
+                input_file.seek(descriptor["offset"])
+                arrays.append(np.fromfile(input_file, dtype=descriptor["dtype"], count=count).reshape(shape))
+    return decode_content(header["content"], arrays)
+
+
+def load_binary_file(input_file):
+    start = input_file.tell()
+    header = read_header(input_file)
+    arrays = []
+    for descriptor in header["arrays"]:
+        shape = tuple(descriptor["shape"])
+        dtype = np.dtype(descriptor["dtype"])
+        input_file.seek(start + descriptor["offset"])
+        arrays.append(np.frombuffer(input_file.read(int(np.prod(shape))*dtype.itemsize), dtype=dtype).reshape(shape))
+    return decode_content(header["content"], arrays)
@@ -1,5 +1,7 @@
 import tk205
 import click
+import os
+import json
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
@@ -8,20 +10,42 @@ def print_version():
 
 @click.group(context_settings=CONTEXT_SETTINGS)
 @click.version_option(None,'-v','--version')
-def cli():
+@click.option('--profile', 'show_profile', help="Print the time spent in each phase, and counters (e.g., cells written), when the command finishes.", is_flag=True)
+@click.option('--profile-json', help="Write the profile as JSON to this path.", type=click.Path())
+@click.option('--cprofile', help="Also run cProfile, and write its statistics to this path (for pstats or snakeviz).", type=click.Path())
+@click.pass_context
+def cli(ctx, show_profile, profile_json, cprofile):
     """tk205.
 
     ASHRAE 205 Representation Specification Toolkit.
     """
+    if show_profile or profile_json or cprofile:
+        collected = ctx.with_resource(tk205.profiling.profile(cprofile))
+        def report():
+            if show_profile:
+                click.echo(collected.format(), err=True)
+            if profile_json:
+                collected.write_json(profile_json)
+        ctx.call_on_close(report)
 
 # Translate
 short_help_text = "Translate a representation specification between file formats."
-help_text = short_help_text
+help_text = "\n\n".join([short_help_text,
+    "If the input is a directory, every file within it is translated into the output directory (which is cleared first, unless --incremental is used). The output format is taken from the name of the output directory (e.g., \"build/cbor\")."
+    ])
 @cli.command('translate', short_help=short_help_text, help=help_text)
-@click.option('-i', '--input', help="Input file with extension.", type=click.File(mode='r', encoding=None, errors='strict', lazy=None, atomic=False), required=True)
-@click.option('-o', '--output', help="Output file with extension.",  type=click.File(mode='w', encoding=None, errors='strict', lazy=None, atomic=False), required=True)
-def translate(input, output):
-    tk205.translate(input.name, output.name)
+@click.option('-i', '--input', help="Input file (or directory) with extension.", type=click.Path(exists=True), required=True)
+@click.option('-o', '--output', help="Output file (or directory) with extension.",  type=click.Path(), required=True)
+@click.option('-j', '--jobs', help="Number of parallel processes used when translating a directory.", type=click.IntRange(min=1), default=1, show_default=True)
+@click.option('--low-memory', help="Stream JSON/CBOR translations and use the read-only/write-only XLSX modes to limit memory use.", is_flag=True)
+@click.option('--incremental', help="When translating a directory, only translate new or changed files (tracked in a manifest in the output directory) and remove outputs whose sources were deleted.", is_flag=True)
+@click.option('--json-style', help="Style of JSON output: indented, compact (no whitespace), or indented with each numeric array on one line.", type=click.Choice(['indent', 'compact', 'arrays-inline']), default='indent', show_default=True)
+def translate(input, output, jobs, low_memory, incremental, json_style):
+    if os.path.isdir(input):
+        os.makedirs(output, exist_ok=True)
+        tk205.translate_directory(input, output, jobs=jobs, low_memory=low_memory, incremental=incremental, json_style=json_style)
+    else:
+        tk205.translate(input, output, low_memory=low_memory, json_style=json_style)
 
 # Report
 short_help_text = "Create human-readable report based on input representation."
@@ -52,33 +76,114 @@ help_text = "\n\n".join([short_help_text] + [
 @cli.command('template', short_help=short_help_text, help=help_text, context_settings=dict(ignore_unknown_options=True,allow_extra_args=True))
 @click.option('-r', '--repspec', help="Representation Specification ID.",  type=click.Choice(['RS0001','RS0002','RS0003','RS0004','RS0005','RS0006']), required=True, metavar="[RS0001-RS0006]")
 @click.option('-o', '--output', help="Output template path.",  type=click.File(mode='w', encoding=None, errors='strict', lazy=None, atomic=False), required=True)
+@click.option('--cache-dir', help="Template cache directory. Copies an identical cached template if available, and caches newly generated templates.", type=click.Path(file_okay=False), default=None)
 @click.pass_context
-def template(ctx, repspec, output):
-    kwargs = {}
-    for i, arg in enumerate(ctx.args):
-        if '=' in arg:
-            new_arg = arg.split('=')
-            key = new_arg[0].lstrip('-')
-            value = new_arg[1]
-            kwargs[key] = value
-        else:
-            if arg[0] == '-':
-                key = arg.lstrip('-')
-                value = ctx.args[i+1]
-                kwargs[key] = value
+def template(ctx, repspec, output, cache_dir):
+    kwargs = tk205.util.get_keyword_arguments(ctx.args)
 
     try:
-        tk205.template(repspec, output.name, **kwargs)
+        if cache_dir is None:
+            tk205.template(repspec, output.name, **kwargs)
+        else:
+            with open(output.name, 'wb') as output_file:
+                output_file.write(tk205.xlsx.get_template(repspec, kwargs, cache=cache_dir))
     except Exception as e:
         print(e)
 
+# Synthetic representations
+short_help_text = "Generate a large, random representation for load testing."
+help_text = "\n\n".join([short_help_text,
+    "The representation follows the schema for the given repspec (as for templates), with random values that are valid and physically plausible, and performance maps of about --points grid points. JSON and CBOR output is streamed, so files of any size can be generated. Keywords select schema alternatives as for templates, e.g.:",
+    "  --operation_speed_control_type=DISCRETE"
+    ])
+@cli.command('synth', short_help=short_help_text, help=help_text, context_settings=dict(ignore_unknown_options=True,allow_extra_args=True))
+@click.option('-r', '--repspec', help="Representation Specification ID.",  type=click.Choice(['RS0001','RS0002','RS0003','RS0004','RS0005','RS0006']), required=True, metavar="[RS0001-RS0006]")
+@click.option('-o', '--output', help="Output file path with extension.", type=click.Path(dir_okay=False), required=True)
+@click.option('-p', '--points', help="Approximate number of grid points in each performance map.", type=click.IntRange(min=1), default=1000, show_default=True)
+@click.option('-g', '--grid-points', help="Number of points of a specific grid variable, as NAME=POINTS (may be repeated).", multiple=True)
+@click.option('--max-depth', help="Deepest level of optional embedded representations to include (0 for none). All are included by default.", type=click.IntRange(min=0), default=None)
+@click.option('--required-only', help="Only include required data elements.", is_flag=True)
+@click.option('--array-items', help="Number of items in other arrays.", type=click.IntRange(min=0), default=2, show_default=True)
+@click.option('--seed', help="Random seed, for reproducible output.", type=int, default=None)
+@click.option('--json-style', help="Style of JSON output: indented, compact (no whitespace), or indented with each numeric array on one line.", type=click.Choice(['indent', 'compact', 'arrays-inline']), default='indent', show_default=True)
+@click.pass_context
+def synth(ctx, repspec, output, points, grid_points, max_depth, required_only, array_items, seed, json_style):
+    grid_point_counts = {}
+    for grid_point in grid_points:
+        name, _, count = grid_point.partition('=')
+        if not count.isdigit():
+            raise click.BadParameter(f"Expected NAME=POINTS, not \"{grid_point}\".", param_hint="'-g' / '--grid-points'")
+        grid_point_counts[name] = int(count)
+    tk205.synthesize(repspec, output, json_style=json_style, points=points, grid_points=grid_point_counts, max_depth=max_depth,
+                     optional=not required_only, array_items=array_items, seed=seed, **tk205.util.get_keyword_arguments(ctx.args))
+
 # Validate
 short_help_text = "Perform all validation tests and generate text report to stdout."
-help_text = short_help_text
+help_text = "\n\n".join([short_help_text,
+    "Inputs may be files, directories (validated recursively) or quoted glob patterns (e.g., \"build/**/*.cbor\"), and -i may be repeated. Every error in every file is reported, and the command exits with status 1 if any file is invalid."
+    ])
 @cli.command('validate', short_help=short_help_text, help=help_text)
-@click.option('-i', '--input', help="Input file with extension.", type=click.File(mode='r', encoding=None, errors='strict', lazy=None, atomic=False), required=True)
-def validate(input):
-    tk205.validate(input.name)
+@click.option('-i', '--input', 'inputs', help="Input file, directory or glob pattern.", multiple=True, required=True)
+@click.option('-j', '--jobs', help="Number of parallel processes.", type=click.IntRange(min=1), default=1, show_default=True)
+@click.option('--json', 'json_report', help="Write a JSON summary to this path.", type=click.Path(dir_okay=False), default=None)
+@click.option('--junit', 'junit_report', help="Write a JUnit XML report to this path.", type=click.Path(dir_okay=False), default=None)
+@click.pass_context
+def validate(ctx, inputs, jobs, json_report, junit_report):
+    results = tk205.validation.validate_files(tk205.validation.collect_files(inputs), jobs=jobs)
+    for result in results:
+        if result["valid"]:
+            click.echo(f"PASS {result['file']}")
+        else:
+            click.echo(f"FAIL {result['file']}")
+            for error in result["errors"]:
+                click.echo(f"  {error}")
+    failures = sum(not result["valid"] for result in results)
+    click.echo(f"Validated {len(results)} files: {len(results) - failures} passed, {failures} failed.")
+    if json_report is not None:
+        tk205.validation.write_json_report(results, json_report)
+    if junit_report is not None:
+        tk205.validation.write_junit_report(results, junit_report)
+    if failures:
+        ctx.exit(1)
+
+# Diff
+short_help_text = "Show the differences between two representations."
+help_text = "\n\n".join([short_help_text,
+    "The representations may be in different file formats. Numbers are compared within the given tolerances, and changes to numeric arrays (e.g., performance map variables) are summarized by the number of points changed and the largest change. The command exits with status 1 if the representations differ."
+    ])
+@cli.command('diff', short_help=short_help_text, help=help_text)
+@click.option('-a', '--old', help="Original file with extension.", type=click.Path(exists=True, dir_okay=False), required=True)
+@click.option('-b', '--new', help="Revised file with extension.", type=click.Path(exists=True, dir_okay=False), required=True)
+@click.option('--rel-tol', help="Relative tolerance for numbers.", type=click.FloatRange(min=0.0), default=1e-9, show_default=True)
+@click.option('--abs-tol', help="Absolute tolerance for numbers.", type=click.FloatRange(min=0.0), default=0.0, show_default=True)
+@click.option('--json', 'json_output', help="Write the differences as JSON to this path.", type=click.Path(dir_okay=False), default=None)
+@click.pass_context
+def diff(ctx, old, new, rel_tol, abs_tol, json_output):
+    differences = tk205.diff(old, new, rel_tol=rel_tol, abs_tol=abs_tol)
+    click.echo(tk205.differences.format_differences(differences))
+    if json_output is not None:
+        with open(json_output, 'w') as output_file:
+            json.dump([difference.to_dict() for difference in differences], output_file, indent=4)
+    if differences:
+        ctx.exit(1)
+
+# Serve
+short_help_text = "Run a server that keeps tk205 and its schemas loaded between requests."
+help_text = "\n\n".join([short_help_text,
+    "The server accepts translate, validate and template requests over a local TCP port or a Unix socket. Send them with the thin client, e.g.:",
+    "  python -m tk205.client --server unix:/tmp/tk205.sock translate -i example.json -o example.cbor"
+    ])
+@cli.command('serve', short_help=short_help_text, help=help_text)
+@click.option('--host', help="Host to listen on.", default='127.0.0.1', show_default=True)
+@click.option('-p', '--port', help="Port to listen on.", type=click.IntRange(min=0, max=65535), default=8205, show_default=True)
+@click.option('--socket', 'socket_path', help="Listen on a Unix socket at this path instead of a TCP port.", type=click.Path(dir_okay=False), default=None)
+@click.option('--verbose', help="Log each request.", is_flag=True)
+def serve(host, port, socket_path, verbose):
+    if socket_path is None:
+        click.echo(f"Serving on {host}:{port}")
+    else:
+        click.echo(f"Serving on unix:{socket_path}")
+    tk205.server.serve(host, port, socket_path, verbose)
 
 # Export
 short_help_text = "Generate simulation input models in specific simulation tool syntax."
@@ -0,0 +1,147 @@
+'''
+Thin client for a running tk205 server (see server.py and "tk205 serve").
+
+Only uses the standard library, so a call costs a local round trip rather than loading tk205, its
+dependencies and the schemas. Usage:
+
+  python -m tk205.client [--server ADDRESS] translate -i INPUT -o OUTPUT [--low-memory] [-j JOBS] [--json-style STYLE]
+  python -m tk205.client [--server ADDRESS] validate -i INPUT
+  python -m tk205.client [--server ADDRESS] template -r RS0001 -o OUTPUT [--cache-dir DIR] [--KEYWORD=VALUE ...]
+  python -m tk205.client [--server ADDRESS] ping | shutdown
+
+ADDRESS is "HOST:PORT" or "unix:SOCKET_PATH" (default: $TK205_SERVER, or "127.0.0.1:8205").
+'''
+import os
+import sys
+import json
+import socket
+import argparse
+import http.client
+from .util import get_keyword_arguments
+
+DEFAULT_ADDRESS = '127.0.0.1:8205'
+
+REQUIRED = object()
+# Parameters of each server command, with their defaults (also used by the server to check requests)
+COMMAND_PARAMETERS = {
+    'translate': {'input': REQUIRED, 'output': REQUIRED, 'low_memory': False, 'jobs': 1, 'json_style': 'indent'},
+    'validate': {'input': REQUIRED},
+    'template': {'repspec': REQUIRED, 'output': REQUIRED, 'keywords': {}, 'cache_dir': None},
+}
+PATH_PARAMETERS = ('input', 'output', 'cache_dir')  # Made absolute before they are sent
+
+def get_parameters(command, parameters):
+    '''
+    Return the parameters of a command with defaults for those not given.
+
+    Raises an Exception for unknown commands, and unknown or missing parameters.
+    '''
+    if command not in COMMAND_PARAMETERS:
+        raise Exception(f"Unknown command \"{command}\".")
+    known_parameters = COMMAND_PARAMETERS[command]
+    unknown = [name for name in parameters if name not in known_parameters]
+    if unknown:
+        raise Exception(f"Unknown parameters of \"{command}\": {', '.join(unknown)}.")
+    parameters = dict(known_parameters, **parameters)
+    missing = [name for name, value in parameters.items() if value is REQUIRED]
+    if missing:
+        raise Exception(f"Missing parameters of \"{command}\": {', '.join(missing)}.")
+    return parameters
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def connect(address=None, timeout=None):
+    if address is None:
+        address = os.environ.get('TK205_SERVER', DEFAULT_ADDRESS)
+    if address.startswith('unix:'):
+        return UnixHTTPConnection(address[len('unix:'):], timeout=timeout)
+    host, _, port = address.rpartition(':')
+    return http.client.HTTPConnection(host, int(port), timeout=timeout)
+
+def request(command, address=None, timeout=None, **parameters):
+    '''
+    Send a command to the server and return its result, printing any output it captured.
+
+    Raises an Exception with the server's error message if the command failed.
+    '''
+    connection = connect(address, timeout)
+    try:
+        if command == 'ping':
+            connection.request('GET', '/ping')
+        elif command == 'shutdown':
+            connection.request('POST', '/shutdown', body='{}', headers={'Content-Type': 'application/json'})
+        else:
+            parameters = get_parameters(command, parameters)
+            for name in PATH_PARAMETERS:
+                if parameters.get(name) is not None:
+                    parameters[name] = os.path.abspath(parameters[name])
+            body = json.dumps(parameters)
+            connection.request('POST', f'/{command}', body=body, headers={'Content-Type': 'application/json'})
+        response = json.loads(connection.getresponse().read())
+    except (ConnectionError, FileNotFoundError, socket.timeout) as e:
+        raise Exception(f"Could not reach the tk205 server ({e}). Start one with \"tk205 serve\".")
+    finally:
+        connection.close()
+    if response["output"]:
+        print(response["output"], end='')
+    if not response["ok"]:
+        raise Exception(response["error"])
+    return response["result"]
+
+def translate(input, output, address=None, **options):
+    return request('translate', address, input=input, output=output, **options)
+
+def validate(input, address=None):
+    return request('validate', address, input=input)
+
+def template(repspec, output, address=None, **options):
+    return request('template', address, repspec=repspec, output=output, **options)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(prog='python -m tk205.client', description="Send commands to a running tk205 server.")
+    parser.add_argument('--server', help=f"Server address (\"HOST:PORT\" or \"unix:SOCKET_PATH\"). Default: $TK205_SERVER or \"{DEFAULT_ADDRESS}\".")
+    commands = parser.add_subparsers(dest='command', required=True)
+    translate_parser = commands.add_parser('translate')
+    translate_parser.add_argument('-i', '--input', required=True)
+    translate_parser.add_argument('-o', '--output', required=True)
+    translate_parser.add_argument('-j', '--jobs', type=int, default=COMMAND_PARAMETERS['translate']['jobs'])
+    translate_parser.add_argument('--low-memory', action='store_true')
+    translate_parser.add_argument('--json-style', choices=['indent', 'compact', 'arrays-inline'], default=COMMAND_PARAMETERS['translate']['json_style'])
+    validate_parser = commands.add_parser('validate')
+    validate_parser.add_argument('-i', '--input', required=True)
+    template_parser = commands.add_parser('template')
+    template_parser.add_argument('-r', '--repspec', required=True)
+    template_parser.add_argument('-o', '--output', required=True)
+    template_parser.add_argument('--cache-dir')
+    commands.add_parser('ping')
+    commands.add_parser('shutdown')
+    arguments, extra_arguments = parser.parse_known_args(arguments)
+    if extra_arguments and arguments.command != 'template':
+        parser.error(f"unrecognized arguments: {' '.join(extra_arguments)}")
+
+    try:
+        if arguments.command == 'translate':
+            translate(arguments.input, arguments.output, arguments.server, low_memory=arguments.low_memory, jobs=arguments.jobs, json_style=arguments.json_style)
+        elif arguments.command == 'validate':
+            validate(arguments.input, arguments.server)
+        elif arguments.command == 'template':
+            template(arguments.repspec, arguments.output, arguments.server, keywords=get_keyword_arguments(extra_arguments), cache_dir=arguments.cache_dir)
+        else:
+            request(arguments.command, arguments.server)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
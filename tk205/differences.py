@@ -0,0 +1,146 @@
+'''
+Structural, tolerance-aware differences between two representations (in any supported format).
+
+Numeric arrays (e.g., performance map variables) are compared in one vectorized step and reported
+as a summary (how many points changed and by how much) rather than point by point, so comparing
+large performance maps takes time proportional to their size.
+'''
+import json
+from numbers import Number
+from math import isclose
+from .file_io import load
+from .util import ARRAY_COMPARISON_MIN_LENGTH, as_numeric_array, get_array_errors, format_path, is_array
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+ARRAY_CHANGED = 'array changed'
+
+class Difference:
+    '''
+    One difference between two objects, at a path of keys and indices.
+
+    "added" and "removed" differences hold the value (new or old), "changed" differences hold both,
+    and "array changed" differences hold a summary of the points that changed.
+    '''
+
+    def __init__(self, kind, path, old=None, new=None, summary=None):
+        self.kind = kind
+        self.path = tuple(path)
+        self.old = old
+        self.new = new
+        self.summary = summary
+
+    def __repr__(self):
+        return f"Difference({self.kind!r}, {format_path(self.path)!r})"
+
+    def __str__(self):
+        path = format_path(self.path)
+        if self.kind == ADDED:
+            return f"+ {path}: {summarize_value(self.new)}"
+        if self.kind == REMOVED:
+            return f"- {path}: {summarize_value(self.old)}"
+        if self.kind == CHANGED:
+            return f"~ {path}: {summarize_value(self.old)} -> {summarize_value(self.new)}"
+        summary = self.summary
+        return (f"~ {path}: {summary['changed']} of {summary['points']} points changed "
+                f"(max absolute delta: {summary['max_abs_delta']:.6g}, max relative delta: {summary['max_rel_delta']:.6g}, "
+                f"first at {format_path(summary['first'])})")
+
+    def to_dict(self):
+        difference = {"type": self.kind, "path": format_path(self.path)}
+        if self.kind in (REMOVED, CHANGED):
+            difference["old"] = summarize_value(self.old, as_text=False)
+        if self.kind in (ADDED, CHANGED):
+            difference["new"] = summarize_value(self.new, as_text=False)
+        if self.summary is not None:
+            difference.update(self.summary)
+            difference["first"] = format_path(self.summary["first"])
+        return difference
+
+def summarize_value(value, as_text=True):
+    '''
+    Describe containers by their size (e.g., "[1000 items]") and show other values as they are.
+    '''
+    if is_array(value):
+        return f"[array of shape {value.shape}]"
+    if isinstance(value, dict):
+        return f"{{{len(value)} keys}}"
+    if isinstance(value, list):
+        return f"[{len(value)} items]"
+    return json.dumps(value) if as_text else value
+
+def diff_arrays(array1, array2, path, differences, rel_tol, abs_tol):
+    if array1.shape != array2.shape:
+        differences.append(Difference(CHANGED, path, array1, array2))
+        return
+    if array1.size == 0:
+        return
+    close, abs_error, rel_error = get_array_errors(array1, array2, rel_tol=rel_tol, abs_tol=abs_tol)
+    changed = close.size - int(close.sum())
+    if changed:
+        import numpy as np
+        first = np.unravel_index(np.argmin(close), close.shape)
+        differences.append(Difference(ARRAY_CHANGED, path, summary={
+            "points": int(close.size),
+            "changed": changed,
+            "max_abs_delta": float(np.fmax.reduce(abs_error, axis=None)),
+            "max_rel_delta": float(np.fmax.reduce(rel_error, axis=None)),
+            "first": tuple(path) + tuple(int(i) for i in first)}))
+
+def _diff(object1, object2, path, differences, rel_tol, abs_tol):
+    flatten = is_array(object1) or is_array(object2)
+    min_length = 0 if flatten else ARRAY_COMPARISON_MIN_LENGTH
+    array1 = as_numeric_array(object1, min_length)
+    if array1 is not None:
+        array2 = as_numeric_array(object2, min_length)
+        if array2 is not None:
+            if flatten:
+                array1, array2 = array1.ravel(), array2.ravel()
+            diff_arrays(array1, array2, path, differences, rel_tol, abs_tol)
+            return
+    if is_array(object1):
+        object1 = object1.tolist()
+    if is_array(object2):
+        object2 = object2.tolist()
+    if isinstance(object1, dict) and isinstance(object2, dict):
+        for key in object1:
+            if key not in object2:
+                differences.append(Difference(REMOVED, path + [key], old=object1[key]))
+            else:
+                _diff(object1[key], object2[key], path + [key], differences, rel_tol, abs_tol)
+        for key in object2:
+            if key not in object1:
+                differences.append(Difference(ADDED, path + [key], new=object2[key]))
+    elif isinstance(object1, list) and isinstance(object2, list):
+        for index in range(min(len(object1), len(object2))):
+            _diff(object1[index], object2[index], path + [index], differences, rel_tol, abs_tol)
+        for index in range(len(object2), len(object1)):
+            differences.append(Difference(REMOVED, path + [index], old=object1[index]))
+        for index in range(len(object1), len(object2)):
+            differences.append(Difference(ADDED, path + [index], new=object2[index]))
+    elif isinstance(object1, Number) and isinstance(object2, Number):
+        if not isclose(object1, object2, rel_tol=rel_tol, abs_tol=abs_tol):
+            differences.append(Difference(CHANGED, path, object1, object2))
+    elif type(object1) != type(object2) or object1 != object2:
+        differences.append(Difference(CHANGED, path, object1, object2))
+
+def diff_objects(object1, object2, rel_tol=1e-9, abs_tol=0.0):
+    '''
+    Return the list of Differences between two objects (empty if they are near equal), in document
+    order, with numbers compared as in math.isclose.
+    '''
+    differences = []
+    _diff(object1, object2, [], differences, rel_tol, abs_tol)
+    return differences
+
+def diff(file_path1, file_path2, rel_tol=1e-9, abs_tol=0.0):
+    '''
+    Return the list of Differences between two representation files, which may be in different formats.
+    '''
+    return diff_objects(load(file_path1), load(file_path2), rel_tol=rel_tol, abs_tol=abs_tol)
+
+def format_differences(differences):
+    if not differences:
+        return "No differences."
+    return '\n'.join(str(difference) for difference in differences)
@@ -1,48 +1,286 @@
-import os, shutil
+import os, sys, shutil
+import io
 import json
-import cbor2
-import yaml
-from .xlsx import template, A205XLSXTree
-from .util import iterdict
+from collections import namedtuple
+from .manifest import TranslationManifest, MANIFEST_FILE_NAME
+from .util import iterdict, is_array, open_file
+from .json_backends import INDENT
+from . import profiling
+
+# File format backends (cbor2, PyYAML, the XLSX engine, NumPy) are imported by their loaders and
+# dumpers on first use, so importing tk205 (or translating JSON) does not pay for all of them.
+FileFormat = namedtuple('FileFormat', ['load', 'dump', 'extension'])
+
+file_formats = {}  # FileFormat by (lower case) file extension
+
+def register_file_format(extensions, load, dump):
+    '''
+    Register a loader and dumper for one or more file extensions (e.g., [".yaml", ".yml"]).
+
+    load(input_file_path, low_memory, arrays, tree) returns content, and
+    dump(content, output_file_path, low_memory, tree, **options) writes it (options are
+    format-specific, e.g., json_style, and ignored by other formats); either may be None if the
+    format is read-only or write-only. The paths may also be binary file objects (see load_bytes and
+    dump_bytes).
+    '''
+    for extension in extensions:
+        file_formats[extension.lower()] = FileFormat(load, dump, extension.lower())
 
 def get_extension(file):
     return os.path.splitext(file)[1]
 
-def load(input_file_path):
-    ext = get_extension(input_file_path).lower()
-    if (ext == '.json'):
-        with open(input_file_path, 'r') as input_file:
-            return json.load(input_file)
-    elif (ext == '.cbor'):
-        with open(input_file_path, 'rb') as input_file:
-            return cbor2.load(input_file)
-    elif (ext == '.xlsx'):
-        tree = A205XLSXTree()
-        return tree.load_workbook(input_file_path).get_content()
-    elif (ext == '.yaml') or (ext == '.yml'):
-        with open(input_file_path, 'r') as input_file:
-            return yaml.load(input_file, Loader=yaml.FullLoader)
+def normalize_extension(file_format):
+    return '.' + file_format.lstrip('.').lower()
+
+# Bytes read from a file to detect its format
+SNIFF_LENGTH = 1024
+
+A205BIN_MAGIC = b"A205BIN\0"  # binary.MAGIC (not imported here, as binary.py imports NumPy)
+
+def detect_format(data):
+    '''
+    Return the extension of the format of file content (bytes, or at least its first SNIFF_LENGTH
+    bytes) from its magic bytes or syntax, or None if it is not recognized.
+    '''
+    if data.startswith(A205BIN_MAGIC):
+        return '.a205bin'
+    if data.startswith(b'PK\x03\x04'):
+        # XLSX workbooks are ZIP containers
+        return '.xlsx'
+    if data.startswith(b'\xd9\xd9\xf7') or (data and 0x80 <= data[0] <= 0xbf):
+        # Self-described CBOR, or a CBOR array or map (bytes that cannot start UTF-8 text)
+        return '.cbor'
+    text = data[3:] if data.startswith(b'\xef\xbb\xbf') else data
+    text = text.lstrip()
+    if text[:1] in (b'{', b'['):
+        return '.json'
+    if not text or b'\0' in text:
+        return None
+    try:
+        text.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # Allow a multi-byte character cut off at the end of a prefix
+        if e.start < len(text) - 3:
+            return None
+    # Any other text is taken to be YAML (a superset of JSON)
+    return '.yaml'
+
+def sniff_file_format(file_path):
+    '''
+    Return the extension of a file's format, detected from its content (see detect_format).
+    '''
+    with open(file_path, 'rb') as input_file:
+        return detect_format(input_file.read(SNIFF_LENGTH))
+
+def get_file_format(file_path, direction, file_format=None):
+    '''
+    Return the FileFormat for a file, checking that it can be loaded (direction "input") or dumped
+    (direction "output").
+
+    The format is given by file_format (an extension, e.g., "json") if set, or by the file's
+    extension. Inputs with a missing or unrecognized extension are identified by their content
+    (see detect_format).
+    '''
+    if file_format is not None:
+        ext = normalize_extension(file_format)
     else:
-        raise Exception(f"Unsupported input \"{ext}\" for \"{input_file_path}\".")
-
-def dump(content, output_file_path):
-    ext = get_extension(output_file_path).lower()
-    if (ext == '.json'):
-        with open(output_file_path,'w') as output_file:
-            json.dump(content, output_file, indent=4)
-    elif (ext == '.cbor'):
-        with open(output_file_path,'wb') as output_file:
-            cbor2.dump(content, output_file)
-    elif (ext == '.xlsx'):
-        tree = A205XLSXTree()
-        tree.load(content)
-        tree.save(output_file_path)
-    elif (ext == '.yaml') or (ext == '.yml'):
-        with open(output_file_path, 'w') as out_file:
-            yaml.dump(content, out_file, sort_keys=False)
+        ext = get_extension(file_path).lower()
+        if ext not in file_formats and direction == 'input' and os.path.isfile(file_path):
+            ext = sniff_file_format(file_path) or ext
+    file_format = file_formats.get(ext)
+    if file_format is None or (file_format.load if direction == 'input' else file_format.dump) is None:
+        name = file_path if isinstance(file_path, (str, os.PathLike)) else '<bytes>'
+        raise Exception(f"Unsupported {direction} \"{ext}\" for \"{name}\".")
+    return file_format
+
+def load(input_file_path, low_memory=False, arrays=False, tree=None, file_format=None):
+    '''
+    Load representation content from a file.
+
+    low_memory:
+      open XLSX workbooks read-only and stream their rows (see A205XLSXTree.load_workbook)
+    arrays:
+      return performance map grid and lookup variables as NumPy arrays (see performance_maps_to_arrays).
+      Arrays loaded from ".a205bin" files are read-only and memory-mapped from the file.
+    tree:
+      an A205XLSXTree to reuse for XLSX files (see Translator)
+    file_format:
+      the format's extension (e.g., "cbor"), to override the file's extension (see get_file_format)
+    '''
+    file_format = get_file_format(input_file_path, 'input', file_format)
+    with profiling.timer('load' + file_format.extension):
+        content = file_format.load(input_file_path, low_memory, arrays, tree)
+        if arrays:
+            from .performance import performance_maps_to_arrays
+            performance_maps_to_arrays(content)
+    if profiling.is_enabled():
+        profiling.count('bytes_in', get_size(input_file_path))
+    return content
+
+def dump(content, output_file_path, low_memory=False, tree=None, file_format=None, json_style=INDENT):
+    '''
+    Dump representation content to a file.
 
+    Content may include NumPy arrays (see load(..., arrays=True)), which are written as flat lists.
+
+    low_memory:
+      write XLSX workbooks through a streaming, write-only workbook (see A205XLSXTree.save)
+    tree:
+      an A205XLSXTree to reuse for XLSX files (see Translator)
+    file_format:
+      the format's extension (e.g., "cbor"), to override the file's extension
+    json_style:
+      "indent", "compact" or "arrays-inline" (see json_backends)
+    '''
+    file_format = get_file_format(output_file_path, 'output', file_format)
+    with profiling.timer('dump' + file_format.extension):
+        file_format.dump(content, output_file_path, low_memory, tree, json_style=json_style)
+    if profiling.is_enabled():
+        profiling.count('bytes_out', get_size(output_file_path))
+
+def get_size(file):
+    '''
+    Size of a file path, or of the content of an io.BytesIO.
+    '''
+    if isinstance(file, io.BytesIO):
+        return file.getbuffer().nbytes
+    return os.path.getsize(file)
+
+def load_bytes(data, file_format=None, low_memory=False, arrays=False, tree=None):
+    '''
+    Load representation content from bytes (e.g., a received file), without a file on disk.
+
+    file_format:
+      the format's extension (e.g., "cbor"). If None, the format is detected from the content
+      (see detect_format).
+
+    See load for the other arguments.
+    '''
+    if file_format is None:
+        file_format = detect_format(data[:SNIFF_LENGTH])
+        if file_format is None:
+            raise Exception("Unrecognized input format (not JSON, CBOR, YAML, XLSX or a205bin content).")
+    return load(io.BytesIO(data), low_memory, arrays, tree, file_format)
+
+def dump_bytes(content, file_format, low_memory=False, tree=None, json_style=INDENT):
+    '''
+    Dump representation content to bytes in the given format (an extension, e.g., "cbor"), without
+    a file on disk.
+    '''
+    output = io.BytesIO()
+    dump(content, output, low_memory, tree, file_format, json_style)
+    return output.getvalue()
+
+def array_to_list(value):
+    from .performance import array_to_list
+    return array_to_list(value)
+
+def load_json(input_file_path, low_memory, arrays, tree):
+    from .json_backends import loads
+    with open_file(input_file_path, 'rb') as input_file:
+        return loads(input_file.read())
+
+def json_default(value):
+    if is_array(value):
+        return array_to_list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dump_json(content, output_file_path, low_memory, tree, json_style=INDENT, **options):
+    if json_style == INDENT:
+        with open_file(output_file_path,'w') as output_file:
+            json.dump(content, output_file, indent=4, default=json_default)
     else:
-        raise Exception(f"Unsupported output \"{ext}\" for \"{output_file_path}\".")
+        from .json_backends import dumps
+        with open_file(output_file_path,'wb') as output_file:
+            output_file.write(dumps(content, json_style, default=json_default))
+
+def load_cbor(input_file_path, low_memory, arrays, tree):
+    import cbor2
+    with open_file(input_file_path, 'rb') as input_file:
+        return cbor2.load(input_file)
+
+def cbor_default(encoder, value):
+    import cbor2
+    if is_array(value):
+        encoder.encode(array_to_list(value))
+    else:
+        raise cbor2.CBOREncodeTypeError(f"cannot serialize type {type(value).__name__}")
+
+def dump_cbor(content, output_file_path, low_memory, tree, **options):
+    import cbor2
+    with open_file(output_file_path,'wb') as output_file:
+        cbor2.dump(content, output_file, default=cbor_default)
+
+def load_xlsx(input_file_path, low_memory, arrays, tree):
+    from .xlsx import A205XLSXTree
+    tree = A205XLSXTree() if tree is None else tree
+    # openpyxl only opens paths with XLSX extensions, but opens any file object
+    with open_file(input_file_path, 'rb') as input_file:
+        return tree.load_workbook(input_file, low_memory=low_memory).get_content()
+
+def dump_xlsx(content, output_file_path, low_memory, tree, **options):
+    from .xlsx import A205XLSXTree
+    tree = A205XLSXTree() if tree is None else tree
+    tree.load(content)
+    tree.save(output_file_path, low_memory=low_memory)
+
+def get_yaml_loader():
+    '''
+    Return libyaml's C loader if PyYAML was built with it (representations only hold plain data,
+    so the safe loaders are sufficient).
+    '''
+    import yaml
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+def load_yaml(input_file_path, low_memory, arrays, tree):
+    import yaml
+    # Read bytes: libyaml decodes (and detects the encoding of) the stream itself
+    with open_file(input_file_path, 'rb') as input_file:
+        return yaml.load(input_file, Loader=get_yaml_loader())
+
+def represent_list(dumper, data):
+    # Lists of numbers (e.g., performance map variables) are written in flow style ("[1.0, 2.0]")
+    flow_style = len(data) > 0 and all(type(item) in (int, float) for item in data)
+    return dumper.represent_sequence('tag:yaml.org,2002:seq', data, flow_style=flow_style or None)
+
+YAMLDumper = None
+
+def get_yaml_dumper():
+    '''
+    Return the YAML dumper class (based on libyaml's C emitter if PyYAML was built with it), with a
+    representer for NumPy arrays once NumPy has been imported (content cannot hold arrays before
+    then).
+    '''
+    global YAMLDumper
+    if YAMLDumper is None:
+        import yaml
+        YAMLDumper = type('YAMLDumper', (getattr(yaml, 'CSafeDumper', yaml.SafeDumper),), {})
+        YAMLDumper.add_representer(list, represent_list)
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and numpy.ndarray not in YAMLDumper.yaml_representers:
+        YAMLDumper.add_representer(numpy.ndarray, lambda dumper, array: represent_list(dumper, array_to_list(array)))
+    return YAMLDumper
+
+def dump_yaml(content, output_file_path, low_memory, tree, **options):
+    import yaml
+    with open_file(output_file_path, 'w') as out_file:
+        yaml.dump(content, out_file, Dumper=get_yaml_dumper(), sort_keys=False)
+
+def load_a205bin(input_file_path, low_memory, arrays, tree):
+    from .binary import load_binary
+    from .performance import arrays_to_lists
+    content = load_binary(input_file_path)
+    return content if arrays else arrays_to_lists(content)
+
+def dump_a205bin(content, output_file_path, low_memory, tree, **options):
+    from .binary import dump_binary
+    dump_binary(content, output_file_path)
+
+register_file_format(['.json'], load_json, dump_json)
+register_file_format(['.cbor'], load_cbor, dump_cbor)
+register_file_format(['.xlsx'], load_xlsx, dump_xlsx)
+register_file_format(['.yaml', '.yml'], load_yaml, dump_yaml)
+register_file_format(['.a205bin'], load_a205bin, dump_a205bin)
 
 def clear_directory(directory_path):
     '''
@@ -72,28 +310,154 @@ def view_metaschema(input_file_path, output_file_path):
     output_file = output_file_path[:-len(current_ext)] + '.json'
     dump(metaschema, output_file)
 
-def translate(input, output):
-    dump(load(input),output)
+def translate(input, output, low_memory=False, tree=None, json_style=INDENT):
+    '''
+    Translate a representation between file formats.
 
-def translate_directory_recursive(source_dir, output_dir, output_extension):
-    if len(os.listdir(source_dir)) ==0: # if directory is empty, do nothing
-        return
-    for source in os.listdir(source_dir):
+    low_memory:
+      stream JSON <-> CBOR translations without building the content in memory, and use the
+      low-memory XLSX reader/writer otherwise
+    json_style:
+      the style of JSON outputs: "indent", "compact" or "arrays-inline" (see json_backends)
+    '''
+    if low_memory:
+        from .streaming import can_stream, translate_stream
+        if can_stream(input) and can_stream(output):
+            translate_stream(input, output, json_style)
+            return
+    dump(load(input, low_memory=low_memory, tree=tree), output, low_memory=low_memory, tree=tree, json_style=json_style)
+
+class Translator:
+    '''
+    Reusable loader/dumper/translator for converting many files.
+
+    A single XLSX tree is kept between files, so its schema is only reloaded when the schema type
+    of a file differs from the previous one.
+    '''
+
+    def __init__(self, low_memory=False, json_style=INDENT):
+        self.low_memory = low_memory
+        self.json_style = json_style
+        self.tree = None
+
+    def get_tree(self, *file_paths):
+        # The tree (and the XLSX engine) is only created once an XLSX file is involved
+        if self.tree is None and any(get_extension(file_path).lower() == '.xlsx' for file_path in file_paths):
+            from .xlsx import A205XLSXTree
+            self.tree = A205XLSXTree()
+        return self.tree
+
+    def load(self, input_file_path, arrays=False):
+        return load(input_file_path, low_memory=self.low_memory, arrays=arrays, tree=self.get_tree(input_file_path))
+
+    def dump(self, content, output_file_path):
+        dump(content, output_file_path, low_memory=self.low_memory, tree=self.get_tree(output_file_path), json_style=self.json_style)
+
+    def translate(self, input, output):
+        translate(input, output, low_memory=self.low_memory, tree=self.get_tree(input, output), json_style=self.json_style)
+
+def collect_translations(source_dir, output_dir, output_extension):
+    '''
+    Return (source, output) path pairs for every file under source_dir, in sorted order.
+
+    The output directory layout mirrors source_dir and is created as it is collected.
+    '''
+    translations = []
+    for source in sorted(os.listdir(source_dir)):
         source_path = os.path.join(source_dir, source)
         if os.path.isdir(source_path):
             output_dir_path = os.path.join(output_dir, source)
-            os.mkdir(output_dir_path)
-            translate_directory_recursive(source_path, output_dir_path, output_extension)
+            os.makedirs(output_dir_path, exist_ok=True)
+            translations += collect_translations(source_path, output_dir_path, output_extension)
         else:
-            if '~$' not in source:  # Ignore temporary Excel files
+            if '~$' not in source and source != MANIFEST_FILE_NAME:  # Ignore temporary Excel files and manifests
                 base_name = os.path.basename(source_path)
                 file_name = os.path.splitext(base_name)[0]
-                output_path = os.path.join(output_dir,file_name + output_extension)
-                translate(source_path, output_path)
+                translations.append((source_path, os.path.join(output_dir,file_name + output_extension)))
+    return translations
+
+_translators = {}  # Translators reused by the directory translation tasks of this process, by (low_memory, json_style)
 
-def translate_directory(source_dir, output_dir, clear=True):
+def _init_translate_worker(uses_xlsx):
+    # Warm the worker's schema cache once rather than on its first XLSX task (JSON, CBOR and YAML
+    # translations never load a schema)
+    if uses_xlsx:
+        from .schemas import preload_schemas
+        preload_schemas()
+
+def _translate_task(input, output, low_memory=False, json_style=INDENT):
+    key = (low_memory, json_style)
+    if key not in _translators:
+        _translators[key] = Translator(low_memory, json_style)
+    try:
+        _translators[key].translate(input, output)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+def translate_files(translations, jobs=1, low_memory=False, json_style=INDENT):
+    '''
+    Translate a list of (source, output) path pairs, optionally over a pool of `jobs` processes
+    (`None` uses every CPU).
+
+    Returns a list of (source, error message) pairs for any translations that failed.
+    '''
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    sources = [source for source, _ in translations]
+    outputs = [output for _, output in translations]
+    if jobs > 1 and len(translations) > 1:
+        chunk_size = max(1, len(translations)//(jobs*4))
+        from concurrent.futures import ProcessPoolExecutor
+        uses_xlsx = any(os.path.splitext(path)[1].lower() == '.xlsx' for path in sources + outputs)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_translate_worker, initargs=(uses_xlsx,)) as executor:
+            errors = profiling.map_profiled(executor, _translate_task, sources, outputs, [low_memory]*len(sources), [json_style]*len(sources), chunksize=chunk_size)
+    else:
+        errors = [_translate_task(source, output, low_memory, json_style) for source, output in translations]
+    return [(source, error) for source, error in zip(sources, errors) if error is not None]
+
+def translate_directory_recursive(source_dir, output_dir, output_extension, jobs=1, low_memory=False, incremental=False, json_style=INDENT):
+    '''
+    Translate every file under source_dir into output_dir (mirroring its layout).
+
+    incremental:
+      only translate files whose outputs are missing or stale according to the manifest kept in
+      output_dir (see TranslationManifest), and delete outputs whose sources no longer exist
+    json_style:
+      the style of JSON outputs (see translate)
+    '''
+    if len(os.listdir(source_dir)) ==0 and not incremental: # if directory is empty, do nothing
+        return
+    translations = collect_translations(source_dir, output_dir, output_extension)
+    if incremental:
+        # Outputs are rebuilt when options change (only non-default options are recorded)
+        manifest = TranslationManifest(output_dir, options={} if json_style == INDENT else {'json_style': json_style})
+        manifest.remove_orphans([output for _, output in translations])
+        stale = [(source, output) for source, output in translations if not manifest.is_current(source, output)]
+    else:
+        stale = translations
+    failures = translate_files(stale, jobs, low_memory, json_style)
+    if incremental:
+        failed = set(source for source, _ in failures)
+        for source, output in stale:
+            if source in failed:
+                manifest.discard(output)
+            else:
+                manifest.record(source, output)
+        manifest.save()
+    if failures:
+        messages = '\n  '.join(f"{source}: {error}" for source, error in failures)
+        raise Exception(f"Failed to translate {len(failures)} of {len(stale)} files:\n  {messages}")
+
+def translate_directory(source_dir, output_dir, clear=True, jobs=1, low_memory=False, incremental=False, json_style=INDENT):
+    '''
+    Translate every file under source_dir into output_dir, whose name sets the output format
+    (e.g., "build/cbor").
+
+    The output directory is cleared first unless `clear` is False or the translation is
+    `incremental` (see translate_directory_recursive).
+    '''
     output_extension = '.' + os.path.split(output_dir)[-1]
-    if clear:
+    if clear and not incremental:
         clear_directory(output_dir)
-    translate_directory_recursive(source_dir, output_dir, output_extension)
-
+    translate_directory_recursive(source_dir, output_dir, output_extension, jobs, low_memory, incremental, json_style)
@@ -0,0 +1,153 @@
+'''
+JSON backends and output styles.
+
+JSON is parsed and serialized with orjson when it is installed, and with the standard library's
+json module otherwise (or when the TK205_JSON_BACKEND environment variable is "json").
+
+Output styles:
+
+  indent         formatted like json.dump(content, indent=4) (the default)
+  compact        no whitespace
+  arrays-inline  indented, except for arrays of numbers (e.g., performance map variables), which
+                 are each written compactly on one line
+
+The formatting of numbers may differ between backends (e.g., orjson writes 1e-05 as 0.00001), but
+the values read back are the same. orjson would write NaN and Infinity as null, so content with
+non-finite numbers is written by the json module instead (as NaN and Infinity, which both backends
+read back).
+
+orjson writes the compact style, and the numeric arrays of the arrays-inline style. The indent
+style is always written by the json module (orjson only indents by two spaces).
+'''
+import os
+import json
+import math
+from .util import is_array
+
+INDENT = 'indent'
+COMPACT = 'compact'
+ARRAYS_INLINE = 'arrays-inline'
+JSON_STYLES = (INDENT, COMPACT, ARRAYS_INLINE)
+
+class StandardJSONBackend:
+    name = 'json'
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, content, default=None):
+        return json.dumps(content, separators=(',', ':'), default=default).encode()
+
+class ORJSONBackend:
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def loads(self, data):
+        try:
+            return self.orjson.loads(data)
+        except self.orjson.JSONDecodeError:
+            # e.g., integers beyond 64 bits or NaN, which json accepts
+            return json.loads(data)
+
+    def dumps(self, content, default=None):
+        try:
+            data = self.orjson.dumps(content, default=default)
+        except TypeError:
+            # e.g., non-string keys, or nesting deeper than orjson supports
+            return json.dumps(content, separators=(',', ':'), default=default).encode()
+        if b'null' in data and has_non_finite(content):
+            return json.dumps(content, separators=(',', ':'), default=default).encode()
+        return data
+
+def has_non_finite(content):
+    '''
+    True if the content includes NaN or Infinity.
+    '''
+    if isinstance(content, float):
+        return not math.isfinite(content)
+    elif isinstance(content, dict):
+        return any(has_non_finite(value) for value in content.values())
+    elif isinstance(content, list):
+        return any(has_non_finite(item) for item in content)
+    elif is_array(content):
+        import numpy
+        return content.dtype.kind == 'f' and not numpy.isfinite(content).all()
+    return False
+
+json_backends = {'json': StandardJSONBackend, 'orjson': ORJSONBackend}
+_backends = {}  # Backend instances, by name
+
+def register_json_backend(name, backend):
+    '''
+    Register a backend class, with loads(data) and dumps(content, default) -> bytes methods.
+    '''
+    json_backends[name] = backend
+    _backends.pop(name, None)
+
+def get_json_backend(name=None):
+    '''
+    Return a JSON backend by name or, by default, the one named by TK205_JSON_BACKEND, orjson if it
+    is installed, or json.
+    '''
+    if name is None:
+        name = os.environ.get('TK205_JSON_BACKEND')
+    if name is None:
+        try:
+            return get_json_backend('orjson')
+        except ImportError:
+            return get_json_backend('json')
+    if name not in _backends:
+        if name not in json_backends:
+            raise Exception(f"Unknown JSON backend \"{name}\". Available backends: {', '.join(json_backends)}.")
+        _backends[name] = json_backends[name]()
+    return _backends[name]
+
+def is_number_array(value):
+    if is_array(value):
+        return True
+    return isinstance(value, list) and len(value) > 0 and all(type(item) in (int, float) for item in value)
+
+def iter_arrays_inline(content, backend, default, indent, level=0):
+    '''
+    Generate the text of content in the arrays-inline style.
+    '''
+    if isinstance(content, dict) and content:
+        padding = ' '*indent*(level + 1)
+        separator = '{\n'
+        for key, value in content.items():
+            yield separator + padding + json.dumps(key) + ': '
+            yield from iter_arrays_inline(value, backend, default, indent, level + 1)
+            separator = ',\n'
+        yield '\n' + ' '*indent*level + '}'
+    elif isinstance(content, list) and content and not is_number_array(content):
+        padding = ' '*indent*(level + 1)
+        separator = '[\n'
+        for value in content:
+            yield separator + padding
+            yield from iter_arrays_inline(value, backend, default, indent, level + 1)
+            separator = ',\n'
+        yield '\n' + ' '*indent*level + ']'
+    else:
+        yield backend.dumps(content, default).decode()
+
+def dumps(content, style=COMPACT, backend=None, default=None, indent=4):
+    '''
+    Serialize content to JSON bytes in the given style, with the named backend (see get_json_backend).
+
+    default:
+      a function returning a serializable version of other objects (as for json.dumps)
+    '''
+    if style not in JSON_STYLES:
+        raise Exception(f"Unknown JSON style \"{style}\". Available styles: {', '.join(JSON_STYLES)}.")
+    backend = get_json_backend(backend)
+    if style == COMPACT:
+        return backend.dumps(content, default)
+    if style == ARRAYS_INLINE:
+        return ''.join(iter_arrays_inline(content, backend, default, indent)).encode()
+    return json.dumps(content, indent=indent, default=default).encode()
+
+def loads(data, backend=None):
+    return get_json_backend(backend).loads(data)
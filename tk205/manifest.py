@@ -0,0 +1,124 @@
+import os
+import glob
+import json
+import hashlib
+from .schemas import SCHEMA_DIR
+
+MANIFEST_FILE_NAME = '.tk205-manifest.json'
+MANIFEST_VERSION = 1
+
+def hash_file(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as input_file:
+        for chunk in iter(lambda: input_file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_files(file_paths):
+    digest = hashlib.sha256()
+    for file_path in sorted(file_paths):
+        digest.update(os.path.basename(file_path).encode())
+        digest.update(hash_file(file_path).encode())
+    return digest.hexdigest()
+
+def get_tk205_version():
+    '''
+    Package version plus a hash of the tk205 sources, so that outputs are rebuilt whenever the
+    translation code changes (not only on releases).
+    '''
+    try:
+        from importlib.metadata import version
+        package_version = version('tk205')
+    except Exception:
+        package_version = 'unknown'
+    source_hash = hash_files(glob.glob(os.path.join(os.path.dirname(__file__), '*.py')))
+    return f"{package_version}+{source_hash[:16]}"
+
+def get_schema_version(schema_dir=SCHEMA_DIR):
+    '''
+    Hash of the compiled schema files.
+    '''
+    return hash_files(glob.glob(os.path.join(schema_dir, '*.schema.json')))[:16]
+
+class TranslationManifest:
+    '''
+    Record of the outputs of a translated directory, stored in the output directory.
+
+    Each output is keyed by its path relative to the output directory and records its source path
+    and the source's size, modification time and content hash. An output is up to date if it
+    exists, it was made from the same source by the same tk205 and schema versions with the same
+    translation options (e.g., the JSON style), and the source is unchanged (same size and
+    modification time or, failing that, same content hash).
+    '''
+
+    def __init__(self, output_dir, tk205_version=None, schema_version=None, options=None):
+        self.output_dir = output_dir
+        self.file_path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+        self.tk205_version = get_tk205_version() if tk205_version is None else tk205_version
+        self.schema_version = get_schema_version() if schema_version is None else schema_version
+        self.options = {} if options is None else options
+        self.outputs = {}
+        if os.path.isfile(self.file_path):
+            with open(self.file_path, 'r') as manifest_file:
+                manifest = json.load(manifest_file)
+            if (manifest.get('version') == MANIFEST_VERSION and
+                manifest.get('tk205_version') == self.tk205_version and
+                manifest.get('schema_version') == self.schema_version and
+                manifest.get('options', {}) == self.options):
+                self.outputs = manifest['outputs']
+
+    def get_key(self, output):
+        return os.path.relpath(output, self.output_dir).replace(os.sep, '/')
+
+    def is_current(self, source, output):
+        entry = self.outputs.get(self.get_key(output))
+        if entry is None or entry['source'] != os.path.abspath(source) or not os.path.isfile(output):
+            return False
+        source_stat = os.stat(source)
+        if entry['size'] != source_stat.st_size:
+            return False
+        if entry['mtime_ns'] == source_stat.st_mtime_ns:
+            return True
+        if entry['hash'] != hash_file(source):
+            return False
+        # Touched, but unchanged
+        entry['mtime_ns'] = source_stat.st_mtime_ns
+        return True
+
+    def record(self, source, output):
+        source_stat = os.stat(source)
+        self.outputs[self.get_key(output)] = {
+            'source': os.path.abspath(source),
+            'size': source_stat.st_size,
+            'mtime_ns': source_stat.st_mtime_ns,
+            'hash': hash_file(source)}
+
+    def discard(self, output):
+        self.outputs.pop(self.get_key(output), None)
+
+    def remove_orphans(self, outputs):
+        '''
+        Delete recorded outputs that are not in `outputs` (e.g., because their source was removed).
+        Files that tk205 did not write are left alone. Returns the deleted paths.
+        '''
+        keep = set(self.get_key(output) for output in outputs)
+        removed = []
+        for key in sorted(set(self.outputs) - keep):
+            output = os.path.join(self.output_dir, *key.split('/'))
+            if os.path.isfile(output):
+                os.remove(output)
+                removed.append(output)
+            del self.outputs[key]
+        return removed
+
+    def save(self):
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'tk205_version': self.tk205_version,
+            'schema_version': self.schema_version,
+            'options': self.options,
+            'outputs': dict(sorted(self.outputs.items()))}
+        temporary_path = self.file_path + '.tmp'
+        with open(temporary_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(temporary_path, self.file_path)
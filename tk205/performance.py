@@ -0,0 +1,266 @@
+'''
+Performance map utilities.
+
+Performance maps ("performance_map*" data groups) hold `grid_variables` (the axes of a
+rectilinear grid) and `lookup_variables` (one value per grid point, with the last grid variable
+varying fastest). These utilities optionally represent them as NumPy arrays: grid variables as
+1-D arrays and lookup variables reshaped to the grid shape.
+'''
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from .util import is_array
+
+
+def require_numpy():
+    if np is None:
+        raise Exception("NumPy is required for array-backed performance maps. Install it with \"pip install numpy\".")
+
+
+def is_performance_map(name, value):
+    return name.startswith('performance_map') and isinstance(value, dict) and 'grid_variables' in value and 'lookup_variables' in value
+
+
+def iter_performance_maps(content, path=()):
+    '''
+    Generate (path, performance map) pairs for every performance map in the content, including
+    those within embedded representations.
+    '''
+    if isinstance(content, dict):
+        for name, value in content.items():
+            if is_performance_map(name, value):
+                yield path + (name,), value
+            else:
+                yield from iter_performance_maps(value, path + (name,))
+    elif isinstance(content, list):
+        for index, item in enumerate(content):
+            yield from iter_performance_maps(item, path + (index,))
+
+
+def get_grid_shape(performance_map):
+    return tuple(len(values) for values in performance_map['grid_variables'].values())
+
+
+def is_numeric(values):
+    return all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values)
+
+
+def performance_maps_to_arrays(content):
+    '''
+    Replace (in place) the grid and lookup variables of every performance map in the content with
+    contiguous NumPy arrays of their own type (integers stay integers; PerformanceMapInterpolator
+    converts to floats itself). Lookup variables are reshaped to the grid shape.
+
+    Non-numeric variables, and lookup variables whose size does not match the grid, are left as lists.
+    '''
+    require_numpy()
+    for _, performance_map in iter_performance_maps(content):
+        grid_variables = performance_map['grid_variables']
+        for name, values in grid_variables.items():
+            if not is_array(values) and is_numeric(values):
+                grid_variables[name] = np.array(values)
+        shape = get_grid_shape(performance_map)
+        size = int(np.prod(shape))
+        lookup_variables = performance_map['lookup_variables']
+        for name, values in lookup_variables.items():
+            if is_array(values):
+                if values.size == size:
+                    lookup_variables[name] = values.reshape(shape)
+            elif len(values) == size and is_numeric(values):
+                lookup_variables[name] = np.array(values).reshape(shape)
+    return content
+
+
+def array_to_list(array):
+    '''
+    Flatten an array (in C order, i.e., last grid variable varying fastest) into a list.
+    '''
+    return array.ravel().tolist()
+
+
+def arrays_to_lists(content):
+    '''
+    Return a copy of the content with any NumPy arrays replaced by flat lists.
+    '''
+    if is_array(content):
+        return array_to_list(content)
+    elif isinstance(content, dict):
+        return {name: arrays_to_lists(value) for name, value in content.items()}
+    elif isinstance(content, list):
+        return [arrays_to_lists(item) for item in content]
+    return content
+
+
+EXTRAPOLATION_POLICIES = ('constant', 'linear', 'nan', 'error')
+INTERPOLATION_METHODS = ('linear', 'cubic')
+
+
+class PerformanceMap:
+    '''
+    Batched interpolation over a performance map.
+
+    Lookup variables are stacked into a single (number of lookup variables, grid size) float64
+    table, and every lookup variable is evaluated from one set of stencil indices and weights per
+    query point.
+
+    method:
+      "linear" (multilinear) or "cubic" (tensor-product cubic Hermite with finite-difference slopes)
+    extrapolation (for query points outside the grid):
+      "constant": use the value at the nearest grid boundary
+      "linear": extend the boundary interval linearly
+      "nan": return NaN for every lookup variable
+      "error": raise an exception
+    '''
+
+    chunk_size = 4096
+
+    def __init__(self, grid_variables, lookup_variables, method='linear', extrapolation='constant'):
+        require_numpy()
+        self.grid_variable_names = list(grid_variables)
+        self.lookup_variable_names = list(lookup_variables)
+        self.axes = []
+        for name, values in grid_variables.items():
+            axis = np.ascontiguousarray(values, dtype=np.float64).ravel()
+            if axis.size == 0:
+                raise Exception(f"Grid variable \"{name}\" has no values.")
+            if np.any(np.diff(axis) <= 0.0):
+                raise Exception(f"Grid variable \"{name}\" must be strictly increasing.")
+            self.axes.append(axis)
+        self.shape = tuple(axis.size for axis in self.axes)
+        size = int(np.prod(self.shape))
+        self.table = np.empty((len(self.lookup_variable_names), size), dtype=np.float64)
+        for index, (name, values) in enumerate(lookup_variables.items()):
+            values = np.asarray(values, dtype=np.float64).ravel()
+            if values.size != size:
+                raise Exception(f"Lookup variable \"{name}\" has {values.size} values, but the grid has {size} points.")
+            self.table[index] = values
+        # Flat index step for each grid variable (last grid variable varying fastest)
+        self.strides = [int(np.prod(self.shape[dimension + 1:])) for dimension in range(len(self.shape))]
+        self.set_method(method)
+        self.set_extrapolation(extrapolation)
+
+    @classmethod
+    def from_content(cls, performance_map, **kwargs):
+        '''
+        Create from a performance map in representation content (lists or arrays).
+        '''
+        return cls(performance_map['grid_variables'], performance_map['lookup_variables'], **kwargs)
+
+    @classmethod
+    def from_grid_set(cls, grid_set, lookup_variables, **kwargs):
+        '''
+        Create from a full-factorial grid set (one row per grid point, as in XLSX performance map
+        sheets or schema.create_grid_set) by decomposing it into its grid variable axes.
+        '''
+        from schema205 import process_grid_set
+        return cls(process_grid_set(grid_set), lookup_variables, **kwargs)
+
+    def set_method(self, method):
+        if method not in INTERPOLATION_METHODS:
+            raise Exception(f"Unsupported interpolation method \"{method}\". Use one of: {', '.join(INTERPOLATION_METHODS)}.")
+        self.method = method
+
+    def set_extrapolation(self, extrapolation):
+        if extrapolation not in EXTRAPOLATION_POLICIES:
+            raise Exception(f"Unsupported extrapolation policy \"{extrapolation}\". Use one of: {', '.join(EXTRAPOLATION_POLICIES)}.")
+        self.extrapolation = extrapolation
+
+    def __call__(self, points):
+        '''
+        Evaluate every lookup variable at (N, d) query points (columns ordered as the grid
+        variables). Returns an (N, number of lookup variables) array. A single (d,) point returns a
+        1-D array.
+        '''
+        points = np.asarray(points, dtype=np.float64)
+        single = points.ndim == 1
+        points = np.atleast_2d(points)
+        if points.ndim != 2 or points.shape[1] != len(self.axes):
+            raise Exception(f"Query points must have shape (N, {len(self.axes)}), not {points.shape}.")
+
+        lower = np.array([axis[0] for axis in self.axes])
+        upper = np.array([axis[-1] for axis in self.axes])
+        outside = ((points < lower) | (points > upper)).any(axis=1)
+        if self.extrapolation == 'error' and outside.any():
+            first = points[np.argmax(outside)].tolist()
+            raise Exception(f"{int(outside.sum())} query point(s) are outside the performance map grid (first: {first}).")
+
+        result = np.empty((points.shape[0], self.table.shape[0]), dtype=np.float64)
+        # Evaluate in chunks so stencil temporaries stay cache-sized for large batches
+        for start in range(0, points.shape[0], self.chunk_size):
+            end = start + self.chunk_size
+            self._evaluate(points[start:end], result[start:end])
+        if self.extrapolation == 'nan':
+            result[outside] = np.nan
+        return result[0] if single else result
+
+    def _evaluate(self, points, result):
+        # Combine the per-grid-variable stencils into (N, k) flat table indices and weights
+        flat_indices = np.zeros((points.shape[0], 1), dtype=np.intp)
+        weights = np.ones((points.shape[0], 1))
+        for dimension, axis in enumerate(self.axes):
+            x = points[:, dimension]
+            out_of_range = (x < axis[0]) | (x > axis[-1])
+            if self.extrapolation != 'linear':
+                x = np.clip(x, axis[0], axis[-1])
+            dimension_indices, dimension_weights = self._dimension_weights(axis, x, out_of_range)
+            flat_indices = (flat_indices[:, :, np.newaxis] + dimension_indices[:, np.newaxis, :]*self.strides[dimension]).reshape(points.shape[0], -1)
+            weights = (weights[:, :, np.newaxis]*dimension_weights[:, np.newaxis, :]).reshape(points.shape[0], -1)
+        for index, values in enumerate(self.table):
+            result[:, index] = np.einsum('nk,nk->n', weights, values.take(flat_indices))
+
+    def lookup(self, points):
+        '''
+        Evaluate at (N, d) query points and return a dictionary of (N,) arrays by lookup variable name.
+        '''
+        result = np.atleast_2d(self(points))
+        return {name: result[:, index] for index, name in enumerate(self.lookup_variable_names)}
+
+    def _dimension_weights(self, axis, x, out_of_range):
+        '''
+        Return (N, k) grid indices and interpolation weights along one grid variable.
+        '''
+        n = axis.size
+        if n == 1:
+            return np.zeros((x.size, 1), dtype=np.intp), np.ones((x.size, 1))
+        i = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, n - 2)
+        h = axis[i + 1] - axis[i]
+        t = (x - axis[i])/h
+        if self.method == 'linear':
+            return np.stack((i, i + 1), axis=1), np.stack((1.0 - t, t), axis=1)
+
+        # Cubic Hermite over the stencil (i - 1, i, i + 1, i + 2), with slopes at i and i + 1 from
+        # central differences (one-sided at the grid boundaries). Stencil indices are clamped to
+        # the grid; clamped entries receive no weight.
+        t2 = t*t
+        t3 = t2*t
+        weights = np.zeros((x.size, 4))
+        weights[:, 1] = 2.0*t3 - 3.0*t2 + 1.0
+        weights[:, 2] = -2.0*t3 + 3.0*t2
+        slope_weight = (t3 - 2.0*t2 + t)*h
+        has_low = i > 0
+        slope_weight = slope_weight/(axis[i + 1] - axis[np.where(has_low, i - 1, i)])
+        weights[:, 0] -= np.where(has_low, slope_weight, 0.0)
+        weights[:, 1] -= np.where(has_low, 0.0, slope_weight)
+        weights[:, 2] += slope_weight
+        slope_weight = (t3 - t2)*h
+        has_high = i + 2 < n
+        slope_weight = slope_weight/(axis[np.where(has_high, i + 2, i + 1)] - axis[i])
+        weights[:, 3] += np.where(has_high, slope_weight, 0.0)
+        weights[:, 2] += np.where(has_high, 0.0, slope_weight)
+        weights[:, 1] -= slope_weight
+        if out_of_range.any():
+            # Extrapolate the boundary interval linearly rather than extending the cubic
+            weights[out_of_range] = 0.0
+            weights[out_of_range, 1] = 1.0 - t[out_of_range]
+            weights[out_of_range, 2] = t[out_of_range]
+        indices = np.clip(i[:, np.newaxis] + np.arange(-1, 3), 0, n - 1)
+        return indices, weights
+
+
+def interpolate(performance_map, points, method='linear', extrapolation='constant'):
+    '''
+    Evaluate every lookup variable of a performance map (from representation content) at (N, d)
+    query points. For repeated evaluation, create a PerformanceMap once and call it instead.
+    '''
+    return PerformanceMap.from_content(performance_map, method=method, extrapolation=extrapolation)(points)
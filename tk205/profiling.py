@@ -0,0 +1,171 @@
+'''
+Opt-in timing and counting instrumentation.
+
+Instrumented code times its phases with timer(name) and reports quantities with count(name, n).
+Both do nothing unless a Profile is being collected (see profile()):
+
+  with tk205.profiling.profile() as collected:
+      tk205.translate("example.xlsx", "example.json")
+  print(collected.format())
+
+Phases are timed inclusively, so nested phases (e.g., "xlsx.read_tree" within "load.xlsx") are
+also counted in their parents:
+
+  load.FORMAT, dump.FORMAT      loading or dumping a file (e.g., "load.xlsx", "dump.json")
+  xlsx.open_workbook            parsing a workbook (openpyxl)
+  xlsx.read_tree                building the tree from worksheets (read_node)
+  xlsx.get_content              collecting content from the tree
+  xlsx.create_tree              building the tree from content (create_tree_from_content)
+  xlsx.create_tree_from_schema  building a template's tree from the schema
+  xlsx.write_tree               setting (and styling) cells
+  xlsx.save_workbook            serializing the workbook and writing it to disk
+  schema.load                   loading a schema (see schemas.get_schema)
+  schema.lookup                 schema node searches not answered by the tree's cache
+  schema.resolve                schema reference resolutions not answered by the tree's cache
+  validate                      validating content against its schema
+
+Counters include cells_read, cells_written, nodes_created, schema_lookups (with
+schema_lookup_misses), bytes_in and bytes_out.
+
+Each thread collects its own Profile, so concurrent profile() contexts (e.g., requests of a
+threaded server) do not see each other's work. Work run in other threads or processes is included
+by map_profiled, which merges the profiles of its calls into the caller's.
+'''
+import time
+import json
+import itertools
+import threading
+from contextlib import contextmanager
+
+class Profile:
+    '''
+    Times (total seconds and calls) by phase, and counters.
+    '''
+
+    def __init__(self):
+        self.timers = {}  # name -> [seconds, calls]
+        self.counters = {}
+        self.lock = threading.Lock()  # For profiles shared between threads
+
+    def add_time(self, name, seconds, calls=1):
+        with self.lock:
+            timer = self.timers.setdefault(name, [0.0, 0])
+            timer[0] += seconds
+            timer[1] += calls
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, data):
+        '''
+        Add the times and counters of another Profile's to_dict() (e.g., from a worker process).
+        '''
+        for name, timer in data["timers"].items():
+            self.add_time(name, timer["seconds"], timer["calls"])
+        for name, amount in data["counters"].items():
+            self.count(name, amount)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "timers": {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items()))}
+
+    def write_json(self, file_path):
+        with open(file_path, 'w') as output_file:
+            json.dump(self.to_dict(), output_file, indent=4)
+
+    def format(self):
+        '''
+        Return a text report of the times (slowest first) and counters.
+        '''
+        width = max([len(name) for name in list(self.timers) + list(self.counters)] + [5])
+        lines = [f"{'phase':<{width}}  {'seconds':>10}  {'calls':>8}"]
+        for name, (seconds, calls) in sorted(self.timers.items(), key=lambda item: -item[1][0]):
+            lines.append(f"{name:<{width}}  {seconds:>10.4f}  {calls:>8}")
+        if self.counters:
+            lines.append('')
+            lines.append(f"{'counter':<{width}}  {'value':>10}")
+            for name, amount in sorted(self.counters.items()):
+                lines.append(f"{name:<{width}}  {amount:>10}")
+        return '\n'.join(lines)
+
+class ThreadState(threading.local):
+    profile = None  # The Profile being collected by the thread, if any
+
+_state = ThreadState()
+
+def get_active_profile():
+    return _state.profile
+
+def is_enabled():
+    return _state.profile is not None
+
+@contextmanager
+def profile(cprofile_path=None):
+    '''
+    Collect a Profile of everything run within the context.
+
+    cprofile_path:
+      also run cProfile, and write its statistics to this path (for pstats or snakeviz)
+    '''
+    previous = _state.profile
+    collected = _state.profile = Profile()
+    profiler = None
+    if cprofile_path is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield collected
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+        if previous is not None:
+            previous.merge(collected.to_dict())
+        _state.profile = previous
+
+@contextmanager
+def timer(name):
+    '''
+    Time the context as a phase of the active Profile (if any).
+    '''
+    active_profile = _state.profile
+    if active_profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        active_profile.add_time(name, time.perf_counter() - start)
+
+def count(name, amount=1):
+    active_profile = _state.profile
+    if active_profile is not None:
+        active_profile.count(name, amount)
+
+def call_profiled(function, *args):
+    '''
+    Call function(*args) while collecting a Profile, returning (result, profile data).
+    '''
+    with profile() as collected:
+        result = function(*args)
+    return result, collected.to_dict()
+
+def map_profiled(executor, function, *iterables, chunksize=1):
+    '''
+    Return list(executor.map(function, *iterables)), adding the profiles of the calls (made in
+    worker processes or threads) to the active Profile, if any. Times are then totals over every
+    worker.
+    '''
+    active_profile = _state.profile
+    if active_profile is None:
+        return list(executor.map(function, *iterables, chunksize=chunksize))
+    results = []
+    for result, data in executor.map(call_profiled, itertools.repeat(function), *iterables, chunksize=chunksize):
+        active_profile.merge(data)
+        results.append(result)
+    return results
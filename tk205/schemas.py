@@ -0,0 +1,92 @@
+import os
+import copy
+import glob
+import threading
+from collections import OrderedDict
+from . import profiling
+
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__),'..','schema-205','build','schema')
+
+def get_schema_path(schema_type, schema_dir=SCHEMA_DIR):
+    return os.path.join(schema_dir, f"{schema_type}.schema.json")
+
+class SchemaRegistry:
+    '''
+    Cache of compiled A205Schema objects keyed by schema name (e.g. "RS0001").
+
+    Least recently used entries are evicted once `max_size` schemas are held, and an
+    entry is rebuilt whenever the modification time of its schema file changes.
+    '''
+
+    def __init__(self, schema_dir=SCHEMA_DIR, max_size=32):
+        self.schema_dir = schema_dir
+        self.max_size = max_size
+        self._entries = OrderedDict()  # schema_type -> (mtime, A205Schema)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, schema_type):
+        return schema_type in self._entries
+
+    def get(self, schema_type):
+        '''
+        Return the shared schema object for `schema_type`, loading it if needed.
+        '''
+        schema_path = get_schema_path(schema_type, self.schema_dir)
+        mtime = os.stat(schema_path).st_mtime_ns
+        with self._lock:
+            entry = self._entries.get(schema_type)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(schema_type)
+                return entry[1]
+            from schema205 import A205Schema
+            with profiling.timer('schema.load'):
+                schema = A205Schema(schema_path)
+            self._entries[schema_type] = (mtime, schema)
+            self._entries.move_to_end(schema_type)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return schema
+
+    def checkout(self, schema_type):
+        '''
+        Return a private copy of the schema for callers that modify schema nodes
+        (e.g. templating, which patches selected alternatives into the schema).
+        '''
+        return copy.deepcopy(self.get(schema_type))
+
+    def preload(self, schema_types=None):
+        '''
+        Load `schema_types` (default: every schema in the schema directory) into the registry.
+        '''
+        if schema_types is None:
+            schema_types = sorted(os.path.basename(path)[:-len('.schema.json')] for path in glob.glob(os.path.join(self.schema_dir, '*.schema.json')))
+        for schema_type in schema_types:
+            self.get(schema_type)
+        return list(schema_types)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+registry = SchemaRegistry()
+
+def get_schema(schema_type):
+    '''
+    Return the process-wide shared schema object for `schema_type`.
+    '''
+    return registry.get(schema_type)
+
+def checkout_schema(schema_type):
+    '''
+    Return a private, modifiable copy of the schema for `schema_type`.
+    '''
+    return registry.checkout(schema_type)
+
+def preload_schemas(schema_types=None):
+    '''
+    Pre-warm the process-wide schema registry.
+    '''
+    return registry.preload(schema_types)
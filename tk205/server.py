@@ -0,0 +1,191 @@
+'''
+Long-running tk205 server.
+
+Keeps tk205's imports and the schema registry warm between requests, so that pipelines calling
+tk205 many times only pay for a local round trip (see client.py for the matching thin client).
+
+Requests are HTTP POSTs of a JSON object of parameters to "/<command>" (GET "/ping" checks that the
+server is up), over a local TCP port or a Unix socket. Responses are JSON objects:
+
+  {"ok": true, "result": ..., "output": "<captured stdout>"}
+  {"ok": false, "error": "<exception type>: <message>", "output": "<captured stdout>"}
+
+Requests are handled one at a time: commands print to (redirected) stdout, and most of their work
+is CPU bound anyway. Paths are used as given, so clients should send absolute paths. The parameters
+of each command, and their defaults, are defined in client.COMMAND_PARAMETERS.
+
+Commands read and write any path the server can, so only local, non-browser clients are served:
+POSTs must be "Content-Type: application/json" (which web pages cannot send cross-origin without a
+preflight the server never answers), requests carrying an Origin header (sent by browsers) are
+refused, and the Host header must name the server's own host or a loopback name (against DNS
+rebinding). A Unix socket (--socket) also limits access to users who can open it.
+'''
+import io
+import os
+import json
+import socket
+import threading
+import socketserver
+import http.server
+from contextlib import redirect_stdout
+from . import validate
+from .file_io import translate, translate_directory
+from .xlsx import template, get_template
+from .schemas import preload_schemas
+from .client import get_parameters
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8205
+LOOPBACK_HOSTS = ('localhost', '127.0.0.1', '[::1]')
+
+def translate_command(input, output, low_memory, jobs, json_style):
+    if os.path.isdir(input):
+        os.makedirs(output, exist_ok=True)
+        translate_directory(input, output, jobs=jobs, low_memory=low_memory, json_style=json_style)
+    else:
+        translate(input, output, low_memory=low_memory, json_style=json_style)
+
+def validate_command(input):
+    validate(input)
+
+def template_command(repspec, output, keywords, cache_dir):
+    if cache_dir is None:
+        template(repspec, output, **keywords)
+    else:
+        with open(output, 'wb') as output_file:
+            output_file.write(get_template(repspec, keywords, cache=cache_dir))
+
+COMMANDS = {
+    'translate': translate_command,
+    'validate': validate_command,
+    'template': template_command,
+}
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+
+    def send_json(self, status, response):
+        body = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def get_refusal(self):
+        '''
+        Return why a request (possibly from a web page) is refused, or None if it is accepted.
+        '''
+        if 'Origin' in self.headers:
+            return "Requests from web pages are not accepted."
+        host = self.headers.get('Host', '')
+        host_name = host[:host.find(']') + 1] if host.startswith('[') else host.rsplit(':', 1)[0]
+        if host_name not in self.server.allowed_hosts:
+            return f"Unexpected host \"{host}\"."
+        return None
+
+    def do_GET(self):
+        refusal = self.get_refusal()
+        if refusal is not None:
+            self.send_json(403, {"ok": False, "error": refusal, "output": ""})
+        elif self.path == '/ping':
+            self.send_json(200, {"ok": True, "result": {"pid": os.getpid()}, "output": ""})
+        else:
+            self.send_json(404, {"ok": False, "error": f"Unknown path \"{self.path}\".", "output": ""})
+
+    def do_POST(self):
+        command = self.path.strip('/')
+        refusal = self.get_refusal()
+        if refusal is not None:
+            self.send_json(403, {"ok": False, "error": refusal, "output": ""})
+            return
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self.send_json(415, {"ok": False, "error": "Requests must be \"Content-Type: application/json\".", "output": ""})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            parameters = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(parameters, dict):
+                raise ValueError("parameters must be a JSON object")
+        except ValueError as e:
+            self.send_json(400, {"ok": False, "error": f"Invalid request: {e}", "output": ""})
+            return
+        if command == 'shutdown':
+            self.send_json(200, {"ok": True, "result": None, "output": ""})
+            # shutdown() waits for the serving loop, which is running this handler
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        if command not in COMMANDS:
+            self.send_json(404, {"ok": False, "error": f"Unknown command \"{command}\".", "output": ""})
+            return
+        try:
+            parameters = get_parameters(command, parameters)
+        except Exception as e:
+            self.send_json(400, {"ok": False, "error": f"Invalid request: {e}", "output": ""})
+            return
+        output = io.StringIO()
+        try:
+            with redirect_stdout(output):
+                result = COMMANDS[command](**parameters)
+        except Exception as e:
+            self.send_json(500, {"ok": False, "error": f"{type(e).__name__}: {e}", "output": output.getvalue()})
+            return
+        self.send_json(200, {"ok": True, "result": result, "output": output.getvalue()})
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class TCPServer(http.server.HTTPServer):
+    allow_reuse_address = True
+    verbose = False
+    allowed_hosts = LOOPBACK_HOSTS
+
+class UnixServer(socketserver.UnixStreamServer):
+    verbose = False
+    allowed_hosts = LOOPBACK_HOSTS
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            # Remove a stale socket, but never a live server's
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.server_address)
+            except OSError:
+                os.remove(self.server_address)
+            else:
+                raise Exception(f"A server is already listening on \"{self.server_address}\".")
+            finally:
+                probe.close()
+        super().server_bind()
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, verbose=False):
+    '''
+    Create a server on a local TCP port or, if socket_path is given, a Unix socket.
+    '''
+    if socket_path is not None:
+        server = UnixServer(socket_path, RequestHandler)
+    else:
+        server = TCPServer((host, port), RequestHandler)
+        server.allowed_hosts = LOOPBACK_HOSTS + (f"[{host}]" if ':' in host else host,)
+    server.verbose = verbose
+    return server
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, verbose=False):
+    '''
+    Preload every schema and serve requests until a "shutdown" request (or interrupt).
+    '''
+    preload_schemas()
+    server = create_server(host, port, socket_path, verbose)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,554 @@
+'''
+Event-based streaming of JSON and CBOR content.
+
+Content is represented as a flat sequence of events rather than nested Python objects:
+
+  (START_MAP, None), (KEY, name), (END_MAP, None)
+  (START_ARRAY, None), (END_ARRAY, None)
+  (VALUE, scalar)   -- a scalar map value (or top-level scalar)
+  (VALUES, list)    -- a chunk of consecutive scalar items of an array
+
+Arrays of scalars (e.g., performance map grid and lookup variables) are read and written in
+chunks, so translating between JSON and CBOR runs in bounded memory regardless of file size.
+'''
+import os
+import re
+import io
+import json
+import math
+import struct
+import cbor2
+from .json_backends import INDENT, COMPACT, ARRAYS_INLINE
+
+START_MAP = 'start_map'
+END_MAP = 'end_map'
+START_ARRAY = 'start_array'
+END_ARRAY = 'end_array'
+KEY = 'key'
+VALUE = 'value'
+VALUES = 'values'
+
+DEFAULT_CHUNK_SIZE = 2**16
+
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+JSON_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?')
+JSON_NUMBER_CHARACTERS = re.compile(r'[-+0-9.eE]*')
+JSON_NUMBER_RUN = re.compile(r'[-+0-9.eE \t\n\r,]*')  # Consecutive array numbers and separators
+FLOAT_RUN_STRUCTS = {}  # Number of float64 items -> struct for unpacking them
+JSON_LITERALS = {'true': True, 'false': False, 'null': None, 'NaN': float('nan'), 'Infinity': float('inf'), '-Infinity': float('-inf')}
+
+
+class JSONEventReader:
+    '''
+    Incremental JSON parser that reads a text file in chunks and generates events.
+    '''
+
+    def __init__(self, file, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def fill(self):
+        '''
+        Discard consumed text and read the next chunk. Returns False at the end of the file.
+        '''
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def ensure(self, length):
+        while len(self.buffer) - self.position < length and not self.eof:
+            self.fill()
+
+    def peek(self):
+        '''
+        Skip whitespace and return the next character ('' at the end of the file).
+        '''
+        while True:
+            self.position = JSON_WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ''
+
+    def error(self, message):
+        raise Exception(f"Invalid JSON: {message} near \"{self.buffer[self.position:self.position + 20]}\".")
+
+    def expect(self, character):
+        if self.peek() != character:
+            self.error(f"expected '{character}'")
+        self.position += 1
+
+    def read_string(self):
+        while True:
+            try:
+                value, end = json.decoder.scanstring(self.buffer, self.position + 1)
+                self.position = end
+                return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill()
+
+    def read_literal(self):
+        self.ensure(len('-Infinity'))
+        for literal, value in JSON_LITERALS.items():
+            if self.buffer.startswith(literal, self.position):
+                self.position += len(literal)
+                return value
+        self.error("unexpected value")
+
+    def read_scalar(self):
+        character = self.peek()
+        self.ensure(2)
+        if character == '"':
+            return self.read_string()
+        elif character in '-0123456789' and not self.buffer.startswith('-I', self.position):
+            return self.read_number()
+        else:
+            return self.read_literal()
+
+    def read_number(self):
+        while True:
+            end = JSON_NUMBER_CHARACTERS.match(self.buffer, self.position).end()
+            if end == len(self.buffer) and not self.eof:
+                self.fill()
+                continue
+            match = JSON_NUMBER.match(self.buffer, self.position)
+            if match is None or match.end() != end:
+                self.error("invalid number")
+            self.position = end
+            return json.loads(match.group())
+
+    def read_numbers(self):
+        '''
+        Read a run of comma-separated array numbers.
+
+        Returns the numbers and whether the run ended with a comma (i.e., more items follow).
+        '''
+        while True:
+            self.ensure(len('-Infinity'))
+            if self.buffer.startswith('-Infinity', self.position):
+                return [self.read_literal()], False
+            start = self.position
+            end = JSON_NUMBER_RUN.match(self.buffer, start).end()
+            if end == len(self.buffer) and not self.eof:
+                # The run may continue in the next chunk, so only take complete numbers
+                cut = self.buffer.rfind(',', start, end)
+                if cut == -1:
+                    self.fill()
+                    continue
+                self.position = cut + 1
+                return self.parse_numbers(self.buffer[start:cut]), True
+            if self.buffer.startswith('-I', end - 1):
+                end -= 1  # Leave "-Infinity" to be read as a literal
+            text = self.buffer[start:end].rstrip(' \t\n\r')
+            self.position = end
+            more = text.endswith(',')
+            return self.parse_numbers(text[:-1] if more else text), more
+
+    def parse_numbers(self, text):
+        try:
+            return json.loads(f'[{text}]')
+        except json.JSONDecodeError:
+            self.error("invalid number")
+
+    def iter_events(self):
+        yield from self.iter_value_events(VALUE)
+        if self.peek() != '':
+            self.error("unexpected content after the end of the document")
+
+    def iter_value_events(self, scalar_event):
+        character = self.peek()
+        if character == '{':
+            self.position += 1
+            yield (START_MAP, None)
+            if self.peek() == '}':
+                self.position += 1
+            else:
+                while True:
+                    if self.peek() != '"':
+                        self.error("expected a key")
+                    key = self.read_string()
+                    self.expect(':')
+                    yield (KEY, key)
+                    yield from self.iter_value_events(VALUE)
+                    character = self.peek()
+                    self.position += 1
+                    if character == '}':
+                        break
+                    if character != ',':
+                        self.position -= 1
+                        self.error("expected ',' or '}'")
+            yield (END_MAP, None)
+        elif character == '[':
+            self.position += 1
+            yield (START_ARRAY, None)
+            if self.peek() == ']':
+                self.position += 1
+            else:
+                while True:
+                    character = self.peek()
+                    if character in '{[':
+                        yield from self.iter_value_events(VALUES)
+                    elif character in '-0123456789':
+                        values, more = self.read_numbers()
+                        yield (VALUES, values)
+                        if more:
+                            continue
+                    else:
+                        yield (VALUES, [self.read_scalar()])
+                    character = self.peek()
+                    self.position += 1
+                    if character == ']':
+                        break
+                    if character != ',':
+                        self.position -= 1
+                        self.error("expected ',' or ']'")
+            yield (END_ARRAY, None)
+        elif character == '':
+            self.error("unexpected end of file")
+        else:
+            value = self.read_scalar()
+            yield (scalar_event, [value] if scalar_event == VALUES else value)
+
+
+def iter_json_events(file, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Generate events from a JSON text file, reading it in chunks of `chunk_size` characters.
+    '''
+    return JSONEventReader(file, chunk_size).iter_events()
+
+
+def json_scalar(value):
+    if value is True:
+        return 'true'
+    elif value is False:
+        return 'false'
+    elif value is None:
+        return 'null'
+    elif type(value) == float:
+        if math.isfinite(value):
+            return float.__repr__(value)
+        elif math.isnan(value):
+            return 'NaN'
+        return 'Infinity' if value > 0 else '-Infinity'
+    elif type(value) == int:
+        return int.__repr__(value)
+    elif isinstance(value, str):
+        return json.dumps(value)
+    raise Exception(f"Cannot write {type(value).__name__} value to JSON.")
+
+
+def is_finite_floats(values):
+    return set(map(type, values)) == {float} and all(map(math.isfinite, values))
+
+
+def json_scalars(values):
+    if is_finite_floats(values):
+        return map(float.__repr__, values)
+    return map(json_scalar, values)
+
+
+def write_json_events(events, file, indent=4, style=INDENT):
+    '''
+    Write events to a JSON text file, formatted like json.dump(content, file, indent=indent), or in
+    the compact or arrays-inline style (see json_backends).
+
+    In the arrays-inline style, the numbers of an array are held until it ends (to be written on
+    one line) or holds something else (to be written one per line).
+    '''
+    if style == COMPACT:
+        newline, padding, key_separator = '', '', ':'
+    else:
+        newline, padding, key_separator = '\n', ' '*indent, ': '
+    containers = []  # [is map, number of items written, numbers held] for each open container
+
+    def release(container, level):
+        # Write held numbers one per line
+        numbers, container[2] = container[2], None
+        if numbers:
+            separator = ',' + newline + padding*level
+            file.write(separator[1:] + separator.join(numbers))
+
+    for event, value in events:
+        if event == KEY:
+            file.write((',' if containers[-1][1] else '') + newline + padding*len(containers) + json.dumps(value) + key_separator)
+            containers[-1][1] += 1
+        elif event == VALUE:
+            file.write(json_scalar(value))
+        elif event == VALUES:
+            container = containers[-1]
+            if container[2] is not None:
+                if all(type(item) in (int, float) for item in value):
+                    container[2].extend(json_scalars(value))
+                    container[1] += len(value)
+                    continue
+                release(container, len(containers))
+            separator = ',' + newline + padding*len(containers)
+            file.write((separator if container[1] else separator[1:]) + separator.join(json_scalars(value)))
+            container[1] += len(value)
+        elif event == START_MAP or event == START_ARRAY:
+            if containers and not containers[-1][0]:
+                # Array item
+                if containers[-1][2] is not None:
+                    release(containers[-1], len(containers))
+                file.write((',' if containers[-1][1] else '') + newline + padding*len(containers))
+                containers[-1][1] += 1
+            file.write('{' if event == START_MAP else '[')
+            containers.append([event == START_MAP, 0, [] if style == ARRAYS_INLINE and event == START_ARRAY else None])
+        else:  # END_MAP or END_ARRAY
+            container = containers.pop()
+            if container[2] is not None:
+                file.write(','.join(container[2]))
+            elif container[1]:
+                file.write(newline + padding*len(containers))
+            file.write('}' if event == END_MAP else ']')
+
+
+class CBOREventReader:
+    '''
+    Incremental CBOR decoder that generates events from a binary file.
+    '''
+
+    def __init__(self, file, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.file = io.BufferedReader(file, chunk_size) if not isinstance(file, io.BufferedReader) else file
+
+    def read(self, length):
+        data = self.file.read(length)
+        if len(data) != length:
+            raise Exception("Invalid CBOR: unexpected end of file.")
+        return data
+
+    def read_float_run(self, limit):
+        '''
+        Read a run of consecutive float64 items directly from the read buffer (the common case for
+        performance map arrays). Returns an empty tuple if the next item is not a float64.
+        '''
+        data = self.file.peek(9)
+        count = len(data)//9 if limit is None else min(len(data)//9, limit)
+        markers = data[0:9*count:9]
+        count = len(markers) - len(markers.lstrip(b'\xfb'))
+        if count == 0:
+            return ()
+        if count not in FLOAT_RUN_STRUCTS:
+            FLOAT_RUN_STRUCTS[count] = struct.Struct('>' + 'xd'*count)
+        return FLOAT_RUN_STRUCTS[count].unpack(self.file.read(9*count))
+
+    def read_head(self):
+        initial_byte = self.read(1)[0]
+        major_type = initial_byte >> 5
+        info = initial_byte & 0x1f
+        if info < 24:
+            argument = info
+        elif info == 24:
+            argument = self.read(1)[0]
+        elif info == 25:
+            argument = struct.unpack('>H', self.read(2))[0]
+        elif info == 26:
+            argument = struct.unpack('>I', self.read(4))[0]
+        elif info == 27:
+            argument = struct.unpack('>Q', self.read(8))[0]
+        elif info == 31:
+            argument = None  # Indefinite length (or break)
+        else:
+            raise Exception(f"Invalid CBOR: reserved additional information {info}.")
+        return major_type, info, argument
+
+    def read_string(self, major_type, argument):
+        if argument is None:
+            chunks = []
+            while True:
+                chunk_head = self.read_head()
+                if chunk_head[0] == 7 and chunk_head[1] == 31:
+                    break
+                chunks.append(self.read_string(*chunk_head[::2]))
+            return (b'' if major_type == 2 else '').join(chunks)
+        data = self.read(argument)
+        return data if major_type == 2 else data.decode('utf-8')
+
+    def read_simple(self, info, argument):
+        if info == 20:
+            return False
+        elif info == 21:
+            return True
+        elif info == 22 or info == 23:
+            return None
+        elif info == 25:
+            return struct.unpack('>e', struct.pack('>H', argument))[0]
+        elif info == 26:
+            return struct.unpack('>f', struct.pack('>I', argument))[0]
+        elif info == 27:
+            return struct.unpack('>d', struct.pack('>Q', argument))[0]
+        raise Exception(f"Unsupported CBOR simple value {argument}.")
+
+    def iter_events(self):
+        yield from self.iter_item_events(self.read_head(), VALUE)
+        if self.file.peek(1):
+            raise Exception("Invalid CBOR: unexpected content after the end of the document.")
+
+    def iter_item_events(self, head, scalar_event):
+        major_type, info, argument = head
+        if major_type == 6:
+            if argument != 55799:  # Self-described CBOR
+                raise Exception(f"Unsupported CBOR tag {argument}.")
+            yield from self.iter_item_events(self.read_head(), scalar_event)
+        elif major_type == 5:
+            yield (START_MAP, None)
+            remaining = argument
+            while remaining is None or remaining > 0:
+                key_head = self.read_head()
+                if remaining is None and key_head[0] == 7 and key_head[1] == 31:
+                    break
+                yield (KEY, self.read_scalar(key_head))
+                yield from self.iter_item_events(self.read_head(), VALUE)
+                if remaining is not None:
+                    remaining -= 1
+            yield (END_MAP, None)
+        elif major_type == 4:
+            yield (START_ARRAY, None)
+            remaining = argument
+            values = []
+            while remaining is None or remaining > 0:
+                floats = self.read_float_run(remaining)
+                if floats:
+                    values.extend(floats)
+                    if remaining is not None:
+                        remaining -= len(floats)
+                    if len(values) >= DEFAULT_CHUNK_SIZE:
+                        yield (VALUES, values)
+                        values = []
+                    continue
+                item_head = self.read_head()
+                if remaining is None and item_head[0] == 7 and item_head[1] == 31:
+                    break
+                if item_head[0] in (4, 5, 6):
+                    if values:
+                        yield (VALUES, values)
+                        values = []
+                    yield from self.iter_item_events(item_head, VALUES)
+                else:
+                    values.append(self.read_scalar(item_head))
+                    if len(values) >= DEFAULT_CHUNK_SIZE:
+                        yield (VALUES, values)
+                        values = []
+                if remaining is not None:
+                    remaining -= 1
+            if values:
+                yield (VALUES, values)
+            yield (END_ARRAY, None)
+        else:
+            value = self.read_scalar(head)
+            yield (scalar_event, [value] if scalar_event == VALUES else value)
+
+    def read_scalar(self, head):
+        major_type, info, argument = head
+        if major_type == 0:
+            return argument
+        elif major_type == 1:
+            return -1 - argument
+        elif major_type == 2 or major_type == 3:
+            return self.read_string(major_type, argument)
+        elif major_type == 7:
+            return self.read_simple(info, argument)
+        raise Exception(f"Invalid CBOR: expected a scalar (major type {major_type}).")
+
+
+def iter_cbor_events(file, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Generate events from a CBOR binary file.
+    '''
+    return CBOREventReader(file, chunk_size).iter_events()
+
+
+def cbor_scalar(value):
+    if type(value) == float and math.isfinite(value):
+        return struct.pack('>Bd', 0xfb, value)  # Same encoding as cbor2
+    return cbor2.dumps(value)
+
+
+def cbor_scalars(values):
+    if is_finite_floats(values):
+        # Interleave the float64 initial byte with the packed values
+        count = len(values)
+        packed = struct.pack(f'>{count}d', *values)
+        data = bytearray(9*count)
+        data[0::9] = b'\xfb'*count
+        for i in range(8):
+            data[i + 1::9] = packed[i::8]
+        return data
+    return b''.join(map(cbor_scalar, values))
+
+
+def write_cbor_events(events, file, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Write events to a CBOR binary file.
+
+    Maps and arrays are written with indefinite lengths, since their sizes are not known in advance.
+    '''
+    buffer = bytearray()
+    for event, value in events:
+        if event == VALUES:
+            buffer += cbor_scalars(value)
+        elif event == KEY or event == VALUE:
+            buffer += cbor_scalar(value)
+        elif event == START_MAP:
+            buffer.append(0xbf)
+        elif event == START_ARRAY:
+            buffer.append(0x9f)
+        else:  # END_MAP or END_ARRAY
+            buffer.append(0xff)
+        if len(buffer) >= chunk_size:
+            file.write(buffer)
+            buffer.clear()
+    file.write(buffer)
+
+
+def build_content(events):
+    '''
+    Build Python content (dicts, lists and scalars) from events.
+    '''
+    stack = [[]]
+    keys = []
+    for event, value in events:
+        if event == START_MAP or event == START_ARRAY:
+            stack.append({} if event == START_MAP else [])
+        elif event == END_MAP or event == END_ARRAY:
+            item = stack.pop()
+            if isinstance(stack[-1], dict):
+                stack[-1][keys.pop()] = item
+            else:
+                stack[-1].append(item)
+        elif event == KEY:
+            keys.append(value)
+        elif event == VALUES:
+            stack[-1].extend(value)
+        elif isinstance(stack[-1], dict):
+            stack[-1][keys.pop()] = value
+        else:
+            stack[-1].append(value)
+    return stack[0][0]
+
+
+STREAM_FORMATS = {
+    '.json': (iter_json_events, write_json_events, ''),
+    '.cbor': (iter_cbor_events, write_cbor_events, 'b'),
+}
+
+def can_stream(file_path):
+    return os.path.splitext(file_path)[1].lower() in STREAM_FORMATS
+
+def translate_stream(input_file_path, output_file_path, json_style=INDENT):
+    '''
+    Translate between streamable formats (JSON and CBOR) without building the content in memory.
+    '''
+    reader, _, input_mode = STREAM_FORMATS[os.path.splitext(input_file_path)[1].lower()]
+    _, writer, output_mode = STREAM_FORMATS[os.path.splitext(output_file_path)[1].lower()]
+    options = {'style': json_style} if writer is write_json_events else {}
+    with open(input_file_path, 'r' + input_mode) as input_file, open(output_file_path, 'w' + output_mode) as output_file:
+        writer(reader(input_file), output_file, **options)
@@ -0,0 +1,304 @@
+'''
+Synthetic representations of any size, for load and stress testing.
+
+The structure of a representation is taken from its schema, as for XLSX templates (see
+A205XLSXTree.template_tree), including the selection of alternatives by keyword (e.g.,
+operation_speed_control_type="DISCRETE"). Each data element is then given a random value that
+satisfies its schema (enumerants, bounds, item counts and known string patterns) and is physically
+plausible for its units (e.g., temperatures between 0 and 50 C).
+
+Performance maps have monotonically increasing grid variables, sized to about `points` grid points
+in total, and lookup variables with one value per grid point. Content is generated as streaming
+events (see streaming), so JSON and CBOR files of any size are written in bounded memory.
+'''
+import os
+import re
+import math
+import uuid
+import random
+from .xlsx import A205XLSXTree
+from .schemas import checkout_schema
+from .json_backends import INDENT
+from . import streaming
+from .streaming import START_MAP, END_MAP, START_ARRAY, END_ARRAY, KEY, VALUE, VALUES
+
+# Keywords selecting schema alternatives that are otherwise required (see A205XLSXTree.create_tree_from_schema)
+DEFAULT_KEYWORDS = {"operation_speed_control_type": "CONTINUOUS"}
+
+# Plausible ranges of values by units (narrowed further by any schema bounds)
+PLAUSIBLE_RANGES = {
+    "K": (273.15, 323.15),
+    "Pa": (0.0, 2000.0),
+    "W": (500.0, 500000.0),
+    "J": (1000.0, 1000000.0),
+    "m3/s": (0.01, 2.0),
+    "kg/s": (0.01, 2.5),
+    "rev/s": (5.0, 60.0),
+    "Hz": (10.0, 60.0),
+    "V": (110.0, 600.0),
+    "A": (1.0, 100.0),
+    "N·m": (1.0, 500.0),
+    "m": (0.1, 5.0),
+    "m2": (0.1, 10.0),
+    "m3": (0.01, 2.0),
+    "kg": (1.0, 2000.0),
+    "s": (1.0, 3600.0),
+    "-": (0.0, 1.0),
+}
+DEFAULT_RANGE = (0.0, 100.0)
+ABSOLUTE_PRESSURE_RANGE = (80000.0, 105000.0)
+
+CHUNK_SIZE = 2**14  # Values generated at a time for large arrays
+
+class Synthesizer:
+    '''
+    Generator of random, schema-conforming content for a representation specification.
+
+    points:
+      approximate number of grid points in each performance map (split evenly between its grid variables)
+    grid_points:
+      number of points of specific grid variables, by name (overriding `points`)
+    max_depth:
+      deepest level of embedded representations to include when they are optional (None for all)
+    optional:
+      include optional data elements (otherwise only required ones)
+    array_items:
+      number of items of other arrays (within the schema's minItems and maxItems)
+    seed:
+      random seed, for reproducible content
+    keywords:
+      data element values selecting schema alternatives (as for templates)
+    '''
+
+    def __init__(self, repspec, points=1000, grid_points=None, max_depth=None, optional=True, array_items=2, seed=None, **keywords):
+        self.repspec = repspec
+        self.points = points
+        self.grid_points = grid_points or {}
+        self.max_depth = max_depth
+        self.optional = optional
+        self.array_items = array_items
+        self.random = random.Random(seed)
+        self.keywords = dict(DEFAULT_KEYWORDS, **keywords)
+        self.tree = None
+
+    def create_tree(self):
+        self.tree = A205XLSXTree()
+        # Templating modifies the schema, so use a private copy of the shared schema
+        self.tree.set_schema_type(self.repspec)
+        self.tree.schema = checkout_schema(self.repspec)
+        self.tree.template_tree(self.repspec, **self.keywords)
+
+    def iter_events(self):
+        '''
+        Generate the events of a new representation.
+        '''
+        if self.tree is None:
+            self.create_tree()
+        yield from self.iter_map_events(self.tree.root_node, 0, 1)
+
+    def get_content(self):
+        return streaming.build_content(self.iter_events())
+
+    def is_required(self, node):
+        '''
+        True if a data element is required. Data elements required only under a condition (e.g.,
+        "if" condenser_type is LIQUID "then" condenser_liquid_type is required) are treated as
+        required, so content is valid whatever values are chosen for the condition.
+        '''
+        parent_schema_node = node.parent.get_schema_node()
+        if 'items' in parent_schema_node:
+            parent_schema_node = self.tree.resolve(parent_schema_node['items'], step_in=False)
+        if node.name in parent_schema_node.get('required', []):
+            return True
+        return any(node.name in alternative.get('then', {}).get('required', []) for alternative in parent_schema_node.get('allOf', []))
+
+    def includes(self, node, depth):
+        if self.is_required(node):
+            return True
+        if node.name.endswith('_representation') and self.max_depth is not None and depth >= self.max_depth:
+            return False
+        return self.optional
+
+    def get_grid_lengths(self, node, depth):
+        '''
+        Return the number of points of each grid variable of a performance map node.
+        '''
+        grid_variables = [child for child in node.children if child.name == 'grid_variables']
+        if not grid_variables:
+            return {}
+        names = [child.name for child in grid_variables[0].children if self.includes(child, depth)]
+        default_names = [name for name in names if name not in self.grid_points]
+        fixed_points = 1
+        for name in names:
+            if name in self.grid_points:
+                fixed_points *= self.grid_points[name]
+        default_length = max(2, round((self.points/fixed_points)**(1/len(default_names)))) if default_names else 0
+        return {name: self.grid_points.get(name, default_length) for name in names}
+
+    def iter_map_events(self, node, depth, size, grid_lengths=None):
+        yield (START_MAP, None)
+        for child in node.children:
+            if self.includes(child, depth):
+                yield (KEY, child.name)
+                yield from self.iter_node_events(child, depth, size, grid_lengths)
+        yield (END_MAP, None)
+
+    def iter_node_events(self, node, depth, size, grid_lengths):
+        schema_node = node.get_schema_node()
+        if node.children:
+            if node.name.endswith('_representation'):
+                depth += 1
+            if 'items' in schema_node:
+                # Array of data groups
+                yield (START_ARRAY, None)
+                for _ in range(self.get_item_count(schema_node)):
+                    yield from self.iter_map_events(node, depth, size, grid_lengths)
+                yield (END_ARRAY, None)
+                return
+            lengths = self.get_grid_lengths(node, depth)
+            if lengths:
+                grid_lengths = lengths
+                size = math.prod(lengths.values())
+            yield from self.iter_map_events(node, depth, size, grid_lengths)
+        elif node.value is not None:
+            # Set by the template (e.g., schema_version or a keyword)
+            yield (VALUE, node.value)
+        elif 'items' in schema_node:
+            item_schema_node = self.tree.resolve(schema_node['items'], step_in=False)
+            if 'units' in schema_node and 'units' not in item_schema_node:
+                # Units are given for the array as a whole
+                item_schema_node = dict(item_schema_node, units=schema_node['units'])
+            if node.parent.name == 'grid_variables':
+                yield from iter_array_events(self.get_grid_values(node.name, item_schema_node, grid_lengths[node.name]))
+            elif node.parent.name == 'lookup_variables':
+                yield (START_ARRAY, None)
+                for start in range(0, size, CHUNK_SIZE):
+                    yield (VALUES, self.get_values(node.name, item_schema_node, min(CHUNK_SIZE, size - start)))
+                yield (END_ARRAY, None)
+            else:
+                yield from iter_array_events(self.get_values(node.name, item_schema_node, self.get_item_count(schema_node)))
+        elif schema_node.get('type') == 'object':
+            yield (START_MAP, None)
+            yield (END_MAP, None)
+        elif node.name == 'schema' and node.parent.name == 'metadata':
+            yield (VALUE, node.inner_rs)
+        else:
+            yield (VALUE, self.get_values(node.name, schema_node, 1)[0])
+
+    def get_item_count(self, schema_node):
+        return max(schema_node.get('minItems', 1), min(schema_node.get('maxItems', self.array_items), self.array_items))
+
+    def get_range(self, name, schema_node):
+        '''
+        Return the (low, high) range of plausible values of a number, within the schema's bounds.
+        '''
+        if 'pressure' in name and 'absolute' in name:
+            low, high = ABSOLUTE_PRESSURE_RANGE
+        else:
+            low, high = PLAUSIBLE_RANGES.get(schema_node.get('units'), DEFAULT_RANGE)
+        minimum = schema_node.get('minimum', schema_node.get('exclusiveMinimum'))
+        maximum = schema_node.get('maximum', schema_node.get('exclusiveMaximum'))
+        span = high - low
+        if minimum is not None and low < minimum:
+            low = minimum
+            high = max(high, low + span)
+        if maximum is not None and high > maximum:
+            high = maximum
+            low = min(low, high - span) if minimum is None else max(minimum, min(low, high - span))
+        # Keep clear of exclusive bounds
+        margin = (high - low)*1e-3
+        if 'exclusiveMinimum' in schema_node and 'minimum' not in schema_node:
+            low += margin
+        if 'exclusiveMaximum' in schema_node and 'maximum' not in schema_node:
+            high -= margin
+        return low, high
+
+    def get_grid_values(self, name, schema_node, length):
+        '''
+        Return `length` increasing values of a grid variable.
+        '''
+        if schema_node.get('type') == 'integer':
+            start = math.ceil(schema_node.get('minimum', 1))
+            return list(range(start, start + length))
+        low, high = self.get_range(name, schema_node)
+        digits = get_significant_decimals(low, high, max(length, 1000))
+        return [round(low + (high - low)*index/max(1, length - 1), digits) for index in range(length)]
+
+    def get_values(self, name, schema_node, count):
+        '''
+        Return `count` random values that satisfy a (scalar) schema node.
+        '''
+        choose = self.random.choice
+        if 'const' in schema_node:
+            return [schema_node['const']]*count
+        if 'enum' in schema_node:
+            return [choose(schema_node['enum']) for _ in range(count)]
+        data_type = schema_node.get('type')
+        if data_type == 'boolean':
+            return [choose((True, False)) for _ in range(count)]
+        if data_type == 'integer':
+            low, high = self.get_range(name, schema_node)
+            return [self.random.randint(math.ceil(low), max(math.ceil(low), math.floor(high))) for _ in range(count)]
+        if data_type == 'number':
+            low, high = self.get_range(name, schema_node)
+            digits = get_significant_decimals(low, high)
+            span = high - low
+            uniform = self.random.random
+            return [round(low + span*uniform(), digits) for _ in range(count)]
+        if data_type == 'array':
+            return [self.get_values(name, self.tree.resolve(schema_node['items'], step_in=False), self.get_item_count(schema_node)) for _ in range(count)]
+        return [self.get_string(name, schema_node) for _ in range(count)]
+
+    def get_string(self, name, schema_node):
+        '''
+        Return a string matching the schema's pattern, if it is a known one (an identifier,
+        timestamp or version), or otherwise a description of the data element.
+        '''
+        candidates = [
+            str(uuid.UUID(int=self.random.getrandbits(128), version=4)),
+            f"2024-{self.random.randint(1, 12):02}-{self.random.randint(1, 28):02}T{self.random.randint(0, 23):02}:{self.random.randint(0, 59):02}Z",
+            "1.0.0",
+            f"Synthetic {name.replace('_', ' ')}"]
+        if 'pattern' in schema_node:
+            for candidate in candidates:
+                if re.search(schema_node['pattern'], candidate):
+                    return candidate
+        return candidates[-1]
+
+def iter_array_events(values):
+    '''
+    Generate the events of a list of scalars (or of nested lists).
+    '''
+    yield (START_ARRAY, None)
+    if values and isinstance(values[0], list):
+        for value in values:
+            yield from iter_array_events(value)
+    elif values:
+        yield (VALUES, values)
+    yield (END_ARRAY, None)
+
+def get_significant_decimals(low, high, count=1000):
+    '''
+    Return the number of decimals needed to tell apart `count` values between low and high.
+    '''
+    step = (high - low)/max(1, count)
+    if step <= 0:
+        return 6
+    return max(0, 1 - math.floor(math.log10(step)))
+
+def synthesize(repspec, output_path, json_style=INDENT, **options):
+    '''
+    Write a synthetic representation (see Synthesizer for the options) to a file in any format.
+
+    JSON and CBOR files are streamed, so their size is not limited by memory.
+    '''
+    synthesizer = Synthesizer(repspec, **options)
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension in streaming.STREAM_FORMATS:
+        _, writer, mode = streaming.STREAM_FORMATS[extension]
+        writer_options = {'style': json_style} if writer is streaming.write_json_events else {}
+        with open(output_path, 'w' + mode) as output_file:
+            writer(synthesizer.iter_events(), output_file, **writer_options)
+    else:
+        from .file_io import dump
+        dump(synthesizer.get_content(), output_path, json_style=json_style)
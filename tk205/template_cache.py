@@ -0,0 +1,70 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from .schemas import SCHEMA_DIR
+from .manifest import get_tk205_version, get_schema_version
+
+def get_default_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_home, 'tk205', 'templates')
+
+class TemplateCache:
+    '''
+    Content-addressed store of generated XLSX templates.
+
+    Templates are keyed by a hash of the repspec, the template keyword arguments, the compiled
+    schemas (templates embed other representations' schemas) and the tk205 version (including its
+    sources), so a cached template is only reused if it would be generated identically.
+    '''
+
+    def __init__(self, cache_dir=None, schema_dir=SCHEMA_DIR):
+        self.cache_dir = get_default_cache_dir() if cache_dir is None else cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.version = f"{get_tk205_version()}:{get_schema_version(schema_dir)}"
+
+    def get_key(self, repspec, keywords):
+        key = json.dumps({"version": self.version, "repspec": repspec, "keywords": keywords}, sort_keys=True)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.xlsx")
+
+    def get(self, key):
+        '''
+        Return the cached template bytes for a key, or None.
+        '''
+        try:
+            with open(self.get_path(key), 'rb') as template_file:
+                return template_file.read()
+        except FileNotFoundError:
+            return None
+
+    def copy_to(self, key, output_path):
+        '''
+        Copy a cached template to output_path. Returns False if it is not cached.
+        '''
+        try:
+            shutil.copyfile(self.get_path(key), output_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key, file_path):
+        '''
+        Store a generated template file (atomically, so concurrent builds never see partial files).
+        '''
+        descriptor, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        os.close(descriptor)
+        try:
+            shutil.copyfile(file_path, temporary_path)
+            os.replace(temporary_path, self.get_path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+    def clear(self):
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith('.xlsx'):
+                os.remove(os.path.join(self.cache_dir, file_name))
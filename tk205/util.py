@@ -1,32 +1,247 @@
+import io
+import os
+import sys
+from contextlib import contextmanager
 from numbers import Number
 from math import isclose
 
 
-def objects_near_equal(object1, object2, rel_tol=1e-9, abs_tol=0.0):
+def is_array(value):
+    '''
+    True for NumPy arrays, without importing NumPy (no value can be an array until it is imported).
+    '''
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+def get_numpy():
+    '''
+    Return NumPy, or None if it is not installed.
+    '''
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+# Lists shorter than this are compared element by element (converting them costs more than it saves)
+ARRAY_COMPARISON_MIN_LENGTH = 16
+
+def as_numeric_array(value, min_length=ARRAY_COMPARISON_MIN_LENGTH):
+    '''
+    Return a NumPy array (or a list of numbers, or nested lists of numbers of regular shape) as a
+    float64 array, or None if it is not one (or NumPy is not installed).
+    '''
+    if is_array(value):
+        array = value
+    elif isinstance(value, list) and len(value) >= min_length and (not value or isinstance(value[0], (Number, list))):
+        np = get_numpy()
+        if np is None:
+            return None
+        try:
+            array = np.asarray(value)
+        except (ValueError, OverflowError):
+            # Ragged nesting
+            return None
+    else:
+        return None
+    if array.dtype.kind not in 'biuf':
+        # Strings, None, dictionaries, ...
+        return None
+    return array.astype('float64', copy=False)
+
+
+def format_path(path):
+    '''
+    Format a path of keys and indices, e.g., ("performance_map", "grid_variables", "x", 3) as
+    "performance_map.grid_variables.x[3]".
+    '''
+    text = ''
+    for item in path:
+        text += f"[{item}]" if isinstance(item, int) else f".{item}"
+    return text.lstrip('.') or '(root)'
+
+
+class Comparison:
+    '''
+    Result of compare_objects. Truthy if the objects are near equal.
+
+    path and message describe the first difference found (None if there is none), and
+    max_abs_error and max_rel_error are the largest absolute and relative differences between any of
+    the numbers compared.
+    '''
+
+    def __init__(self, stop_at_first_difference=False):
+        self.equal = True
+        self.path = None
+        self.message = None
+        self.max_abs_error = 0.0
+        self.max_rel_error = 0.0
+        self.stop_at_first_difference = stop_at_first_difference
+
+    def __bool__(self):
+        return self.equal
+
+    def __str__(self):
+        errors = f"max absolute error: {self.max_abs_error:.6g}, max relative error: {self.max_rel_error:.6g}"
+        if self.equal:
+            return f"Objects are near equal ({errors})."
+        return f"Objects differ at {format_path(self.path)}: {self.message} ({errors})."
+
+    @property
+    def done(self):
+        return self.stop_at_first_difference and not self.equal
+
+    def add_difference(self, path, message):
+        if self.equal:
+            self.equal = False
+            self.path = tuple(path)
+            self.message = message
+
+    def add_errors(self, abs_error, rel_error):
+        # NaN errors (which are always differences) are ignored
+        if abs_error > self.max_abs_error:
+            self.max_abs_error = float(abs_error)
+        if rel_error > self.max_rel_error:
+            self.max_rel_error = float(rel_error)
+
+
+def get_array_errors(array1, array2, rel_tol=1e-9, abs_tol=0.0):
+    '''
+    Compare float64 arrays of the same shape element-wise, using the same tolerance as math.isclose.
+
+    Returns arrays of whether each pair of elements is close, and their absolute and relative errors.
+    '''
+    import numpy as np
+    with np.errstate(invalid='ignore', divide='ignore'):
+        exact = array1 == array2
+        abs_error = np.where(exact, 0.0, np.abs(array1 - array2))
+        scale = np.maximum(np.abs(array1), np.abs(array2))
+        # As in math.isclose, infinities are only close to themselves
+        close = exact | (np.isfinite(abs_error) & (abs_error <= np.maximum(rel_tol*scale, abs_tol)))
+        rel_error = np.where(exact, 0.0, abs_error/scale)
+    return close, abs_error, rel_error
+
+
+def compare_arrays(array1, array2, path, comparison, rel_tol=1e-9, abs_tol=0.0):
+    '''
+    Compare float64 arrays, recording their first difference and maximum errors in a Comparison.
+    '''
+    import numpy as np
+    if array1.shape != array2.shape:
+        comparison.add_difference(path, f"shape {array1.shape} != {array2.shape}")
+        return
+    if array1.size == 0:
+        return
+    close, abs_error, rel_error = get_array_errors(array1, array2, rel_tol=rel_tol, abs_tol=abs_tol)
+    comparison.add_errors(np.fmax.reduce(abs_error, axis=None), np.fmax.reduce(rel_error, axis=None))
+    if not close.all():
+        index = np.unravel_index(np.argmin(close), close.shape)
+        comparison.add_difference(path + [int(i) for i in index], f"{array1[index].item()!r} != {array2[index].item()!r}")
+
+
+def arrays_near_equal(array1, array2, rel_tol=1e-9, abs_tol=0.0):
+    '''
+    Compare array-like values (NumPy arrays or lists) element-wise, in flattened (C) order, using
+    the same tolerance as math.isclose.
+    '''
+    import numpy as np
+    try:
+        array1 = np.asarray(array1, dtype=np.float64).ravel()
+        array2 = np.asarray(array2, dtype=np.float64).ravel()
+    except (TypeError, ValueError):
+        return False
+    comparison = Comparison(stop_at_first_difference=True)
+    compare_arrays(array1, array2, [], comparison, rel_tol=rel_tol, abs_tol=abs_tol)
+    return comparison.equal
+
+
+def _compare(object1, object2, path, comparison, rel_tol, abs_tol):
+    # Arrays may be stored in a different shape than the lists they were read from
+    flatten = is_array(object1) or is_array(object2)
+    min_length = 0 if flatten else ARRAY_COMPARISON_MIN_LENGTH
+    array1 = as_numeric_array(object1, min_length)
+    if array1 is not None:
+        array2 = as_numeric_array(object2, min_length)
+        if array2 is not None:
+            if flatten:
+                array1, array2 = array1.ravel(), array2.ravel()
+            compare_arrays(array1, array2, path, comparison, rel_tol=rel_tol, abs_tol=abs_tol)
+            return
+    if is_array(object1):
+        object1 = object1.tolist()
+    if is_array(object2):
+        object2 = object2.tolist()
     if type(object1) != type(object2):
         if not isinstance(object1, Number) or not isinstance(object2, Number):
-            return False
+            comparison.add_difference(path, f"{type(object1).__name__} != {type(object2).__name__}")
+            return
     if isinstance(object1, dict):
         if len(object1) != len(object2):
-            return False
+            comparison.add_difference(path, f"{len(object1)} keys != {len(object2)} keys")
+            return
         for key in object1:
             if key not in object2:
-                return False
-            if not objects_near_equal(object1[key], object2[key], rel_tol=rel_tol, abs_tol=abs_tol):
-                return False
+                comparison.add_difference(path, f"key \"{key}\" is missing")
+                return
+            _compare(object1[key], object2[key], path + [key], comparison, rel_tol, abs_tol)
+            if comparison.done:
+                return
     elif isinstance(object1, list):
         if len(object1) != len(object2):
-            return False
-        for index_item in enumerate(object1):
-            if not objects_near_equal(object1[index_item[0]], object2[index_item[0]], rel_tol=rel_tol, abs_tol=abs_tol):
-                return False
+            comparison.add_difference(path, f"length {len(object1)} != {len(object2)}")
+            return
+        for index, item in enumerate(object1):
+            _compare(item, object2[index], path + [index], comparison, rel_tol, abs_tol)
+            if comparison.done:
+                return
     elif isinstance(object1, Number):
+        abs_error = abs(object1 - object2)
+        scale = max(abs(object1), abs(object2))
+        comparison.add_errors(abs_error, abs_error/scale if scale else 0.0)
         if not isclose(object1, object2, rel_tol=rel_tol, abs_tol=abs_tol):
-            return False
+            comparison.add_difference(path, f"{object1!r} != {object2!r}")
+    elif not (object1 == object2):
+        comparison.add_difference(path, f"{object1!r} != {object2!r}")
+
+
+def compare_objects(object1, object2, rel_tol=1e-9, abs_tol=0.0, stop_at_first_difference=False):
+    '''
+    Compare nested dictionaries, lists, arrays and values, with numbers compared as in math.isclose.
+
+    Returns a Comparison reporting the first difference and the maximum absolute and relative
+    errors. Numeric lists and arrays are compared in a single vectorized step when NumPy is
+    installed.
+    '''
+    comparison = Comparison(stop_at_first_difference)
+    _compare(object1, object2, [], comparison, rel_tol, abs_tol)
+    return comparison
+
+
+def objects_near_equal(object1, object2, rel_tol=1e-9, abs_tol=0.0):
+    return compare_objects(object1, object2, rel_tol=rel_tol, abs_tol=abs_tol, stop_at_first_difference=True).equal
+
+
+@contextmanager
+def open_file(file, mode='r'):
+    '''
+    Open a file path, or use an open binary file object (e.g., io.BytesIO) as is, wrapped as UTF-8
+    text for text modes. File objects are left open.
+    '''
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, mode) as opened_file:
+            yield opened_file
+    elif 'b' in mode:
+        yield file
     else:
-        if not (object1 == object2):
-            return False
-    return True
+        # Skip any byte order mark when reading
+        text_file = io.TextIOWrapper(file, encoding='utf-8-sig' if 'r' in mode else 'utf-8')
+        try:
+            yield text_file
+        finally:
+            text_file.flush()
+            text_file.detach()
 
 
 def iterdict(d, dict_as_list, level=0):
@@ -38,3 +253,24 @@ def iterdict(d, dict_as_list, level=0):
         else:
             dict_as_list.append(preamble + ': ' + str(d[key]))
 
+
+def get_keyword_arguments(args):
+    '''
+    Collect data element values given as extra options, either "--key=value" (e.g.,
+    --notes="Generated from template.") or "--key value". Used by "tk205 template", "tk205 synth"
+    and "python -m tk205.client template".
+    '''
+    kwargs = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if '=' in arg:
+            key, value = arg.split('=', 1)
+            kwargs[key.lstrip('-')] = value
+        elif arg.startswith('-'):
+            if i + 1 == len(args):
+                raise Exception(f"No value given for \"{arg}\".")
+            kwargs[arg.lstrip('-')] = args[i + 1]
+            i += 1
+        i += 1
+    return kwargs
@@ -0,0 +1,137 @@
+'''
+Batch validation of representation files, with JSON and JUnit XML reports.
+'''
+import os
+import glob
+import json
+import time
+from .file_io import load
+from .manifest import MANIFEST_FILE_NAME
+from .schemas import get_schema
+from . import profiling
+
+def is_glob_pattern(path):
+    return any(character in path for character in '*?[')
+
+def collect_files(inputs):
+    '''
+    Expand files, directories (recursively) and glob patterns into a sorted list of files.
+    '''
+    file_paths = set()
+    for input in inputs:
+        if is_glob_pattern(input):
+            paths = glob.glob(input, recursive=True)
+            if not paths:
+                raise Exception(f"No files found for \"{input}\".")
+        else:
+            paths = [input]
+        for path in paths:
+            if os.path.isdir(path):
+                for directory, _, file_names in os.walk(path):
+                    for file_name in file_names:
+                        if '~$' not in file_name and file_name != MANIFEST_FILE_NAME and not file_name.startswith('.'):
+                            file_paths.add(os.path.join(directory, file_name))
+            elif os.path.isfile(path):
+                file_paths.add(path)
+            else:
+                raise Exception(f"No files found for \"{input}\".")
+    return sorted(file_paths)
+
+def get_path_key(error):
+    '''
+    Sort key of an error's location in the content (array indices in numeric order, e.g., 2 before 10).
+    '''
+    return [(isinstance(item, int), item) for item in error.absolute_path]
+
+def format_error(error):
+    return f"{error.message} ({'.'.join(str(item) for item in error.absolute_path)})"
+
+def get_error_messages(errors):
+    '''
+    Return messages for validation errors, as schema205 reports them: "<message> (<path>)".
+
+    A failed "oneOf" or "anyOf" is reported by the errors of its alternatives that reached further
+    into the content than it did (e.g., a missing property of the intended alternative), rather
+    than as "... is not valid under any of the given schemas", which is only reported if there are
+    none.
+    '''
+    messages = []
+    for error in errors:
+        if error.validator in ('oneOf', 'anyOf'):
+            level = len(error.absolute_path)
+            deeper_errors = [context_error for context_error in error.context if len(context_error.absolute_path) > level]
+            if deeper_errors:
+                messages += get_error_messages(sorted(deeper_errors, key=get_path_key))
+                continue
+        messages.append(format_error(error))
+    return messages
+
+def get_schema_errors(schema, contents):
+    '''
+    Return messages for every error from the schema's validator (empty if the content is valid),
+    in content order (see get_error_messages).
+    '''
+    with profiling.timer('validate'):
+        errors = sorted(schema.validator.iter_errors(contents), key=get_path_key)
+    return get_error_messages(errors)
+
+def get_errors(contents):
+    '''
+    Return the schema validation errors of content, against the schema named in its metadata.
+    '''
+    return get_schema_errors(get_schema(contents['metadata']['schema']), contents)
+
+def validate_file(file_path):
+    '''
+    Validate one file, returning a result dictionary rather than raising:
+
+      {"file": path, "schema": schema name (or None), "valid": bool, "errors": [messages], "time": seconds}
+    '''
+    start = time.perf_counter()
+    schema_name = None
+    try:
+        contents = load(file_path)
+        schema_name = contents['metadata']['schema']
+        errors = get_errors(contents)
+    except Exception as e:
+        errors = [f"{type(e).__name__}: {e}"]
+    return {"file": file_path, "schema": schema_name, "valid": len(errors) == 0, "errors": errors, "time": time.perf_counter() - start}
+
+def _init_validate_worker():
+    from .schemas import preload_schemas
+    preload_schemas()
+
+def validate_files(file_paths, jobs=1):
+    '''
+    Validate files, optionally over a pool of `jobs` processes (`None` uses every CPU), each
+    holding its own warm schema registry. Returns one result per file (see validate_file), in order.
+    '''
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs > 1 and len(file_paths) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        chunk_size = max(1, len(file_paths)//(jobs*4))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_validate_worker) as executor:
+            return profiling.map_profiled(executor, validate_file, file_paths, chunksize=chunk_size)
+    return [validate_file(file_path) for file_path in file_paths]
+
+def write_json_report(results, output_path):
+    failures = sum(not result["valid"] for result in results)
+    report = {"files": len(results), "failures": failures, "results": results}
+    with open(output_path, 'w') as output_file:
+        json.dump(report, output_file, indent=4)
+
+def write_junit_report(results, output_path, suite_name="tk205 validate"):
+    '''
+    Write results as a JUnit XML test suite (one test case per file), as read by CI systems.
+    '''
+    import xml.etree.ElementTree as ElementTree
+    failures = sum(not result["valid"] for result in results)
+    suite = ElementTree.Element("testsuite", name=suite_name, tests=str(len(results)), failures=str(failures), errors="0",
+                                time=f"{sum(result['time'] for result in results):.3f}")
+    for result in results:
+        case = ElementTree.SubElement(suite, "testcase", classname=result["schema"] or "unknown", name=result["file"], time=f"{result['time']:.3f}")
+        if not result["valid"]:
+            failure = ElementTree.SubElement(case, "failure", message=f"{len(result['errors'])} validation error(s)")
+            failure.text = '\n'.join(result["errors"])
+    ElementTree.ElementTree(suite).write(output_path, encoding="utf-8", xml_declaration=True)
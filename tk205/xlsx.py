@@ -1,12 +1,21 @@
 import openpyxl
 from openpyxl.styles import NamedStyle, PatternFill, Border, Side, Alignment, Protection, Font
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter, column_index_from_string
 import os
 import json
 import re
 import enum
 import string
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from schema205 import A205Schema
 from schema205 import process_grid_set, unique_name_with_index
+from .schemas import get_schema, checkout_schema, preload_schemas
+from .template_cache import TemplateCache
+from .util import is_array
+from . import profiling
 
 class SheetType(enum.Enum):
     FLAT = 0
@@ -14,8 +23,163 @@ class SheetType(enum.Enum):
     ARRAY = 2
 
 
+def register_named_style(workbook, attributes):
+    '''
+    Replace a NamedStyle in cell attributes with its name, adding the style to the workbook if needed.
+
+    Assigning styles by name avoids openpyxl comparing the full style for every cell.
+    '''
+    style = attributes.get('style')
+    if isinstance(style, NamedStyle):
+        if style.name not in workbook.named_styles:
+            workbook.add_named_style(style)
+        attributes['style'] = style.name
+    return attributes
+
+
+class XLSXWriter:
+    '''
+    Random-access writer that sets cells directly in an openpyxl workbook.
+    '''
+
+    def __init__(self):
+        self.workbook = openpyxl.Workbook()
+        self.default_sheet = self.workbook.active  # Renamed when the first sheet is created
+
+    def has_sheet(self, sheet):
+        return sheet in self.workbook.sheetnames and self.default_sheet is None
+
+    def create_sheet(self, sheet):
+        if self.default_sheet is not None:
+            self.default_sheet.title = sheet
+            self.default_sheet = None
+        else:
+            self.workbook.create_sheet(sheet)
+
+    def set_cell(self, sheet, row, column, **attributes):
+        '''
+        Set attributes (value, style, comment, font, etc.) of a cell
+        '''
+        cell = self.workbook[sheet].cell(row=row, column=column)
+        for name, attribute in register_named_style(self.workbook, attributes).items():
+            setattr(cell, name, attribute)
+        profiling.count('cells_written')
+
+    def set_column(self, sheet, column, start_row, values, **attributes):
+        '''
+        Set the values (and other attributes) of consecutive cells in a column
+        '''
+        register_named_style(self.workbook, attributes)
+        for row, value in enumerate(values, start=start_row):
+            self.set_cell(sheet, row, column, value=value, **attributes)
+
+    def set_column_dimension(self, sheet, column_letter, **attributes):
+        dimension = self.workbook[sheet].column_dimensions[column_letter]
+        for name, attribute in attributes.items():
+            setattr(dimension, name, attribute)
+
+    def add_list_validation(self, sheet, row, column, formula):
+        dv = openpyxl.worksheet.datavalidation.DataValidation(type='list',formula1=formula,allow_blank=True)
+        dv.add(f"{get_column_letter(column)}{row}")
+        self.workbook[sheet].add_data_validation(dv)
+
+    def save(self, file_name):
+        self.workbook.save(file_name)
+
+
+class XLSXBufferedSheet:
+    '''
+    Sheet content collected by an XLSXStreamWriter until it is written in row order.
+    '''
+
+    def __init__(self):
+        self.cells = {}  # row -> column -> cell attributes
+        self.columns = []  # (column, start row, values, cell attributes) of bulk column data
+        self.column_dimensions = {}
+        self.data_validations = []
+
+    def iter_rows(self, worksheet):
+        '''
+        Generate the sheet's rows, in order, as lists of write-only cells
+        '''
+        max_row = max([max(self.cells, default=0)] + [start + len(values) - 1 for _, start, values, _ in self.columns])
+        for row in range(1, max_row + 1):
+            row_attributes = dict(self.cells.get(row, {}))
+            for column, start, values, attributes in self.columns:
+                if start <= row < start + len(values):
+                    cell_attributes = dict(attributes, value=values[row - start])
+                    if column in row_attributes:
+                        cell_attributes.update(row_attributes[column])
+                    row_attributes[column] = cell_attributes
+            cells = [None]*max(row_attributes, default=0)
+            for column, attributes in row_attributes.items():
+                cell = WriteOnlyCell(worksheet)
+                for name, attribute in attributes.items():
+                    setattr(cell, name, attribute)
+                cells[column - 1] = cell
+            yield cells
+
+
+class XLSXStreamWriter:
+    '''
+    Writer that collects cells for each sheet and writes them, in row order, to a write-only
+    (streaming) workbook when saved.
+
+    Bulk column data is held by reference, so memory and time scale linearly with the size of
+    performance maps.
+    '''
+
+    def __init__(self):
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheets = {}  # Sheet name -> XLSXBufferedSheet (in order of creation)
+
+    def has_sheet(self, sheet):
+        return sheet in self.sheets
+
+    def create_sheet(self, sheet):
+        self.sheets[sheet] = XLSXBufferedSheet()
+
+    def set_cell(self, sheet, row, column, **attributes):
+        cell = self.sheets[sheet].cells.setdefault(row, {}).setdefault(column, {})
+        for name, attribute in register_named_style(self.workbook, attributes).items():
+            # Keep attributes in the order they were last set (e.g., a style overrides an earlier font)
+            cell.pop(name, None)
+            cell[name] = attribute
+        profiling.count('cells_written')
+
+    def set_column(self, sheet, column, start_row, values, **attributes):
+        self.sheets[sheet].columns.append((column, start_row, values, register_named_style(self.workbook, attributes)))
+        profiling.count('cells_written', len(values))
+
+    def set_column_dimension(self, sheet, column_letter, **attributes):
+        self.sheets[sheet].column_dimensions.setdefault(column_letter, {}).update(attributes)
+
+    def add_list_validation(self, sheet, row, column, formula):
+        dv = openpyxl.worksheet.datavalidation.DataValidation(type='list',formula1=formula,allow_blank=True)
+        dv.add(f"{get_column_letter(column)}{row}")
+        self.sheets[sheet].data_validations.append(dv)
+
+    def save(self, file_name):
+        for sheet, buffered_sheet in self.sheets.items():
+            worksheet = self.workbook.create_sheet(sheet)
+            for column_letter, attributes in buffered_sheet.column_dimensions.items():
+                for name, attribute in attributes.items():
+                    setattr(worksheet.column_dimensions[column_letter], name, attribute)
+            for dv in buffered_sheet.data_validations:
+                worksheet.data_validations.append(dv)
+            for row in buffered_sheet.iter_rows(worksheet):
+                worksheet.append(row)
+        self.workbook.save(file_name)
+
+
 class A205XLSXNode:
 
+    # Trees hold a node per data element, so nodes use slots rather than a per-instance __dict__
+    __slots__ = (
+        'children', 'name', 'value', 'sheet_ref', 'parent', 'grid_set', 'tree',
+        'sheet', 'sheet_type', 'beg', 'end', 'next_child_beg', 'child_sheet', 'child_sheet_type',
+        '_lineage', '_option', '_options')
+
     white_space_multiplier = 4
 
     cell_border = Border(
@@ -65,11 +229,13 @@ class A205XLSXNode:
         self.sheet_ref = sheet_ref  # Reference to another sheet (if applicable)
         self.parent = parent  # Parent A205XLSXNode of this node
         self.grid_set = None  # Ordered arrays of repeated grid variable values (used only for grid_variable nodes)
+        self._option = option  # Selected schema alternative (if applicable, see option)
+        self._options = None  # Tuple of selected alternatives, materialized on first use (see options)
+        self._lineage = None  # Tuple of ancestor node names, materialized on first use (see lineage)
+        profiling.count('nodes_created')
 
         if parent:
             # Inherit much information from parent
-            self.lineage = self.parent.lineage + [name]  # List of parent node names (as strings)
-            self.options = self.parent.options + [option]
             self.tree = self.parent.tree
             self.sheet = self.parent.child_sheet
             self.sheet_type = self.parent.child_sheet_type
@@ -80,8 +246,7 @@ class A205XLSXNode:
                 self.next_child_beg = self.beg
         else:
             # Root node
-            self.lineage = []
-            self.options = []
+            self._lineage = ()
             self.tree = tree
             self.sheet = self.tree.schema_type
             self.sheet_type = SheetType.FLAT
@@ -120,6 +285,56 @@ class A205XLSXNode:
         if parent:
             self.parent.add_child(self)
 
+    @property
+    def lineage(self):
+        '''
+        Names of this node and its ancestors (excluding the root), as a tuple.
+
+        Built from the parent's lineage on first use and interned by the tree, so nodes with the
+        same lineage share one tuple.
+        '''
+        if self._lineage is None:
+            lineage = self.parent.lineage + (self.name,)
+            self._lineage = self.tree.lineages.setdefault(lineage, lineage)
+        return self._lineage
+
+    @property
+    def option(self):
+        return self._option
+
+    @option.setter
+    def option(self, option):
+        # Alternatives are selected (by templating) before any children are added
+        self._option = option
+        self._options = None
+
+    @property
+    def options(self):
+        '''
+        Selected schema alternatives of this node and its ancestors (excluding the root), as a tuple.
+
+        Built from the parent's options on first use and kept, like lineage.
+        '''
+        if self._options is None:
+            self._options = self.parent.options + (self._option,) if self.parent is not None else ()
+        return self._options
+
+    @property
+    def inner_rs(self):
+        '''
+        Representation specification (e.g., "RS0003") of the innermost representation containing
+        this node, taken from the schema reference of an embedded "*_representation" data group.
+        '''
+        node = self
+        while node.parent is not None:
+            if node.name.endswith('_representation'):
+                reference = node.parent.get_schema_node().get('properties', {}).get(node.name, {}).get('$ref', '')
+                match = re.search("RS\\d{4}", reference)
+                if match:
+                    return match.group()
+            node = node.parent
+        return self.tree.schema_type
+
     def add_child(self, node):
         '''
         Add a child node to this node.
@@ -166,7 +381,7 @@ class A205XLSXNode:
         '''
         Search for schema content for this node
         '''
-        return self.tree.schema.get_schema_node(self.lineage, self.options)
+        return self.tree.get_schema_node(self.lineage, self.options)
 
     def is_required(self):
         '''
@@ -181,42 +396,52 @@ class A205XLSXNode:
         else:
             return True
 
-    def fill_sheet(self, worksheet):
+    def fill_sheet(self, sheet):
+        writer = self.tree.writer
         for column in [x for x in string.ascii_uppercase] + ["A" + x for x in string.ascii_uppercase]:
-            worksheet.column_dimensions[column].fill = self.unused_style.fill
-            worksheet[f"{column}1"].style = self.tile_style
+            writer.set_column_dimension(sheet, column, fill=self.unused_style.fill)
+            writer.set_cell(sheet, 1, column_index_from_string(column), style=self.tile_style)
 
-    def write_header(self, worksheet):
+    def write_header(self, sheet):
         '''
         Write the header data for a new sheet
         '''
-        self.fill_sheet(worksheet)
+        writer = self.tree.writer
+        self.fill_sheet(sheet)
         if self.parent:
             if self.sheet == self.parent.sheet:
                 # A simple array (not a nested object)
-                worksheet.cell(row=1, column=1).value = '.'.join(self.lineage)
+                writer.set_cell(sheet, 1, 1, value='.'.join(self.lineage))
                 return
             else:
-                worksheet.cell(row=1, column=1).value = '.'.join(self.parent.lineage)
+                writer.set_cell(sheet, 1, 1, value='.'.join(self.parent.lineage))
         else:
-            worksheet.cell(row=1, column=1).value = f"{self.tree.schema_type}: {self.tree.schema.get_rs_title(self.tree.schema_type)}"
+            writer.set_cell(sheet, 1, 1, value=f"{self.tree.schema_type}: {self.tree.schema.get_rs_title(self.tree.schema_type)}")
         if self.sheet_type == SheetType.FLAT:
             xlsx_headers = ['Data Group', 'Data Element', 'Value', 'Units', 'Required']
             for column, header in enumerate(xlsx_headers, start=1):
-                worksheet.cell(row=2, column=column).value = header
-                worksheet.cell(row=2, column=column).style = self.heading_style
-            worksheet.column_dimensions['B'].width = 50
-            worksheet.column_dimensions['C'].width = 31
+                writer.set_cell(sheet, 2, column, value=header, style=self.heading_style)
+            writer.set_column_dimension(sheet, 'B', width=50)
+            writer.set_column_dimension(sheet, 'C', width=31)
+
+    def write_enum_validation(self, sheet, row, column, schema_node):
+        '''
+        Add a drop-down list of enumerants to a cell
+        '''
+        if 'enum' in schema_node:
+            enumerants = f'"{",".join(schema_node["enum"])}"'
+            if len(enumerants) < 256: # Apparent limitation of written lists (TODO: https://stackoverflow.com/a/33532984/1344457)
+                self.tree.writer.add_list_validation(sheet, row, column, enumerants)
 
     def write_node(self):
         '''
         Write tree content to XLSX
         '''
-        wb = self.tree.workbook
+        writer = self.tree.writer
         sheet = self.sheet
-        if sheet not in wb:
-            wb.create_sheet(sheet)
-            self.write_header(wb[sheet])
+        if not writer.has_sheet(sheet):
+            writer.create_sheet(sheet)
+            self.write_header(sheet)
 
         schema_node = self.get_schema_node()
 
@@ -225,92 +450,75 @@ class A205XLSXNode:
 
                 if len(self.children) > 0:
                     level_index = 1
-                    wb[sheet].cell(row=self.beg,column=level_index).value = '.'.join(self.lineage)
+                    writer.set_cell(sheet, self.beg, level_index, value='.'.join(self.lineage))
                 else:
                     level_index = 2
                     buffer = ' '*(self.get_num_ancestors() - 1)*self.white_space_multiplier # TODO: get_num_ancestors_to_root for embedded RS sheets?
-                    wb[sheet].cell(row=self.beg,column=level_index).value = buffer + self.name
+                    writer.set_cell(sheet, self.beg, level_index, value=buffer + self.name)
 
-                wb[sheet].cell(row=self.beg,column=1).style = self.schema_style
-                wb[sheet].cell(row=self.beg,column=2).style = self.schema_style
-                wb[sheet].cell(row=self.beg,column=4).style = self.schema_style
-                wb[sheet].cell(row=self.beg,column=5).style = self.schema_style
-                wb[sheet].cell(row=self.beg,column=3).style = self.value_style
+                writer.set_cell(sheet, self.beg, 1, style=self.schema_style)
+                writer.set_cell(sheet, self.beg, 2, style=self.schema_style)
+                writer.set_cell(sheet, self.beg, 4, style=self.schema_style)
+                writer.set_cell(sheet, self.beg, 5, style=self.schema_style)
+                writer.set_cell(sheet, self.beg, 3, style=self.value_style)
 
                 if schema_node:
                     # Add description
                     if 'description' in schema_node:
                         comment = openpyxl.comments.Comment(schema_node['description'],"ASHRAE 205")
-                        wb[sheet].cell(row=self.beg,column=level_index).comment = comment
+                        writer.set_cell(sheet, self.beg, level_index, comment=comment)
 
                     # Enum validation
-                    if 'enum' in schema_node:
-                        enumerants = f'"{",".join(schema_node["enum"])}"'
-                        if len(enumerants) < 256: # Apparent limitation of written lists (TODO: https://stackoverflow.com/a/33532984/1344457)
-                            dv = openpyxl.worksheet.datavalidation.DataValidation(type='list',formula1=enumerants,allow_blank=True)
-                            wb[sheet].add_data_validation(dv)
-                            dv.add(wb[sheet].cell(row=self.beg,column=3))
+                    self.write_enum_validation(sheet, self.beg, 3, schema_node)
 
                     # Boolean validation
                     if 'type' in schema_node:
                         if schema_node['type'] == 'boolean':
-                            dv = openpyxl.worksheet.datavalidation.DataValidation(type='list',formula1='"TRUE,FALSE"',allow_blank=True)
-                            wb[sheet].add_data_validation(dv)
-                            dv.add(wb[sheet].cell(row=self.beg,column=3))
+                            writer.add_list_validation(sheet, self.beg, 3, '"TRUE,FALSE"')
 
                     # Add units
                     if 'units' in schema_node:
-                        wb[sheet].cell(row=self.beg,column=4).value = schema_node['units']
+                        writer.set_cell(sheet, self.beg, 4, value=schema_node['units'])
 
                     # Add required
                         # TODO: Make conditional formatting (e.g. red name if not entered)
                     if self.is_required():
-                        wb[sheet].cell(row=self.beg,column=5).value = u'\u2713'  # Checkmark
-                    wb[sheet].cell(row=self.beg,column=5).alignment = Alignment(horizontal='center')
+                        writer.set_cell(sheet, self.beg, 5, value=u'\u2713')  # Checkmark
+                    writer.set_cell(sheet, self.beg, 5, alignment=Alignment(horizontal='center'))
 
                 else:
                     # Not found in schema
                     comment = openpyxl.comments.Comment("Not found in schema.","ASHRAE 205")
-                    wb[sheet].cell(row=self.beg,column=level_index).comment = comment
-                    wb[sheet].cell(row=self.beg,column=level_index).font = Font(color='FF0001',bold=True)
+                    writer.set_cell(sheet, self.beg, level_index, comment=comment, font=Font(color='FF0001',bold=True))
 
                 if self.sheet_ref:
-                    wb[sheet].cell(row=self.beg,column=3).value = '$' + self.sheet_ref
-
                     # Hyperlink to referenced sheets
-                    wb[sheet].cell(row=self.beg,column=3).hyperlink = f"#{self.sheet_ref}!A1"
+                    writer.set_cell(sheet, self.beg, 3, value='$' + self.sheet_ref, hyperlink=f"#{self.sheet_ref}!A1")
 
                     if (self.child_sheet_type == SheetType.ARRAY and len(self.children) == 0):
                         # Make sheet for holding array values
                         array_sheet = unique_name_with_index(self.child_sheet,self.tree.sheets)
-                        wb.create_sheet(array_sheet)
-                        self.write_header(wb[array_sheet])
+                        writer.create_sheet(array_sheet)
+                        self.write_header(array_sheet)
 
-                        wb[array_sheet].cell(row=2,column=1).value = self.name
-                        wb[array_sheet].cell(row=2,column=1).style = self.schema_style
-                        wb[array_sheet].cell(row=3,column=1).style = self.schema_style
+                        writer.set_cell(array_sheet, 2, 1, value=self.name, style=self.schema_style)
+                        writer.set_cell(array_sheet, 3, 1, style=self.schema_style)
 
                         if schema_node:
                             if 'units' in schema_node:
-                                wb[array_sheet].cell(row=3,column=1).value = schema_node['units']
+                                writer.set_cell(array_sheet, 3, 1, value=schema_node['units'])
 
-                        row = 4
                         if self.value:
-                            for value in self.value:
-                                wb[array_sheet].cell(row=row,column=1).value = value
-                                wb[array_sheet].cell(row=row,column=1).style = self.value_style
-                                row += 1
+                            writer.set_column(array_sheet, 1, 4, self.value, style=self.value_style)
                         else:
                             array_length = 5
                             if schema_node:
                                 if 'maxItems' in schema_node:
                                     array_length = schema_node['maxItems']
-                            for i in range(array_length):
-                                wb[array_sheet].cell(row=row,column=1).style = self.value_style
-                                row += 1
+                            writer.set_column(array_sheet, 1, 4, [None]*array_length, style=self.value_style)
 
                 if self.value is not None and self.sheet_ref is None:
-                    wb[sheet].cell(row=self.beg,column=3).value = self.value
+                    writer.set_cell(sheet, self.beg, 3, value=self.value)
 
             # TODO: Something better here...a lot of repetition...
             elif self.sheet_type == SheetType.PERFORMANCE_MAP:
@@ -319,48 +527,34 @@ class A205XLSXNode:
                 else:
                     level_index = 3
 
-                wb[sheet].cell(row=level_index,column=self.beg).value = self.name
+                writer.set_cell(sheet, level_index, self.beg, value=self.name)
 
                 if '_variables' in self.parent.name:
                     if self.parent.name == 'grid_variables':
-                        wb[sheet].cell(row=2,column=self.beg).style = self.grid_var_style
-                        wb[sheet].cell(row=3,column=self.beg).style = self.grid_var_style
-                        wb[sheet].cell(row=4,column=self.beg).style = self.grid_var_style
-                        wb[sheet].cell(row=level_index,column=self.beg).alignment = Alignment(text_rotation=45)
+                        writer.set_cell(sheet, 2, self.beg, style=self.grid_var_style)
+                        writer.set_cell(sheet, 3, self.beg, style=self.grid_var_style)
+                        writer.set_cell(sheet, 4, self.beg, style=self.grid_var_style)
+                        writer.set_cell(sheet, level_index, self.beg, alignment=Alignment(text_rotation=45))
                         if self.parent.grid_set:
-                            row = 5
-                            for value in self.parent.grid_set[self.name]:
-                                wb[sheet].cell(row=row,column=self.beg).style = self.value_style
-                                wb[sheet].cell(row=row,column=self.beg).value = value
-                                row += 1
+                            writer.set_column(sheet, self.beg, 5, self.parent.grid_set[self.name], style=self.value_style)
                         else:
                             # 2^n rows for spacing
-                            row = 5
-                            for i in range(2**(len(self.parent.children))):
-                                wb[sheet].cell(row=row,column=self.beg).style = self.value_style
-                                row += 1
+                            writer.set_column(sheet, self.beg, 5, [None]*2**(len(self.parent.children)), style=self.value_style)
                     else:
-                        wb[sheet].cell(row=2,column=self.beg).style = self.schema_style
-                        wb[sheet].cell(row=3,column=self.beg).style = self.schema_style
-                        wb[sheet].cell(row=4,column=self.beg).style = self.schema_style
-                        wb[sheet].cell(row=level_index,column=self.beg).alignment = Alignment(text_rotation=45)
+                        writer.set_cell(sheet, 2, self.beg, style=self.schema_style)
+                        writer.set_cell(sheet, 3, self.beg, style=self.schema_style)
+                        writer.set_cell(sheet, 4, self.beg, style=self.schema_style)
+                        writer.set_cell(sheet, level_index, self.beg, alignment=Alignment(text_rotation=45))
                         if self.value is not None:
-                            row = 5
-                            for value in self.value:
-                                wb[sheet].cell(row=row,column=self.beg).style = self.value_style
-                                wb[sheet].cell(row=row,column=self.beg).value = value
-                                row += 1
+                            writer.set_column(sheet, self.beg, 5, self.value, style=self.value_style)
                         else:
                             # 2^n rows for spacing
-                            row = 5
-                            for i in range(2**(len(self.parent.parent.children[0].children))):
-                                wb[sheet].cell(row=row,column=self.beg).style = self.value_style
-                                row += 1
+                            writer.set_column(sheet, self.beg, 5, [None]*2**(len(self.parent.parent.children[0].children)), style=self.value_style)
 
                 if schema_node:
                     # Add units
                     if 'units' in schema_node:
-                        wb[sheet].cell(row=4,column=self.beg).value = schema_node['units']
+                        writer.set_cell(sheet, 4, self.beg, value=schema_node['units'])
 
                     # Add required
                         # TODO: Make conditional formatting (e.g. red name if not entered)
@@ -368,61 +562,40 @@ class A205XLSXNode:
                     # Add description
                     if 'description' in schema_node:
                         comment = openpyxl.comments.Comment(schema_node['description'],"ASHRAE 205")
-                        wb[sheet].cell(row=level_index,column=self.beg).comment = comment
+                        writer.set_cell(sheet, level_index, self.beg, comment=comment)
 
                 else:
                     # Not found in schema
                     comment = openpyxl.comments.Comment("Not found in schema.","ASHRAE 205")
-                    wb[sheet].cell(row=level_index,column=self.beg).comment = comment
-                    wb[sheet].cell(row=level_index,column=self.beg).font = Font(color='FF0001',bold=True)
+                    writer.set_cell(sheet, level_index, self.beg, comment=comment, font=Font(color='FF0001',bold=True))
 
             # TODO: Something better here...a lot of repetition...
             elif self.sheet_type == SheetType.ARRAY:
                 if len(self.children) > 0:
                     raise Exception("Were not handling nested items in an array yet!")
 
-                wb[sheet].cell(row=2,column=self.beg).value = self.name
-                wb[sheet].cell(row=2,column=self.beg).style = self.schema_style
-                wb[sheet].cell(row=3,column=self.beg).style = self.schema_style
+                writer.set_cell(sheet, 2, self.beg, value=self.name, style=self.schema_style)
+                writer.set_cell(sheet, 3, self.beg, style=self.schema_style)
 
-                row = 4
                 if self.value is not None:
-                    for value in self.value:
-                        wb[sheet].cell(row=row,column=self.beg).value = value
-                        wb[sheet].cell(row=row,column=self.beg).style = self.value_style
-
-                        if schema_node:
-                            # Enum validation
-                            if 'enum' in schema_node:
-                                enumerants = f'"{",".join(schema_node["enum"])}"'
-                                if len(enumerants) < 256: # Apparent limitation of written lists (TODO: https://stackoverflow.com/a/33532984/1344457)
-                                    dv = openpyxl.worksheet.datavalidation.DataValidation(type='list',formula1=enumerants,allow_blank=True)
-                                    wb[sheet].add_data_validation(dv)
-                                    dv.add(wb[sheet].cell(row=row,column=self.beg))
-
-                        row += 1
+                    array_length = len(self.value)
+                    writer.set_column(sheet, self.beg, 4, self.value, style=self.value_style)
                 else:
                     array_length = 5
                     parent_schema_node = self.parent.get_schema_node()
                     if parent_schema_node:
                         if 'maxItems' in parent_schema_node:
                             array_length = parent_schema_node['maxItems']
-                    for i in range(array_length):
-                        wb[sheet].cell(row=row,column=self.beg).style = self.value_style
-                        if schema_node:
-                            # Enum validation
-                            if 'enum' in schema_node:
-                                enumerants = f'"{",".join(schema_node["enum"])}"'
-                                if len(enumerants) < 256: # Apparent limitation of written lists (TODO: https://stackoverflow.com/a/33532984/1344457)
-                                    dv = openpyxl.worksheet.datavalidation.DataValidation(type='list',formula1=enumerants,allow_blank=True)
-                                    wb[sheet].add_data_validation(dv)
-                                    dv.add(wb[sheet].cell(row=row,column=self.beg))
-                        row += 1
+                    writer.set_column(sheet, self.beg, 4, [None]*array_length, style=self.value_style)
 
                 if schema_node:
+                    # Enum validation
+                    for row in range(4, 4 + array_length):
+                        self.write_enum_validation(sheet, row, self.beg, schema_node)
+
                     # Add units
                     if 'units' in schema_node:
-                        wb[sheet].cell(row=3,column=self.beg).value = schema_node['units']
+                        writer.set_cell(sheet, 3, self.beg, value=schema_node['units'])
 
                     # Add required
                         # TODO: Make conditional formatting (e.g. red name if not entered)
@@ -430,13 +603,12 @@ class A205XLSXNode:
                     # Add description
                     if 'description' in schema_node:
                         comment = openpyxl.comments.Comment(schema_node['description'],"ASHRAE 205")
-                        wb[sheet].cell(row=2,column=self.beg).comment = comment
+                        writer.set_cell(sheet, 2, self.beg, comment=comment)
 
                 else:
                     # Not found in schema
                     comment = openpyxl.comments.Comment("Not found in schema.","ASHRAE 205")
-                    wb[sheet].cell(row=2,column=self.beg).comment = comment
-                    wb[sheet].cell(row=2,column=self.beg).font = Font(color='FF0001',bold=True)
+                    writer.set_cell(sheet, 2, self.beg, comment=comment, font=Font(color='FF0001',bold=True))
 
         for child in self.children:
             child.write_node()
@@ -445,13 +617,14 @@ class A205XLSXNode:
         '''
         Translate XLSX content into nodes of a tree.
         '''
-        ws = self.tree.workbook[self.child_sheet]
+        sheet = self.child_sheet
+        get_cell_value = self.tree.get_cell_value
         end_node = False
         while not end_node:
             if self.child_sheet_type == SheetType.PERFORMANCE_MAP:
                 # Everything from the perspective of parent node
-                data_group = ws.cell(row=2,column=self.next_child_beg).value
-                data_element = ws.cell(row=3,column=self.next_child_beg).value
+                data_group = get_cell_value(sheet,2,self.next_child_beg)
+                data_element = get_cell_value(sheet,3,self.next_child_beg)
                 if data_group and data_group != self.name:
                     if data_group == 'grid_variables':
                         new_node = A205XLSXNode(data_group, parent=self)
@@ -482,42 +655,24 @@ class A205XLSXNode:
                 elif data_element:
                     if self.name not in ['grid_variables','lookup_variables']:
                         raise Exception(f"Invalid data group: '{self.name}'. Data groups in {self.parent.name} should be 'grid_variables' or 'lookup_variables'")
-                    row = 5
-                    end_of_column = False
-                    value = []
-                    while not end_of_column:
-                        item = ws.cell(row=row,column=self.next_child_beg).value
-                        if item is not None:
-                            value.append(item)
-                            row += 1
-                        else:
-                            end_of_column = True
+                    value = self.tree.get_column_values(sheet,self.next_child_beg,5)
                     new_node = A205XLSXNode(data_element, parent=self, value=value)
                 else:
                     # End of sheet
                     end_node = True
             elif self.child_sheet_type == SheetType.ARRAY:
                 # Everything from the perspective of parent node
-                data_element = ws.cell(row=2,column=self.next_child_beg).value
+                data_element = get_cell_value(sheet,2,self.next_child_beg)
                 if data_element:
-                    row = 4
-                    end_of_column = False
-                    value = []
-                    while not end_of_column:
-                        item = ws.cell(row=row,column=self.next_child_beg).value
-                        if item is not None:
-                            value.append(item)
-                            row += 1
-                        else:
-                            end_of_column = True
+                    value = self.tree.get_column_values(sheet,self.next_child_beg,4)
                     new_node = A205XLSXNode(data_element, parent=self, value=value)
                 else:
                     # End of sheet
                     end_node = True
             else:  # Flat Sheets
-                data_group = ws.cell(row=self.next_child_beg,column=1).value
-                data_element = ws.cell(row=self.next_child_beg,column=2).value
-                cell_value = ws.cell(row=self.next_child_beg,column=3).value
+                data_group = get_cell_value(sheet,self.next_child_beg,1)
+                data_element = get_cell_value(sheet,self.next_child_beg,2)
+                cell_value = get_cell_value(sheet,self.next_child_beg,3)
                 value = cell_value
                 sheet_ref = None
                 if type(cell_value) == str:
@@ -536,16 +691,8 @@ class A205XLSXNode:
                 elif data_element:
                     if sheet_ref:
                         # Get array values from another sheet
-                        row = 4
-                        end_of_column = False
-                        value = []
-                        while not end_of_column:
-                            item = self.tree.workbook[sheet_ref].cell(row=row,column=1).value
-                            if item is not None:
-                                value.append(item)
-                                row += 1
-                            else:
-                                end_of_column = True
+                        value = self.tree.get_column_values(sheet_ref,1,4)
+                        self.tree.release_sheet_values(sheet_ref)
                     # Determine hierarchy level using number of spaces
                     level = (len(data_element) - len(data_element.lstrip(' ')))/self.white_space_multiplier
                     data_element = data_element.strip(' ')
@@ -557,6 +704,10 @@ class A205XLSXNode:
                     # End of sheet
                     end_node = True
 
+        if self.child_sheet != self.sheet:
+            # All content of the child sheet belongs to this node
+            self.tree.release_sheet_values(sheet)
+
     def collect_content(self, content):
         '''
         Collect content from the tree and return it as a Python Dict.
@@ -590,39 +741,153 @@ class A205XLSXNode:
 class A205XLSXTree:
 
     def __init__(self,schema_path=None):
-        self.content = {}
         self.schema_type = ""
-        if schema_path is None:
-            schema_path = os.path.join(os.path.dirname(__file__),'..','schema-205',"build","schema","ASHRAE205.schema.json")
-        self.schema = A205Schema(schema_path)
+        self.fixed_schema = schema_path is not None
+        self._schema = A205Schema(schema_path) if self.fixed_schema else None
+        self.clear_schema_cache()
+        self.reset()
+
+    def reset(self):
+        '''
+        Clear the content of the tree (but not its schema) so it can be reused for another file.
+        '''
+        self.content = {}
         self.root_node = None
         self.sheets = []
         self.template_args = {}
         self.template_args_used = {}
+        self.sheet_values = {}  # Cached cell values of each worksheet (used when reading workbooks)
+        self.lineages = {}  # Interned node lineages
+
+    @property
+    def schema(self):
+        '''
+        Schema for the tree's schema_type, taken from the shared schema registry on first use.
+        '''
+        if self._schema is None:
+            self._schema = get_schema(self.schema_type if self.schema_type else "ASHRAE205")
+        return self._schema
+
+    @schema.setter
+    def schema(self, schema):
+        self._schema = schema
+        self.clear_schema_cache()
+
+    def set_schema_type(self, schema_type):
+        '''
+        Set the schema type (e.g., "RS0001"); the schema itself is loaded lazily when the type changes.
+        '''
+        if schema_type != self.schema_type:
+            self.schema_type = schema_type
+            if not self.fixed_schema:
+                self._schema = None
+                self.clear_schema_cache()
+
+    def clear_schema_cache(self):
+        self.schema_nodes = {}  # Resolved schema nodes by (lineage, options)
+        self.resolved_nodes = {}  # Resolved schema nodes by (id(node), step_in): (node, resolved node)
+
+    def get_schema_node(self, lineage, options):
+        '''
+        Return the schema node for a lineage (see A205Schema.get_schema_node).
+
+        Lookups are cached for the tree's schema, so each lineage is only searched for once no
+        matter how often its nodes (or their children) ask for it.
+        '''
+        key = (tuple(lineage), tuple(options))
+        profiling.count('schema_lookups')
+        if key not in self.schema_nodes:
+            profiling.count('schema_lookup_misses')
+            with profiling.timer('schema.lookup'):
+                self.schema_nodes[key] = self.schema.get_schema_node(list(lineage), list(options))
+        return self.schema_nodes[key]
+
+    def resolve(self, node, step_in=True):
+        '''
+        Return a schema node with any reference resolved (see A205Schema.resolve), cached by node.
+        '''
+        key = (id(node), step_in)
+        entry = self.resolved_nodes.get(key)
+        if entry is None or entry[0] is not node:
+            # The node is held in the entry so its id cannot be reused by another object
+            with profiling.timer('schema.resolve'):
+                entry = (node, self.schema.resolve(node, step_in=step_in))
+            self.resolved_nodes[key] = entry
+        return entry[1]
 
     def get_template_arg(self, arg):
         self.template_args_used[arg] = True
         return self.template_args[arg]
 
-    def load_workbook(self, file_name):
+    def load_workbook(self, file_name, low_memory=False):
         '''
         Create tree from XLSX workbook content
+
+        low_memory:
+          open the workbook read-only (cached values only, no styles or cell objects) and
+          stream each worksheet's rows, releasing them once the worksheet has been read
         '''
-        self.workbook = openpyxl.load_workbook(file_name)
+        self.reset()
+        with profiling.timer('xlsx.open_workbook'):
+            self.workbook = openpyxl.load_workbook(file_name, read_only=low_memory, data_only=low_memory)
         # Find Primary RS worksheet
         rs_pattern = re.compile("^RS(\\d{4})$")
         for ws in self.workbook:
             if rs_pattern.match(ws.title):
-                self.schema_type = ws.title
-
-        # Load appropriate schema
-        schema_path = os.path.join(os.path.dirname(__file__),'..','schema-205',"build","schema",f"{self.schema_type}.schema.json")
-        self.schema = A205Schema(schema_path)
+                self.set_schema_type(ws.title)
 
         self.root_node = A205XLSXNode(None, tree=self)
-        self.root_node.read_node()
+        with profiling.timer('xlsx.read_tree'):
+            self.root_node.read_node()
+        self.sheet_values = {}
+        if low_memory:
+            # Read-only workbooks hold the file open until closed
+            self.workbook.close()
         return self
 
+    def get_sheet_values(self, sheet):
+        '''
+        Return the values of a worksheet as a list of row tuples.
+
+        The worksheet is read in a single pass the first time it is requested.
+        '''
+        if sheet not in self.sheet_values:
+            worksheet = self.workbook[sheet]
+            if self.workbook.read_only:
+                # Dimensions stored in the file may be missing or wrong, so read until the last row
+                worksheet.reset_dimensions()
+            self.sheet_values[sheet] = list(worksheet.iter_rows(values_only=True))
+            if profiling.is_enabled():
+                profiling.count('cells_read', sum(len(row) for row in self.sheet_values[sheet]))
+        return self.sheet_values[sheet]
+
+    def release_sheet_values(self, sheet):
+        '''
+        Drop the cached values of a worksheet that has been completely read.
+        '''
+        self.sheet_values.pop(sheet, None)
+
+    def get_cell_value(self, sheet, row, column):
+        '''
+        Return the value of a single cell (1-based row and column) from the cached worksheet values.
+        '''
+        values = self.get_sheet_values(sheet)
+        if row > len(values) or column > len(values[row - 1]):
+            return None
+        return values[row - 1][column - 1]
+
+    def get_column_values(self, sheet, column, start_row):
+        '''
+        Return the values of a column, starting at start_row and ending before the first empty cell.
+        '''
+        values = []
+        for row_values in itertools.islice(self.get_sheet_values(sheet), start_row - 1, None):
+            item = row_values[column - 1] if column <= len(row_values) else None
+            if item is None:
+                break
+            values.append(item)
+        return values
+
     def create_tree_from_content(self, content, parent):
         '''
         Create tree from Python Dict content
@@ -641,7 +906,12 @@ class A205XLSXTree:
                             child.value.append(item[child.name])
         else:
             for item in content:
-                if type(content[item]) == dict:
+                value = content[item]
+                if is_array(value):
+                    # Array-backed performance map variables are written as flat lists
+                    from .performance import array_to_list
+                    value = array_to_list(value)
+                if type(value) == dict:
                     if "performance_map" in item:
                         sheet_ref = unique_name_with_index(item, self.sheets)
                     elif item[-len('_representation'):] == '_representation':
@@ -651,42 +921,40 @@ class A205XLSXTree:
                         sheet_ref = None
                     new_node = A205XLSXNode(item, parent=parent, sheet_ref=sheet_ref)
                     if item == "grid_variables":
-                        new_node.add_grid_set(self.schema.create_grid_set(self.content,new_node.lineage))
-                    self.create_tree_from_content(content[item], new_node)
-                elif type(content[item]) == list:
-                    if len(content[item]) == 0:
+                        new_node.add_grid_set(self.schema.create_grid_set(self.content,list(new_node.lineage)))
+                    self.create_tree_from_content(value, new_node)
+                elif type(value) == list:
+                    if len(value) == 0:
                         # Create new sheet for blank array
                         sheet_ref = unique_name_with_index(item, self.sheets)
                         A205XLSXNode(item,parent=parent,sheet_ref=sheet_ref)
-                    elif type(content[item][0]) == dict:
+                    elif type(value[0]) == dict:
                         # Create new sheet for array
                         sheet_ref = unique_name_with_index(item, self.sheets)
                         new_node = A205XLSXNode(item,parent=parent,sheet_ref=sheet_ref)
-                        self.create_tree_from_content(content[item], new_node)
+                        self.create_tree_from_content(value, new_node)
                     else:
                         # plain array
                         if parent.sheet_type == SheetType.FLAT:
                             # simple array in it's own sheet
                             sheet_ref = unique_name_with_index(item, self.sheets)
-                            new_node = A205XLSXNode(item,parent=parent,value=content[item],sheet_ref=sheet_ref)
+                            new_node = A205XLSXNode(item,parent=parent,value=value,sheet_ref=sheet_ref)
                         else:
-                            A205XLSXNode(item,parent=parent,value=content[item])
+                            A205XLSXNode(item,parent=parent,value=value)
                 else:
-                    A205XLSXNode(item,parent=parent,value=content[item])
+                    A205XLSXNode(item,parent=parent,value=value)
 
     def load(self, content):
         '''
         Create tree from Python Dict content
         '''
+        self.reset()
         self.content = content
-        self.schema_type = content["metadata"]["schema"]
-
-        # Load appropriate schema
-        schema_path = os.path.join(os.path.dirname(__file__),'..','schema-205',"build","schema",f"{self.schema_type}.schema.json")
-        self.schema = A205Schema(schema_path)
+        self.set_schema_type(content["metadata"]["schema"])
 
         self.root_node = A205XLSXNode(None, tree=self)
-        self.create_tree_from_content(content, self.root_node)
+        with profiling.timer('xlsx.create_tree'):
+            self.create_tree_from_content(content, self.root_node)
 
     def create_tree_from_schema(self, node):
         '''
@@ -712,10 +980,9 @@ class A205XLSXTree:
         if 'properties' in schema_node:
             for item in schema_node['properties']:
 
-                child_schema_node = self.schema.resolve(schema_node['properties'][item],step_in=False)
+                child_schema_node = self.resolve(schema_node['properties'][item],step_in=False)
 
                 # Typical cases
-                option = None
                 value = None
                 sheet_ref = None
 
@@ -724,8 +991,6 @@ class A205XLSXTree:
                     value = self.schema.get_schema_version()
                 elif item == 'rs_id':
                     value = node.inner_rs
-                elif item == 'rs_instance':
-                    option = get_rs_index(node.inner_rs)
                 elif 'performance_map' == item[:len('performance_map')]:
                     sheet_ref = unique_name_with_index(item, self.sheets)
                 elif 'items' in child_schema_node and node.sheet_type == SheetType.FLAT:
@@ -737,11 +1002,11 @@ class A205XLSXTree:
                     # General keyword value setting
                     value = self.get_template_arg(item)
 
-                self.create_tree_from_schema(A205XLSXNode(item, parent=node, value=value, option=option, sheet_ref=sheet_ref))
+                self.create_tree_from_schema(A205XLSXNode(item, parent=node, value=value, sheet_ref=sheet_ref))
 
         # List nodes:
         if 'items' in schema_node:
-            schema_node = self.schema.resolve(schema_node['items'],step_in=False)
+            schema_node = self.resolve(schema_node['items'],step_in=False)
             if 'properties' in schema_node:
                 for item in schema_node['properties']:
                     self.create_tree_from_schema(A205XLSXNode(item, parent=node))
@@ -751,11 +1016,11 @@ class A205XLSXTree:
             if node.inner_rs == 'RS0003' and node.name == 'performance_map' and 'operation_speed_control_type' in self.template_args:
                 template_arg_value = self.get_template_arg('operation_speed_control_type')
                 if template_arg_value == 'CONTINUOUS':
-                    schema_node = self.schema.resolve(schema_node['oneOf'][0],step_in=False)
-                    node.options[-1] = 0
+                    schema_node = self.resolve(schema_node['oneOf'][0],step_in=False)
+                    node.option = 0
                 elif template_arg_value == 'DISCRETE':
-                    schema_node = self.schema.resolve(schema_node['oneOf'][1],step_in=False)
-                    node.options[-1] = 1
+                    schema_node = self.resolve(schema_node['oneOf'][1],step_in=False)
+                    node.option = 1
                 else:
                     raise Exception(f"Invalid 'performance_map_type': {template_arg_value}")
 
@@ -772,12 +1037,14 @@ class A205XLSXTree:
         kwargs:
           any data element and value in the schema
         '''
-        self.schema_type = repspec
+        self.reset()
+        self.set_schema_type(repspec)
         self.template_args = kwargs
         for arg in self.template_args:
             self.template_args_used[arg] = False
         self.root_node = A205XLSXNode(None, tree=self)
-        self.create_tree_from_schema(self.root_node)
+        with profiling.timer('xlsx.create_tree_from_schema'):
+            self.create_tree_from_schema(self.root_node)
         #for arg in self.template_args_used:
         #    if not self.template_args_used[arg]:
         #        raise Exception(f"Unused template argument: \"{arg}\".")
@@ -792,42 +1059,122 @@ class A205XLSXTree:
         output_path = os.path.join(output_path)
         self.save(output_path)
 
-    def save(self, file_name):
+    def save(self, file_name, low_memory=False):
         '''
         Save tree as workbook
+
+        low_memory:
+          collect each sheet's content and write its rows in order through a write-only
+          (streaming) workbook rather than setting cells in a full, random-access workbook
         '''
-        self.workbook = openpyxl.Workbook()
+        self.writer = XLSXStreamWriter() if low_memory else XLSXWriter()
+        self.workbook = self.writer.workbook
 
         # Write tree content
-        self.workbook.active.title = self.schema_type
-        self.root_node.write_header(self.workbook[self.schema_type])
-        self.root_node.write_node()
+        with profiling.timer('xlsx.write_tree'):
+            self.writer.create_sheet(self.schema_type)
+            self.root_node.write_header(self.schema_type)
+            self.root_node.write_node()
 
-        self.workbook.save(file_name)
+        with profiling.timer('xlsx.save_workbook'):
+            self.writer.save(file_name)
 
     def get_content(self):
         '''
         returns tree content
         '''
         content = {}
-        self.root_node.collect_content(content)
+        with profiling.timer('xlsx.get_content'):
+            self.root_node.collect_content(content)
         return content
 
 def template(repspec, output_path, **kwargs):
     '''
     Generate an XLSX template based on the schema for a specific RS
     '''
-    # Load appropriate schema
-    schema_path = os.path.join(os.path.dirname(__file__),'..','schema-205',"build","schema",f"{repspec}.schema.json")
-    tree = A205XLSXTree(schema_path=schema_path)
+    tree = A205XLSXTree()
+    # Templating modifies the schema, so use a private copy of the shared schema
+    tree.set_schema_type(repspec)
+    tree.schema = checkout_schema(repspec)
     tree.template(repspec, output_path, **kwargs)
 
-def generate_templates(output_dir, config):
+def get_template(repspec, keywords=None, cache=None):
+    '''
+    Return the bytes of an XLSX template for a specific RS, from the template cache (see
+    TemplateCache) if it holds an identical template.
+
+    cache:
+      a TemplateCache, a cache directory, or None to always generate the template
+    '''
+    keywords = {} if keywords is None else keywords
+    if isinstance(cache, str):
+        cache = TemplateCache(cache)
+    key = None
+    if cache is not None:
+        key = cache.get_key(repspec, keywords)
+        content = cache.get(key)
+        if content is not None:
+            return content
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, f"{repspec}.xlsx")
+        template(repspec, output_path, **keywords)
+        if cache is not None:
+            cache.put(key, output_path)
+        with open(output_path, 'rb') as template_file:
+            return template_file.read()
+
+def get_template_file_name(repspec, template_config):
+    file_name_components = [repspec]
+    if template_config["file-name-suffix"]:
+        file_name_components.append(template_config["file-name-suffix"])
+    file_name_components.append("template.a205.xlsx")
+    return '-'.join(file_name_components)
+
+def _template_task(repspec, output_path, keywords):
+    try:
+        template(repspec, output_path, **keywords)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+def generate_templates(output_dir, config, jobs=1, cache=None):
+    '''
+    Generate the XLSX templates described by a template configuration (see config/templates.json).
+
+    jobs:
+      number of processes used to generate templates (`None` uses every CPU)
+    cache:
+      a TemplateCache (or cache directory): cached templates are copied rather than generated,
+      and newly generated templates are added to it
+    '''
+    if isinstance(cache, str):
+        cache = TemplateCache(cache)
+    tasks = []
     for rs, templates in config.items():
         for t in templates:
-            file_name_components = [rs]
-            if t["file-name-suffix"]:
-                file_name_components.append(t["file-name-suffix"])
-            file_name_components.append("template.a205.xlsx")
-            file_name = '-'.join(file_name_components)
-            template(rs,os.path.join(output_dir,file_name), **t["keywords"])
+            output_path = os.path.join(output_dir, get_template_file_name(rs, t))
+            key = None
+            if cache is not None:
+                key = cache.get_key(rs, t["keywords"])
+                if cache.copy_to(key, output_path):
+                    continue
+            tasks.append((rs, output_path, t["keywords"], key))
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    repspecs, output_paths, keywords, keys = zip(*tasks) if tasks else ((), (), (), ())
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), initializer=preload_schemas) as executor:
+            errors = profiling.map_profiled(executor, _template_task, repspecs, output_paths, keywords)
+    else:
+        errors = [_template_task(*task[:3]) for task in tasks]
+
+    failures = []
+    for output_path, key, error in zip(output_paths, keys, errors):
+        if error is not None:
+            failures.append(f"{os.path.basename(output_path)}: {error}")
+        elif cache is not None:
+            cache.put(key, output_path)
+    if failures:
+        messages = '\n  '.join(failures)
+        raise Exception(f"Failed to generate {len(failures)} of {len(tasks)} templates:\n  {messages}")
@@ -98,16 +98,13 @@ def create_files(web_dir):
     template_content = tk205.load(
         os.path.join(root_dir, "..", "config", "templates.json")
     )
-    for RS, templates in template_content.items():
-        for template in templates:
-            file_name_components = [RS]
-            if template["file-name-suffix"]:
-                file_name_components.append(template["file-name-suffix"])
-            file_name_components.append("template.a205.xlsx")
-            file_name = "-".join(file_name_components)
-            tk205.template(
-                RS, os.path.join(templates_dir, file_name), **template["keywords"]
-            )
+    # Reuses the templates cached by the "templates" build task when they are up to date
+    tk205.generate_templates(
+        templates_dir,
+        template_content,
+        jobs=None,
+        cache=os.path.join("build", "template-cache"),
+    )
 
     # schema
     schema_dir = set_dir(os.path.join(assets_dir, "schema"))